@@ -0,0 +1,4 @@
+"""
+MySQL database backend that checks connections out of a per-process pool
+instead of opening one per request. Enabled by DB_POOL_SIZE in settings.
+"""
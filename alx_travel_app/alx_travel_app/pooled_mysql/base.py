@@ -0,0 +1,70 @@
+"""
+Django's MySQL backend with connections checked out of pool.ConnectionPool.
+
+Use with CONN_MAX_AGE=0: Django then "closes" the connection at the end of every
+request, which here hands it back to the pool, so a thread only holds a
+connection while it serves a request. OPTIONS['pool'] takes the ConnectionPool
+sizing (max_size, timeout, max_idle, max_lifetime, check_after); the remaining
+OPTIONS go to MySQLdb.connect() as usual.
+"""
+from django.db.backends.mysql import base as mysql
+
+from . import pool as connection_pool
+
+
+class DatabaseWrapper(mysql.DatabaseWrapper):
+    pool_options = {}
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        self.pool_options = params.pop('pool', {})
+        return params
+
+    @property
+    def pool(self):
+        return connection_pool.pools.get(self.alias)
+
+    def get_new_connection(self, conn_params):
+        pool = connection_pool.pool_for(
+            self.alias,
+            connect=lambda: super(DatabaseWrapper, self).get_new_connection(conn_params),
+            ping=self.ping,
+            error_class=mysql.Database.OperationalError,
+            **self.pool_options,
+        )
+        connection, self.reused_connection = pool.acquire()
+        return connection
+
+    @staticmethod
+    def ping(connection):
+        try:
+            connection.ping()
+        except mysql.Database.Error:
+            return False
+        return True
+
+    def init_connection_state(self):
+        # Session variables survive the check-in, so only a new connection needs them
+        if not self.reused_connection:
+            super().init_connection_state()
+
+    def _set_autocommit(self, autocommit):
+        # connect() sets autocommit on every checkout; skip the round trip when it's unchanged
+        if self.connection.get_autocommit() != autocommit:
+            super()._set_autocommit(autocommit)
+
+    def _close(self):
+        if self.connection is None:
+            return
+        pool = self.pool
+        if pool is None:
+            return super()._close()
+        connection = self.connection
+        reusable = not self.in_atomic_block and (not self.errors_occurred or self.is_usable())
+        if reusable and not connection.get_autocommit():
+            # Don't hand a half-done transaction to the next request
+            try:
+                connection.rollback()
+            except mysql.Database.Error:
+                reusable = False
+        pool.release(connection, reusable)
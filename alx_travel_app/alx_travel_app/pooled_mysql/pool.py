@@ -0,0 +1,157 @@
+"""
+Thread-safe pool of open DB-API connections, one per database alias and process.
+
+Django's request cycle closes a CONN_MAX_AGE=0 connection when each request
+ends; the pooled backend turns that close into a check-in, so the next request
+in any thread gets a warm connection instead of a new TCP/auth handshake. At
+most `max_size` connections are open; a request finding them all in use waits
+up to `timeout` seconds for one to come back. Idle connections past `max_idle`,
+and any connection past `max_lifetime`, are closed instead of reused, so the
+server's wait_timeout never sees them. Connections idle for more than
+`check_after` seconds are pinged before reuse.
+
+This module has no driver imports; the backend in base.py supplies the connect
+and ping functions and the error class.
+"""
+import os
+import threading
+import time
+from collections import deque
+
+# Live pools of this process by alias, for snapshot()
+pools = {}
+
+
+class ConnectionPool:
+    def __init__(self, connect, ping, error_class, max_size=10, timeout=5.0, max_idle=300,
+                 max_lifetime=3600, check_after=30):
+        self.connect = connect
+        self.ping = ping
+        self.error_class = error_class
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.max_lifetime = max_lifetime
+        self.check_after = check_after
+        self.condition = threading.Condition()
+        # (connection, opened at, checked in at); the most recently returned is reused first
+        self.idle = deque()
+        self.opened = {}
+        self.size = 0
+        self.in_use = 0
+        self.pid = os.getpid()
+        self.counters = dict.fromkeys(('opened', 'reused', 'closed', 'waits', 'timeouts', 'failed_checks'), 0)
+        self.wait_seconds = 0.0
+
+    def _after_fork(self):
+        # Sockets inherited from the parent must not be shared; forget them without closing
+        if self.pid != os.getpid():
+            self.pid = os.getpid()
+            self.idle.clear()
+            self.opened.clear()
+            self.size = self.in_use = 0
+
+    def acquire(self):
+        """
+        An open connection and whether it was reused. Raises `error_class` when none
+        frees up within `timeout` seconds.
+        """
+        started = time.monotonic()
+        waited = False
+        with self.condition:
+            self._after_fork()
+            while True:
+                if self.idle:
+                    entry = self.idle.pop()
+                    break
+                if self.size < self.max_size:
+                    entry = None
+                    self.size += 1
+                    break
+                if not waited:
+                    waited = True
+                    self.counters['waits'] += 1
+                remaining = self.timeout - (time.monotonic() - started)
+                if remaining <= 0:
+                    self.counters['timeouts'] += 1
+                    self.wait_seconds += time.monotonic() - started
+                    raise self.error_class(
+                        f"No database connection became free within {self.timeout}s ({self.max_size} in use)."
+                    )
+                self.condition.wait(remaining)
+            self.in_use += 1
+            if waited:
+                self.wait_seconds += time.monotonic() - started
+
+        if entry is not None:
+            connection, opened, returned = entry
+            now = time.monotonic()
+            if now - opened <= self.max_lifetime and now - returned <= self.max_idle:
+                if now - returned <= self.check_after or self.ping(connection):
+                    with self.condition:
+                        self.counters['reused'] += 1
+                    return connection, True
+                with self.condition:
+                    self.counters['failed_checks'] += 1
+            # Replace the stale connection; its slot stays taken for the new one
+            self._close(connection)
+        try:
+            connection = self.connect()
+        except Exception:
+            with self.condition:
+                self.size -= 1
+                self.in_use -= 1
+                self.condition.notify()
+            raise
+        with self.condition:
+            self.opened[id(connection)] = time.monotonic()
+            self.counters['opened'] += 1
+        return connection, False
+
+    def release(self, connection, reusable=True):
+        """Checks a connection back in, or closes it when it must not be reused."""
+        with self.condition:
+            if self.pid != os.getpid():
+                return
+            self.in_use -= 1
+            opened = self.opened.get(id(connection))
+            if reusable and opened is not None:
+                self.idle.append((connection, opened, time.monotonic()))
+                self.condition.notify()
+                return
+            self.size -= 1
+            self.condition.notify()
+        self._close(connection)
+
+    def _close(self, connection):
+        with self.condition:
+            self.opened.pop(id(connection), None)
+            self.counters['closed'] += 1
+        try:
+            connection.close()
+        except Exception:
+            pass  # Already broken; the slot is freed either way
+
+    def snapshot(self):
+        with self.condition:
+            return {
+                'max_size': self.max_size,
+                'open': self.size,
+                'in_use': self.in_use,
+                'idle': len(self.idle),
+                **self.counters,
+                'wait_ms': round(self.wait_seconds * 1000, 1),
+            }
+
+
+def pool_for(alias, **options):
+    """The pool of `alias` in this process, created on first use."""
+    pool = pools.get(alias)
+    if pool is None:
+        pool = pools.setdefault(alias, ConnectionPool(**options))
+    return pool
+
+
+def snapshot():
+    """Metrics of every pool open in this process, by alias."""
+    return {alias: pool.snapshot() for alias, pool in pools.items()}
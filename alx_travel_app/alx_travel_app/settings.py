@@ -53,6 +53,8 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    # Sends the reads of GET requests to a read replica, see listings/replicas.py
+    'listings.replicas.ReplicaRoutingMiddleware',
 ]
 
 ROOT_URLCONF = 'alx_travel_app.urls'
@@ -86,9 +88,61 @@ DATABASES = {
         'PORT': env('MYSQL_PORT', default='3306'), # type: ignore
         'OPTIONS': {
             'init_command': "SET sql_mode='STRICT_TRANS_TABLES'",
-        }
+            # Lets import_dataset use LOAD DATA LOCAL INFILE; the server must allow it too
+            'local_infile': env.bool('MYSQL_LOCAL_INFILE', default=False), # type: ignore
+        },
+        # Seconds a thread keeps its connection across requests; 0 reconnects on every request
+        'CONN_MAX_AGE': env.int('DB_CONN_MAX_AGE', default=60), # type: ignore
+        # Ping a kept connection before the request that reuses it
+        'CONN_HEALTH_CHECKS': env.bool('DB_CONN_HEALTH_CHECKS', default=True), # type: ignore
+    }
+}
+
+# DB_POOL_SIZE > 0 switches to the pooled backend: each process keeps up to that
+# many connections and lends them to requests, instead of one per thread.
+DB_POOL_SIZE = env.int('DB_POOL_SIZE', default=0) # type: ignore
+if DB_POOL_SIZE > 0:
+    DATABASES['default'].update({
+        'ENGINE': 'alx_travel_app.pooled_mysql',
+        # Closing at the end of a request returns the connection to the pool
+        'CONN_MAX_AGE': 0,
+    })
+    DATABASES['default']['OPTIONS']['pool'] = {
+        'max_size': DB_POOL_SIZE,
+        # Seconds a request waits for a free connection before failing
+        'timeout': env.float('DB_POOL_TIMEOUT', default=5.0), # type: ignore
+        'max_idle': env.int('DB_POOL_MAX_IDLE', default=300), # type: ignore
+        'max_lifetime': env.int('DB_POOL_MAX_LIFETIME', default=3600), # type: ignore
     }
+
+# Read replicas as MYSQL_REPLICA_HOSTS=host[:port],...; each becomes DATABASES['replica_<n>']
+# with the primary's credentials and options. Test runs use the primary in their place.
+for number, address in enumerate(env.list('MYSQL_REPLICA_HOSTS', default=[]), 1): # type: ignore
+    host, _, port = address.partition(':')
+    DATABASES[f'replica_{number}'] = {
+        **DATABASES['default'],
+        'HOST': host,
+        'PORT': port or DATABASES['default']['PORT'],
+        'OPTIONS': dict(DATABASES['default']['OPTIONS']),
+        'TEST': {'MIRROR': 'default'},
+    }
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias.startswith('replica_')]
+DATABASE_ROUTERS = ['listings.replicas.ReplicaRouter']
+# Seconds a client that wrote keeps reading from the primary; longer than the replica lag
+REPLICA_STICKY_SECONDS = env.int('DB_REPLICA_STICKY_SECONDS', default=5) # type: ignore
+
+# Response cache for the listing endpoints; CACHE_URL such as redis://host:6379/1
+# for a shared cache, local memory per process otherwise.
+CACHES = {
+    'default': env.cache('CACHE_URL', default='locmemcache://'), # type: ignore
 }
+LISTING_CACHE_TIMEOUT = env.int('LISTING_CACHE_TIMEOUT', default=300) # type: ignore
+# Most items one bulk listing or calendar request may carry
+LISTING_BULK_MAX_ITEMS = env.int('LISTING_BULK_MAX_ITEMS', default=500) # type: ignore
+
+# Fan-out behind /api/events/. The in-process default only reaches streams held by the
+# same ASGI worker; run several workers with a broker shared between them.
+EVENTS_BROKER = env.str('EVENTS_BROKER', default='listings.events.LocalBroker') # type: ignore
 
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
@@ -127,6 +181,12 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.AllowAny',
     ],
+    'DEFAULT_FILTER_BACKENDS': [
+        'rest_framework.filters.SearchFilter',
+        'rest_framework.filters.OrderingFilter',
+    ],
+    'DEFAULT_PAGINATION_CLASS': 'listings.pagination.StandardPagination',
+    'PAGE_SIZE': 50,
 }
 
 CORS_ALLOW_ALL_ORIGINS = True
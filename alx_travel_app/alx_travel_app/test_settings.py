@@ -0,0 +1,29 @@
+"""
+Settings for `python manage.py test --settings=alx_travel_app.test_settings`,
+which runs the suite without a MySQL server or a .env file.
+
+Two SQLite files stand in for the MySQL primary and a read replica, so the
+routing tests can tell which database answered. Replica routing is off except
+in the tests that turn it on, so the other tests read what they just wrote.
+"""
+import os
+
+# settings.py reads these from the environment; the suite needs none of them
+for name in ('SECRET_KEY', 'MYSQL_DATABASE', 'MYSQL_USER', 'MYSQL_PASSWORD'):
+    os.environ.setdefault(name, 'test')
+
+from .settings import *  # noqa: E402,F401,F403
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'primary.sqlite3',
+        'TEST': {'NAME': BASE_DIR / 'test-primary.sqlite3'},
+    },
+    'replica_1': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'replica.sqlite3',
+        'TEST': {'NAME': BASE_DIR / 'test-replica.sqlite3'},
+    },
+}
+DATABASE_REPLICAS = []
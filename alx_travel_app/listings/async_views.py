@@ -0,0 +1,199 @@
+"""
+Async variants of the hot read endpoints, mounted under /api/async/ and meant to
+be served by the ASGI app (alx_travel_app.asgi) so a request waiting on MySQL
+holds a coroutine instead of a worker thread.
+
+Each view builds the same DRF viewset the sync endpoint uses, runs its
+authentication, permission, throttle and content negotiation checks, and reuses
+its filters, ?fields=/?expand= shaping, cache scopes and validators. The queries go through the async ORM and the page is rendered by the
+serializer's fastpath plan, so the bodies match the sync endpoints byte for byte.
+Only JSON is served. Django's async ORM still runs each query on a thread of its
+own, because the MySQL drivers are synchronous; the cursor paginator, which has
+no async API, runs in one such hop.
+"""
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.core.exceptions import PermissionDenied, ValidationError as DjangoValidationError
+from django.core.paginator import InvalidPage, Page
+from django.http import Http404, HttpResponse
+from django.views.decorators.http import require_safe
+from rest_framework import status
+from rest_framework.exceptions import APIException, AuthenticationFailed, NotAuthenticated, NotFound
+from rest_framework.views import exception_handler
+
+from . import cache as listing_cache
+from . import fastpath
+from .filters import stay_dates
+from .mixins import copy_validators, etag_matches, newest_stamp
+from .models import Listing, ListingNight
+from .renderers import FastJSONRenderer
+from .views import ListingViewSet, MessageViewSet
+
+
+def render_json(data, status_code=status.HTTP_200_OK, headers=None):
+    return HttpResponse(FastJSONRenderer().render(data), status=status_code,
+                        content_type='application/json', headers=headers)
+
+
+def json_endpoint(view_func):
+    """GET/HEAD only; DRF exceptions become the error bodies DRF's exception handler would send."""
+    @require_safe
+    @wraps(view_func)
+    async def wrapper(request, *args, **kwargs):
+        try:
+            return await view_func(request, *args, **kwargs)
+        except (Http404, PermissionDenied, APIException) as exc:
+            response = exception_handler(exc, {})
+        # Rendered here: the Response never goes through DRF's finalize_response()
+        headers = {name: response[name] for name in ('WWW-Authenticate', 'Retry-After') if response.has_header(name)}
+        return render_json(response.data, response.status_code, headers)
+    return wrapper
+
+
+async def viewset(viewset_class, request, action, **kwargs):
+    """
+    An instance of `viewset_class` set up for `action` like as_view() and dispatch()
+    do before calling the handler. The request is authenticated, permissions and
+    throttles are checked and content is negotiated, raising as dispatch() would.
+    """
+    # @action overrides, e.g. permission_classes, which the router hands to as_view()
+    initkwargs = getattr(getattr(viewset_class, action), 'kwargs', {})
+    view = viewset_class(**initkwargs, action_map={'get': action, 'head': action}, args=(), kwargs=kwargs,
+                         format_kwarg=None, basename=None, headers={})
+    # These views only speak JSON
+    view.renderer_classes = [FastJSONRenderer]
+    # Also sets view.action from the action map
+    view.request = view.initialize_request(request)
+    try:
+        await sync_to_async(view.initial)(view.request)
+    except (NotAuthenticated, AuthenticationFailed) as exc:
+        # As APIView.handle_exception(): 403 unless an authenticator offers a WWW-Authenticate challenge
+        auth_header = view.get_authenticate_header(view.request)
+        if auth_header:
+            exc.auth_header = auth_header
+        else:
+            exc.status_code = status.HTTP_403_FORBIDDEN
+        raise
+    return view
+
+
+def primary_key(model, raw):
+    try:
+        return model._meta.pk.to_python(raw)
+    except DjangoValidationError:
+        # What DRF's get_object_or_404() answers for a malformed key
+        raise NotFound()
+
+
+async def paginate(view, queryset):
+    """view.paginate_queryset() for page-number pagination, counting and reading the page through the async ORM."""
+    pagination, request = view.paginator, view.request
+    page_size = pagination.get_page_size(request)
+    if not page_size:
+        return None
+    paginator = pagination.django_paginator_class(queryset, page_size)
+    paginator.count = await queryset.acount()
+    page_number = pagination.get_page_number(request, paginator)
+    try:
+        page = paginator.page(page_number)
+    except InvalidPage as exc:
+        raise NotFound(pagination.invalid_page_message.format(page_number=page_number, message=str(exc)))
+    pagination.page = Page([row async for row in page.object_list], page.number, paginator)
+    pagination.request = request
+    return list(pagination.page)
+
+
+async def conditional(view, request, build):
+    """ConditionalGetMixin.conditional() with the timestamps read through the async ORM."""
+    query = view.last_modified_query(view.request)
+    last_modified = newest_stamp(await query.afirst()) if query is not None else None
+    if last_modified is None:
+        return await build()
+    answered, headers = view.precondition(request, last_modified)
+    if answered is not None:
+        return answered
+    response = await build()
+    if response.status_code == status.HTTP_200_OK:
+        copy_validators(headers, response)
+    return response
+
+
+async def cached(view, request, build):
+    """ListingCacheMixin.cached() for a coroutine building the response data."""
+    scopes = view.cache_scopes(view.request)
+    if scopes is None:
+        return render_json(await build())
+    key, etag = await sync_to_async(listing_cache.response_key)(scopes, view.request)
+    headers = {'ETag': etag, 'Cache-Control': 'no-cache'}
+    if etag_matches(request, etag):
+        return HttpResponse(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    data = await cache.aget(key)
+    if data is None:
+        data = await build()
+        await cache.aset(key, data, await sync_to_async(listing_cache.timeout)())
+    return render_json(data, headers=headers)
+
+
+@json_endpoint
+async def listing_list(request):
+    view = await viewset(ListingViewSet, request, 'list')
+
+    async def build():
+        plan = fastpath.plan_for(view.get_serializer())
+        queryset = view.filter_queryset(view.get_queryset())
+        # distance_km on ?near= searches
+        annotations = [name for name in plan.annotations if name in queryset.query.annotations]
+        rows = queryset.values(*plan.columns, *annotations)
+        page = await paginate(view, rows)
+        if page is None:
+            return plan.render([row async for row in rows], view.request)
+        return view.get_paginated_response(plan.render(page, view.request)).data
+
+    return await conditional(view, request, lambda: cached(view, request, build))
+
+
+@json_endpoint
+async def listing_detail(request, pk):
+    view = await viewset(ListingViewSet, request, 'retrieve', pk=pk)
+
+    async def build():
+        plan = fastpath.plan_for(view.get_serializer())
+        queryset = view.filter_queryset(view.get_queryset()).filter(pk=primary_key(Listing, pk))
+        annotations = [name for name in plan.annotations if name in queryset.query.annotations]
+        row = await queryset.values(*plan.columns, *annotations).afirst()
+        if row is None:
+            raise NotFound(f"No {Listing._meta.object_name} matches the given query.")
+        return plan.render([row], view.request)[0]
+
+    return await conditional(view, request, lambda: cached(view, request, build))
+
+
+@json_endpoint
+async def listing_availability(request, pk):
+    view = await viewset(ListingViewSet, request, 'availability', pk=pk)
+    check_in, check_out = stay_dates(view.request, required=True)
+    property_id = primary_key(Listing, pk)
+    nights = ListingNight.objects.filter(listing_id=property_id, night__gte=check_in, night__lt=check_out)
+    taken = [night async for night in nights.order_by('night').values_list('night', flat=True)]
+    # A free stay needs the second query to tell a free calendar from a missing listing
+    if not taken and not await Listing.objects.filter(pk=property_id).aexists():
+        raise NotFound(f"No {Listing._meta.object_name} matches the given query.")
+    return render_json({
+        'property_id': property_id,
+        'check_in': check_in,
+        'check_out': check_out,
+        'available': not taken,
+        'taken_nights': taken,
+    })
+
+
+@json_endpoint
+async def message_inbox(request):
+    view = await viewset(MessageViewSet, request, 'inbox')
+    plan = fastpath.plan_for(view.get_serializer())
+    columns = dict.fromkeys([*plan.columns, *view.ordering_fields])
+    rows = view.filter_queryset(view.get_queryset()).values(*columns)
+    page = await sync_to_async(view.paginate_queryset)(rows)
+    return render_json(view.get_paginated_response(plan.render(page, view.request)).data)
@@ -0,0 +1,217 @@
+"""
+Bulk listing and calendar sync for hosts whose portfolios are driven by a channel manager.
+
+Each function takes the decoded request array and returns one result per item,
+in request order. Items are validated without per-item queries: related keys and
+existing rows are loaded once for the whole batch. The valid items are then
+written with bulk_create/bulk_update/delete in one transaction; invalid ones
+are reported and skipped.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import serializers
+
+from . import cache as listing_cache
+from .models import Listing, ListingNight
+from .serializers import CalendarSyncSerializer, ListingSerializer, PreloadedPrimaryKeyRelatedField
+
+WRITE_BATCH_SIZE = 500
+
+
+def max_items():
+    return getattr(settings, 'LISTING_BULK_MAX_ITEMS', 500)
+
+
+def check_batch(items):
+    if not isinstance(items, list) or not items:
+        raise serializers.ValidationError({'detail': "Expected a non-empty JSON array of items."})
+    if len(items) > max_items():
+        raise serializers.ValidationError({'detail': f"At most {max_items()} items per request."})
+
+
+def _failed(index, errors, **extra):
+    return {'index': index, 'status': 'error', **extra, 'errors': errors}
+
+
+def _parse_pk(model, raw):
+    try:
+        return model._meta.pk.to_python(raw)
+    except (DjangoValidationError, TypeError):
+        return None
+
+
+def preload_related(serializer, items):
+    """
+    {field name: {pk: instance}} for every PreloadedPrimaryKeyRelatedField of the
+    serializer, one query per field over the keys the items mention.
+    """
+    preloaded = {}
+    for name, field in serializer.fields.items():
+        if isinstance(field, PreloadedPrimaryKeyRelatedField) and not field.read_only:
+            model = field.get_queryset().model
+            keys = {_parse_pk(model, item.get(name)) for item in items if isinstance(item, dict) and item.get(name) is not None}
+            keys.discard(None)
+            preloaded[name] = field.get_queryset().in_bulk(keys)
+    return preloaded
+
+
+def sync_listings(items, context):
+    """
+    Creates or partially updates listings: an item carrying a property_id updates
+    that listing, any other item creates one. Runs the serializer and model
+    validation of a single save, minus the per-item queries.
+    """
+    check_batch(items)
+    results = [None] * len(items)
+    context = dict(context, preloaded={})
+    creator = ListingSerializer(context=context)
+    updater = ListingSerializer(context=context, partial=True)
+    context['preloaded'].update(preload_related(creator, items))
+
+    keys = {}
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            results[index] = _failed(index, {'non_field_errors': ["Expected an object."]})
+        elif item.get('property_id') is not None:
+            keys[index] = _parse_pk(Listing, item['property_id'])
+            if keys[index] is None:
+                results[index] = _failed(index, {'property_id': ["Must be a valid UUID."]})
+    existing = Listing.objects.in_bulk({pk for pk in keys.values() if pk is not None})
+
+    creates, updates, update_fields, seen = [], [], set(), set()
+    for index, item in enumerate(items):
+        if results[index] is not None:
+            continue
+        pk = keys.get(index)
+        instance = None
+        if pk is not None:
+            instance = existing.get(pk)
+            if instance is None or pk in seen:
+                problem = "Listing not found." if instance is None else "This listing appears earlier in the batch."
+                results[index] = _failed(index, {'property_id': [problem]}, property_id=str(pk))
+                continue
+            seen.add(pk)
+        try:
+            data = (updater if instance else creator).run_validation(item)
+        except serializers.ValidationError as exc:
+            results[index] = _failed(index, exc.detail, **({'property_id': str(pk)} if pk else {}))
+            continue
+        if instance is None:
+            instance = Listing(**data)
+        else:
+            for name, value in data.items():
+                setattr(instance, name, value)
+        try:
+            # host was checked against the preloaded hosts; the primary key is a fresh uuid4
+            instance.full_clean(exclude=['host'], validate_unique=False)
+        except DjangoValidationError as exc:
+            results[index] = _failed(index, exc.message_dict, **({'property_id': str(pk)} if pk else {}))
+            continue
+        if pk is None:
+            creates.append(instance)
+            results[index] = {'index': index, 'status': 'created', 'property_id': str(instance.pk)}
+        else:
+            updates.append(instance)
+            update_fields.update(data)
+            results[index] = {'index': index, 'status': 'updated', 'property_id': str(pk)}
+
+    with transaction.atomic():
+        if creates:
+            Listing.objects.bulk_create(creates, batch_size=WRITE_BATCH_SIZE)
+        if updates:
+            # bulk_update() skips auto_now, and the rating counters are never in update_fields
+            now = timezone.now()
+            for instance in updates:
+                instance.updated_at = now
+            Listing.objects.bulk_update(updates, sorted(update_fields | {'updated_at'}), batch_size=WRITE_BATCH_SIZE)
+        if creates or updates:
+            listing_cache.listings_changed([instance.pk for instance in creates + updates])
+    return results
+
+
+def _nights(ranges):
+    for night_range in ranges:
+        night = night_range['start']
+        while night < night_range['end']:
+            yield night
+            night += timedelta(days=1)
+
+
+def sync_calendars(items):
+    """
+    Applies host blocks to listing calendars. For each item the `release` ranges
+    free host-blocked nights first, then the `block` ranges take free nights.
+    Nights held by a booking are never touched; they come back as conflicts.
+    The listings are locked like Booking.objects.reserve() does, so a concurrent
+    reservation waits for the sync instead of racing it.
+    """
+    check_batch(items)
+    results = [None] * len(items)
+    validator = CalendarSyncSerializer()
+    parsed = {}
+    for index, item in enumerate(items):
+        try:
+            parsed[index] = validator.run_validation(item)
+        except serializers.ValidationError as exc:
+            results[index] = _failed(index, exc.detail)
+    ranges = [r for data in parsed.values() for r in data.get('block', []) + data.get('release', [])]
+
+    with transaction.atomic():
+        found = set(Listing.objects.select_for_update().filter(
+            pk__in={data['property_id'] for data in parsed.values()}).values_list('pk', flat=True))
+        # (listing, night) -> (ListingNight pk or None when created in this batch, booking id)
+        held = {}
+        if found and ranges:
+            nights = ListingNight.objects.filter(
+                listing_id__in=found,
+                night__gte=min(r['start'] for r in ranges), night__lt=max(r['end'] for r in ranges),
+            ).values_list('pk', 'listing_id', 'night', 'booking_id')
+            held = {(listing_id, night): (pk, booking_id) for pk, listing_id, night, booking_id in nights}
+
+        to_create, to_delete = {}, set()
+        for index, data in parsed.items():
+            listing_id = data['property_id']
+            if listing_id not in found:
+                results[index] = _failed(index, {'property_id': ["Listing not found."]}, property_id=str(listing_id))
+                continue
+            blocked = released = 0
+            conflicts = set()
+            for night in _nights(data.get('release', [])):
+                key = (listing_id, night)
+                if key not in held:
+                    continue
+                pk, booking_id = held[key]
+                if booking_id is not None:
+                    conflicts.add(night)
+                    continue
+                if pk is None:
+                    del to_create[key]
+                else:
+                    to_delete.add(pk)
+                del held[key]
+                released += 1
+            for night in _nights(data.get('block', [])):
+                key = (listing_id, night)
+                if key in held:
+                    if held[key][1] is not None:
+                        conflicts.add(night)
+                    continue
+                to_create[key] = ListingNight(listing_id=listing_id, night=night)
+                held[key] = (None, None)
+                blocked += 1
+            results[index] = {
+                'index': index, 'status': 'synced', 'property_id': str(listing_id),
+                'blocked': blocked, 'released': released, 'conflicts': sorted(conflicts),
+            }
+
+        if to_delete:
+            ListingNight.objects.filter(pk__in=to_delete).delete()
+        if to_create:
+            ListingNight.objects.bulk_create(to_create.values(), batch_size=WRITE_BATCH_SIZE)
+        if to_delete or to_create:
+            listing_cache.availability_changed()
+    return results
@@ -0,0 +1,108 @@
+"""
+Versioned response cache for the listing endpoints.
+
+Cached responses are never deleted. Each key embeds version tokens, and writes
+replace a token so the old keys stop being read and expire on their own:
+
+- listing:<pk>   bumped when that listing's own data (fields, rating aggregates) changes
+- collection     bumped whenever any listing changes; every list response depends on it
+- availability   bumped when nights are taken or released; only ?check_in= lists depend on it
+- catalogue      bumped by bulk writers (seed, import_dataset, recompute_ratings); every response depends on it
+
+Tokens are random rather than counters, so a token that is evicted and recreated
+can never reuse the key of an older response.
+"""
+import hashlib
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from . import replicas
+
+PREFIX = 'listing-cache'
+COLLECTION = 'collection'
+AVAILABILITY = 'availability'
+CATALOGUE = 'catalogue'
+# When a token was last replaced, see timeout()
+CHANGED_AT = f'{PREFIX}:changed-at'
+
+
+def _version_key(scope):
+    return f'{PREFIX}:v:{scope}'
+
+
+def listing_scope(pk):
+    return f'listing:{pk}'
+
+
+def versions(*scopes):
+    """Current token of each scope, creating missing ones; one cache round trip when all exist."""
+    keys = [_version_key(scope) for scope in scopes]
+    found = cache.get_many(keys)
+    tokens = []
+    for key in keys:
+        token = found.get(key)
+        if token is None:
+            cache.add(key, uuid.uuid4().hex, None)
+            token = cache.get(key)
+        tokens.append(token)
+    return tokens
+
+
+def bump(*scopes):
+    """Invalidates every response cached under these scopes once the transaction commits."""
+    def replace_tokens():
+        tokens = {_version_key(scope): uuid.uuid4().hex for scope in scopes}
+        cache.set_many({**tokens, CHANGED_AT: time.time()}, None)
+    transaction.on_commit(replace_tokens)
+
+
+def listing_changed(pk):
+    bump(listing_scope(pk), COLLECTION)
+
+
+def listings_changed(pks):
+    """listing_changed() for a batch, in one cache write."""
+    bump(*[listing_scope(pk) for pk in pks], COLLECTION)
+
+
+def availability_changed():
+    bump(AVAILABILITY)
+
+
+def catalogue_changed():
+    bump(CATALOGUE)
+
+
+def fingerprint(request):
+    """
+    Host, path, sorted query string and negotiated format: what the response body
+    depends on besides the data (pagination links are absolute URLs).
+    """
+    params = sorted(request.query_params.lists())
+    accepted = getattr(request, 'accepted_media_type', '')
+    raw = f'{request.get_host()}{request.path}?{params}|{accepted}'
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+def response_key(scopes, request):
+    """Cache key and ETag for a response that depends on `scopes`."""
+    tokens = versions(CATALOGUE, *scopes)
+    digest = hashlib.sha1(f"{fingerprint(request)}|{'|'.join(tokens)}".encode()).hexdigest()
+    return f'{PREFIX}:response:{digest}', f'"{digest}"'
+
+
+def timeout():
+    """
+    Seconds to keep a response built now; 0 doesn't store it. A response read from
+    a replica within the sticky window of a change may predate it, and under the
+    new tokens it would be served to the writer too, so it isn't stored.
+    """
+    if replicas.reading_replica():
+        changed_at = cache.get(CHANGED_AT)
+        if changed_at is not None and time.time() - changed_at < replicas.sticky_seconds():
+            return 0
+    return getattr(settings, 'LISTING_CACHE_TIMEOUT', 300)
@@ -0,0 +1,254 @@
+"""
+Streaming dataset dump/load helpers shared by the export_dataset and import_dataset
+management commands.
+
+Rows are read with keyset pagination on the primary key, so memory stays flat no
+matter how large a table is (MySQLdb buffers whole result sets even for .iterator()).
+Values are written as text that Field.to_python() understands, so a dump taken on
+one backend loads on any other.
+"""
+import csv
+import gzip
+import io
+import json
+import os
+import tempfile
+from datetime import date, datetime
+
+from django.db import connection, models
+from django.db.models import Q
+
+from .models import CustomUser, Listing, Booking, ListingNight, Payment, Review, Message
+
+# Import order: every model only points at models listed before it, except for the
+# Booking.booking_payment <-> Payment.booking_id cycle which is restored afterwards.
+DATASET_MODELS = [CustomUser, Listing, Booking, ListingNight, Payment, Review, Message]
+
+# Columns loaded in a second pass, once the rows they point at exist.
+DEFERRED_COLUMNS = {Booking: ['booking_payment_id']}
+
+NULL = '\\N'
+FORMATS = ('csv', 'ndjson')
+
+
+def model_key(model):
+    return model._meta.label_lower.replace('.', '-')
+
+
+def dataset_fields(model):
+    """Concrete columns of a model, primary key first."""
+    pk = model._meta.pk
+    return [pk] + [f for f in model._meta.concrete_fields if f is not pk]
+
+
+def encode(field, value):
+    """Turns a value from values_list() into text, or None for SQL NULL."""
+    if value is None:
+        return None
+    if isinstance(field, models.JSONField):
+        return json.dumps(value)
+    if isinstance(value, bool):
+        return '1' if value else '0'
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+
+def decode(field, text):
+    """Inverse of encode(): text back to the Python value the field expects."""
+    if text is None:
+        return None
+    if isinstance(field, models.JSONField):
+        return json.loads(text)
+    return field.to_python(text)
+
+
+def iter_rows(model, chunk_size=2000, queryset=None, order_field=None, first_chunk_size=None):
+    """
+    Yields encoded rows of a model ordered by primary key, one keyset page
+    (WHERE pk > last ORDER BY pk LIMIT chunk_size) at a time.
+    `queryset` narrows the rows; `order_field` walks them in (order_field, pk)
+    order instead, which an index on (order_field, pk) turns into a range scan
+    for filtered exports. A smaller `first_chunk_size` gets the first rows out sooner.
+    """
+    fields = dataset_fields(model)
+    attnames = [f.attname for f in fields]
+    pk_name = model._meta.pk.attname
+    keys = [order_field, pk_name] if order_field else [pk_name]
+    positions = [attnames.index(key) for key in keys]
+    if queryset is None:
+        queryset = model._default_manager.all()
+    queryset = queryset.order_by(*keys).values_list(*attnames)
+    last = None
+    limit = first_chunk_size or chunk_size
+    while True:
+        if last is None:
+            page = queryset
+        elif order_field:
+            page = queryset.filter(Q(**{f'{order_field}__gt': last[0]}) | Q(**{order_field: last[0], f'{pk_name}__gt': last[1]}))
+        else:
+            page = queryset.filter(**{f'{pk_name}__gt': last[0]})
+        rows = list(page[:limit])
+        if not rows:
+            return
+        for row in rows:
+            yield [encode(f, v) for f, v in zip(fields, row)]
+        last = [rows[-1][i] for i in positions]
+        limit = chunk_size
+
+
+def format_lines(fmt, columns, rows):
+    """
+    Yields a CSV (header first, NULL as \\N) or NDJSON rendering of encoded rows,
+    one line at a time.
+    """
+    if fmt == 'csv':
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+
+        def line(values):
+            writer.writerow(values)
+            text = buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            return text
+
+        yield line(columns)
+        for row in rows:
+            yield line([NULL if v is None else v for v in row])
+    else:
+        for row in rows:
+            yield json.dumps(dict(zip(columns, row))) + '\n'
+
+
+def write_part(path, fmt, columns, rows):
+    """Writes one gzip-compressed CSV or NDJSON part file; returns the row count."""
+    total = 0
+
+    def counted():
+        nonlocal total
+        for row in rows:
+            total += 1
+            yield row
+
+    with gzip.open(path, 'wt', encoding='utf-8', newline='') as fh:
+        fh.writelines(format_lines(fmt, columns, counted()))
+    return total
+
+
+def read_part(path, fmt, columns):
+    """Yields rows of a part file as lists of text values ordered like columns."""
+    with gzip.open(path, 'rt', encoding='utf-8', newline='') as fh:
+        if fmt == 'csv':
+            reader = csv.reader(fh)
+            header = next(reader)
+            order = [header.index(c) for c in columns]
+            for row in reader:
+                yield [None if row[i] == NULL else row[i] for i in order]
+        else:
+            for line in fh:
+                data = json.loads(line)
+                yield [data.get(c) for c in columns]
+
+
+def _load_data_value(value):
+    if value is None:
+        return NULL
+    if isinstance(value, bool):
+        return '1' if value else '0'
+    text = str(value)
+    return text.replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n').replace('\r', '\\r')
+
+
+class TableLoader:
+    """
+    Bulk-inserts decoded rows into a model's table. Uses MySQL's LOAD DATA LOCAL
+    INFILE when asked to (the connection needs local_infile enabled) and a batched
+    executemany() INSERT everywhere else.
+    """
+    def __init__(self, model, columns, method='executemany', batch_size=5000):
+        self.model = model
+        # get_field() accepts attnames such as host_id and returns the FK field
+        self.fields = [model._meta.get_field(c) for c in columns]
+        self.columns = columns
+        self.method = method
+        self.batch_size = batch_size
+        self.table = connection.ops.quote_name(model._meta.db_table)
+        self.column_sql = ', '.join(connection.ops.quote_name(f.column) for f in self.fields)
+
+    def prepare(self, row):
+        return [f.get_db_prep_save(decode(f, v), connection) for f, v in zip(self.fields, row)]
+
+    def load(self, rows):
+        """Loads an iterable of text rows; returns the number of rows written."""
+        if self.method == 'load-data':
+            return self._load_data(rows)
+        return self._executemany(rows)
+
+    def _executemany(self, rows):
+        sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+            self.table, self.column_sql, ', '.join(['%s'] * len(self.columns)))
+        total = 0
+        batch = []
+        with connection.cursor() as cursor:
+            for row in rows:
+                batch.append(self.prepare(row))
+                if len(batch) >= self.batch_size:
+                    cursor.executemany(sql, batch)
+                    total += len(batch)
+                    batch = []
+            if batch:
+                cursor.executemany(sql, batch)
+                total += len(batch)
+        return total
+
+    def _load_data(self, rows):
+        total = 0
+        with tempfile.NamedTemporaryFile('w', suffix='.tsv', encoding='utf-8', delete=False) as fh:
+            for row in rows:
+                fh.write('\t'.join(_load_data_value(v) for v in self.prepare(row)))
+                fh.write('\n')
+                total += 1
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"LOAD DATA LOCAL INFILE %s INTO TABLE {self.table} CHARACTER SET utf8mb4 "
+                    f"FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\' LINES TERMINATED BY '\\n' "
+                    f"({self.column_sql})",
+                    [fh.name],
+                )
+        finally:
+            os.unlink(fh.name)
+        return total
+
+
+def restore_deferred(model, column, rows, pk_index, column_index, batch_size=5000):
+    """
+    Second pass for a deferred column: sets it from the dump with batched UPDATEs,
+    skipping rows where it is NULL.
+    """
+    pk = model._meta.pk
+    field = model._meta.get_field(column)
+    sql = 'UPDATE {} SET {} = %s WHERE {} = %s'.format(
+        connection.ops.quote_name(model._meta.db_table),
+        connection.ops.quote_name(field.column),
+        connection.ops.quote_name(pk.column),
+    )
+    total = 0
+    batch = []
+    with connection.cursor() as cursor:
+        for row in rows:
+            if row[column_index] is None:
+                continue
+            batch.append([
+                field.get_db_prep_save(decode(field, row[column_index]), connection),
+                pk.get_db_prep_save(decode(pk, row[pk_index]), connection),
+            ])
+            if len(batch) >= batch_size:
+                cursor.executemany(sql, batch)
+                total += len(batch)
+                batch = []
+        if batch:
+            cursor.executemany(sql, batch)
+            total += len(batch)
+    return total
@@ -0,0 +1,126 @@
+"""
+Push channel for new messages and booking status changes, served as Server-Sent
+Events by views.event_stream under ASGI so clients stop polling the list endpoints.
+
+Writers call publish() inside their transaction; the event goes out once it
+commits, to one channel per user concerned. The broker named by the EVENTS_BROKER
+setting fans events out to the open streams. The default LocalBroker does it in
+process with asyncio queues, which is enough for a single ASGI worker. Several
+workers need a broker shared between processes, e.g. one on Redis pub/sub. It
+only has to provide the same publish() and subscribe() as LocalBroker.
+
+Events are not stored: a client that was disconnected refetches its inbox and
+bookings when the stream (re)opens with its `ready` event.
+"""
+import asyncio
+import itertools
+import json
+import threading
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+# Events a stream may fall behind by before it is reset
+SUBSCRIBER_QUEUE_SIZE = 100
+# Seconds between SSE comments that keep idle connections open through proxies
+KEEPALIVE = 15
+# Sent in place of the missed events to a subscriber whose queue overflowed
+RESET = {'event': 'reset', 'data': {}}
+
+
+def user_channel(pk):
+    return f'user:{pk}'
+
+
+class Subscription:
+    """Queue of one stream, filled from any thread by LocalBroker.publish()."""
+    def __init__(self, broker, channels):
+        self.broker = broker
+        self.channels = channels
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(SUBSCRIBER_QUEUE_SIZE)
+        self.overflowed = False
+
+    def deliver(self, event):
+        # Runs on the subscriber's loop
+        if self.queue.full():
+            self.overflowed = True
+        else:
+            self.queue.put_nowait(event)
+
+    async def get(self):
+        if self.overflowed:
+            return RESET
+        return await self.queue.get()
+
+    async def __aenter__(self):
+        self.broker.add(self)
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.broker.remove(self)
+
+
+class LocalBroker:
+    """In-process fan-out from publishing threads to the streams on the ASGI event loop."""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.subscribers = {}
+        self.ids = itertools.count(1)
+
+    def subscribe(self, *channels):
+        """Async context manager: `async with broker.subscribe(...) as s: event = await s.get()`."""
+        return Subscription(self, channels)
+
+    def add(self, subscription):
+        with self.lock:
+            for channel in subscription.channels:
+                self.subscribers.setdefault(channel, set()).add(subscription)
+
+    def remove(self, subscription):
+        with self.lock:
+            for channel in subscription.channels:
+                subscribers = self.subscribers.get(channel)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self.subscribers[channel]
+
+    def publish(self, channel, event):
+        event = dict(event, id=next(self.ids))
+        with self.lock:
+            subscribers = list(self.subscribers.get(channel, ()))
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.deliver, event)
+            except RuntimeError:
+                # The loop has closed; the stream is gone
+                self.remove(subscription)
+
+
+@lru_cache(maxsize=None)
+def broker():
+    return import_string(getattr(settings, 'EVENTS_BROKER', 'listings.events.LocalBroker'))()
+
+
+def publish(event, data, user_ids):
+    """Sends `event` to the channels of `user_ids` once the current transaction commits."""
+    payload = {'event': event, 'data': data}
+    channels = [user_channel(pk) for pk in dict.fromkeys(user_ids) if pk is not None]
+
+    def send():
+        for channel in channels:
+            broker().publish(channel, payload)
+    transaction.on_commit(send)
+
+
+def format_sse(event):
+    """One event in the text/event-stream format."""
+    lines = [f"event: {event['event']}"]
+    if 'id' in event:
+        lines.append(f"id: {event['id']}")
+    lines.append(f"data: {json.dumps(event['data'], cls=DjangoJSONEncoder)}")
+    return '\n'.join(lines) + '\n\n'
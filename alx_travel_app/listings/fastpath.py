@@ -0,0 +1,232 @@
+"""
+Read-only fast path for the large list endpoints.
+
+plan_for() walks a ModelSerializer, shaped by its ?fields= and ?expand= trees,
+once and compiles its readable fields into a flat plan: the .values() columns to
+fetch, following expanded relations through their joins, and per output key the
+column plus the conversion DRF would apply to it. Plan.render() then turns the
+value rows of a page into plain dicts without instantiating serializers or model
+instances, and Plan.narrow() trims a model queryset to the same columns and joins
+for the endpoints that still serialize instances.
+
+Only field kinds whose output can be reproduced exactly are compiled; anything
+else raises ImproperlyConfigured when the plan is built. FastReadParityTests in
+tests.py compares the output with the serializers.
+"""
+from decimal import Decimal
+
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured
+from rest_framework import ISO_8601, serializers
+from rest_framework.fields import empty
+from rest_framework.settings import api_settings
+
+from .models import RATING_VALUES, Listing
+
+VALUE, NESTED, FILE, DERIVED, DATETIME, DECIMAL, ANNOTATION = range(7)
+
+# Serializer fields whose to_representation() returns database values unchanged
+PASSTHROUGH = (serializers.CharField, serializers.IntegerField, serializers.ReadOnlyField)
+
+# Model properties a plan rebuilds from columns: (model, attribute) -> (columns, function of their values)
+DERIVED_ATTRIBUTES = {
+    (Listing, 'rating_histogram'): (
+        [f'rating_{i}' for i in RATING_VALUES], lambda *counts: dict(zip(RATING_VALUES, counts))
+    ),
+}
+
+# Plans are cached per serializer shape; valid shapes are bounded by the schema, but
+# the cache is still capped
+MAX_PLANS = 256
+_plans = {}
+
+
+class Plan:
+    def __init__(self, columns, steps, joins, relations, annotations):
+        self.columns = columns
+        self.steps = steps
+        # select_related() paths, and the foreign keys they traverse, which only() must keep
+        self.joins = joins
+        self.relations = relations
+        # Read-only fields filled by queryset annotations; rendered only when the rows carry them
+        self.annotations = annotations
+
+    def narrow(self, queryset, extra=()):
+        """`queryset` selecting only this plan's columns and joins, plus `extra` columns."""
+        queryset = queryset.select_related(None)
+        if self.joins:
+            queryset = queryset.select_related(*self.joins)
+        return queryset.only(*dict.fromkeys([*self.columns, *self.relations, *extra]))
+
+    def render(self, rows, request=None):
+        """Output dicts for an iterable of .values() rows of this plan's columns."""
+        urls = {}
+        zones = {}
+
+        def iso_datetime(field, value):
+            # DateTimeField.to_representation() with the active timezone looked up once per page
+            if field not in zones:
+                zones[field] = field.timezone if hasattr(field, 'timezone') else field.default_timezone()
+            zone = zones[field]
+            if zone is None or value.utcoffset() is None:
+                return field.to_representation(value)
+            text = value.astimezone(zone).isoformat()
+            return text[:-6] + 'Z' if text.endswith('+00:00') else text
+
+        def file_url(field, name):
+            # Most users share the default profile image; build each URL once per page
+            key = (field, name)
+            if key not in urls:
+                url = field.storage.url(name)
+                urls[key] = request.build_absolute_uri(url) if request is not None else url
+            return urls[key]
+
+        def plain_decimal(convert, value):
+            # Column values already carry the field's scale, so quantize() would return them unchanged
+            field, as_string = convert
+            digits = value.as_tuple() if isinstance(value, Decimal) else None
+            if digits is None or digits.exponent != -field.decimal_places or len(digits.digits) > field.max_digits:
+                return field.to_representation(value)
+            return f'{value:f}' if as_string else value
+
+        def build(steps, row):
+            out = {}
+            for key, kind, column, convert in steps:
+                if kind == VALUE:
+                    value = row[column]
+                    out[key] = value if value is None or convert is None else convert(value)
+                elif kind == DATETIME:
+                    value = row[column]
+                    out[key] = None if value is None else iso_datetime(convert, value)
+                elif kind == DECIMAL:
+                    value = row[column]
+                    out[key] = None if value is None else plain_decimal(convert, value)
+                elif kind == ANNOTATION:
+                    if column in row:
+                        value = row[column]
+                        out[key] = None if value is None else convert(value)
+                elif kind == NESTED:
+                    out[key] = None if row[column] is None else build(convert, row)
+                elif kind == FILE:
+                    name = row[column]
+                    if not name:
+                        out[key] = None
+                    else:
+                        out[key] = file_url(convert, name) if convert is not None else name
+                else:
+                    value = convert[0](*[row[c] for c in column])
+                    out[key] = None if value is None else convert[1](value)
+            return out
+
+        return [build(self.steps, row) for row in rows]
+
+
+def _passthrough(field):
+    if isinstance(field, serializers.ChoiceField):
+        # Maps str(value) back to the choice key, which is the value itself for string keys
+        return all(isinstance(choice, str) for choice in field.choices)
+    if isinstance(field, serializers.JSONField):
+        return not field.binary
+    return isinstance(field, PASSTHROUGH)
+
+
+def _iso_format(field):
+    output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+    return isinstance(output_format, str) and output_format.lower() == ISO_8601
+
+
+def _plain_decimal(field):
+    return (field.decimal_places is not None and field.max_digits is not None
+            and not field.normalize_output and not field.localize)
+
+
+def _compile(serializer, prefix, columns, joins, relations, annotations):
+    model = serializer.Meta.model
+    steps = []
+    for key, field in serializer.fields.items():
+        if field.write_only:
+            continue
+        where = f'{type(serializer).__name__}.{key}'
+        if len(field.source_attrs) != 1:
+            raise ImproperlyConfigured(f"{where}: dotted and '*' sources are not supported by the fast path.")
+        source = field.source
+
+        if isinstance(field, serializers.BaseSerializer):
+            if isinstance(field, serializers.ListSerializer):
+                raise ImproperlyConfigured(f"{where}: many=True is not supported by the fast path.")
+            related = f'{prefix}{source}__'
+            pk_column = related + field.Meta.model._meta.pk.attname
+            columns.append(pk_column)
+            joins.append(prefix + source)
+            if model._meta.get_field(source).concrete:
+                relations.append(prefix + source)
+            steps.append((key, NESTED, pk_column, _compile(field, related, columns, joins, relations, annotations)))
+            continue
+
+        derived = DERIVED_ATTRIBUTES.get((model, source))
+        if derived is not None:
+            derived_columns = [prefix + c for c in derived[0]]
+            columns.extend(derived_columns)
+            steps.append((key, DERIVED, derived_columns, (derived[1], field.to_representation)))
+            continue
+
+        try:
+            model_field = model._meta.get_field(source)
+        except FieldDoesNotExist:
+            if field.read_only and not field.required and field.default is empty:
+                # Annotation-only fields such as distance_km: DRF skips them when absent
+                if not prefix:
+                    annotations.append(source)
+                    steps.append((key, ANNOTATION, source, field.to_representation))
+                continue
+            raise ImproperlyConfigured(f"{where}: '{source}' is neither a column nor a known derived attribute.")
+        if not model_field.concrete and not (model_field.one_to_one and isinstance(field, serializers.PrimaryKeyRelatedField)):
+            raise ImproperlyConfigured(f"{where}: reverse and many-to-many relations are not supported by the fast path.")
+
+        column = prefix + model_field.name
+        if not model_field.concrete:
+            # Key of a reverse one-to-one, e.g. Booking.payment: read through the join
+            joins.append(column)
+            column = f'{column}__{model_field.related_model._meta.pk.attname}'
+        columns.append(column)
+        if isinstance(field, serializers.PrimaryKeyRelatedField):
+            # .values() yields the key itself, which is what DRF renders
+            convert = field.pk_field.to_representation if field.pk_field is not None else None
+            steps.append((key, VALUE, column, convert))
+        elif isinstance(field, serializers.FileField):
+            use_url = getattr(field, 'use_url', api_settings.UPLOADED_FILES_USE_URL)
+            steps.append((key, FILE, column, model_field if use_url else None))
+        elif isinstance(field, serializers.DateTimeField) and _iso_format(field):
+            steps.append((key, DATETIME, column, field))
+        elif isinstance(field, serializers.DecimalField) and _plain_decimal(field):
+            as_string = getattr(field, 'coerce_to_string', api_settings.COERCE_DECIMAL_TO_STRING)
+            steps.append((key, DECIMAL, column, (field, as_string)))
+        elif _passthrough(field):
+            steps.append((key, VALUE, column, None))
+        else:
+            steps.append((key, VALUE, column, field.to_representation))
+    return steps
+
+
+def _freeze(tree):
+    return tuple(sorted((name, _freeze(subtree)) for name, subtree in tree.items()))
+
+
+def plan_for(serializer):
+    """
+    The compiled plan of a serializer built by a view: its class shaped by the
+    field and expand trees it read from the request. Raises the serializer's
+    ValidationError for unknown ?fields= or ?expand= names.
+    """
+    field_tree = getattr(serializer, 'field_tree', {})
+    expand_tree = getattr(serializer, 'expand_tree', {})
+    key = (type(serializer), _freeze(field_tree), _freeze(expand_tree))
+    plan = _plans.get(key)
+    if plan is None:
+        columns, joins, relations, annotations = [], [], [], []
+        # A context-free copy, so the cached plan keeps no reference to this request
+        shaped = type(serializer)(fields=field_tree, expand=expand_tree) if hasattr(serializer, 'field_tree') else type(serializer)()
+        steps = _compile(shaped, '', columns, joins, relations, annotations)
+        if len(_plans) >= MAX_PLANS:
+            _plans.clear()
+        plan = _plans[key] = Plan(list(dict.fromkeys(columns)), steps, list(dict.fromkeys(joins)), relations, annotations)
+    return plan
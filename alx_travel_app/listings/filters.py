@@ -0,0 +1,209 @@
+import re
+from datetime import datetime, time, timedelta
+from decimal import Decimal, InvalidOperation
+
+from django.db import connection
+from django.db.models import F, FloatField, Func, Value
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend, SearchFilter
+
+
+def stay_dates(request, start_param='check_in', end_param='check_out', required=False):
+    """
+    Reads a [check_in, check_out) pair of YYYY-MM-DD query parameters.
+    Returns (None, None) when both are absent and they are optional.
+    """
+    raw_start = request.query_params.get(start_param)
+    raw_end = request.query_params.get(end_param)
+    if not raw_start and not raw_end and not required:
+        return None, None
+    try:
+        start, end = parse_date(raw_start or ''), parse_date(raw_end or '')
+    except ValueError:
+        start = end = None
+    if start is None or end is None:
+        raise ValidationError({start_param: "Both dates are required as YYYY-MM-DD.", end_param: "Both dates are required as YYYY-MM-DD."})
+    if end <= start:
+        raise ValidationError({end_param: f"{end_param} must be after {start_param}."})
+    return start, end
+
+
+def _midnight(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def day_range(request, start_param='from', end_param='to'):
+    """
+    Reads optional ?from=&to= YYYY-MM-DD days, both inclusive, as [start, end)
+    aware datetimes at local midnight so a timestamp index can serve the range.
+    Either bound may be None.
+    """
+    bounds = []
+    for param in (start_param, end_param):
+        raw = request.query_params.get(param)
+        try:
+            day = parse_date(raw) if raw else None
+        except ValueError:
+            day = None
+        if raw and day is None:
+            raise ValidationError({param: "A date is required as YYYY-MM-DD."})
+        bounds.append(day)
+    start, end = bounds
+    if start and end and end < start:
+        raise ValidationError({end_param: f"{end_param} must not be before {start_param}."})
+    return (_midnight(start) if start else None), (_midnight(end + timedelta(days=1)) if end else None)
+
+
+def _decimal_param(request, name):
+    raw = request.query_params.get(name)
+    if not raw:
+        return None
+    try:
+        value = Decimal(raw)
+    except InvalidOperation:
+        raise ValidationError({name: "A number is required."})
+    if not value.is_finite() or value < 0:
+        raise ValidationError({name: "A non-negative number is required."})
+    return value
+
+
+def _int_param(request, name):
+    raw = request.query_params.get(name)
+    if not raw:
+        return None
+    try:
+        value = int(raw)
+    except ValueError:
+        raise ValidationError({name: "A whole number is required."})
+    if value < 1:
+        raise ValidationError({name: "Must be at least 1."})
+    return value
+
+
+class ListingFilter(BaseFilterBackend):
+    """
+    Structured listing filters:
+    ?min_price=&max_price=   price_per_night range (inclusive)
+    ?guests=                 capacity of at least this many guests
+    ?location=               exact location, e.g. Diani
+    ?amenities=wifi,pool     every listed amenity set to true
+    ?check_in=&check_out=    free for the whole stay (list action only)
+    Location and price ride the (location, price_per_night) and
+    (capacity, price_per_night) indexes; amenities are checked on the rows those leave.
+    """
+    def filter_queryset(self, request, queryset, view):
+        min_price = _decimal_param(request, 'min_price')
+        max_price = _decimal_param(request, 'max_price')
+        if min_price is not None and max_price is not None and max_price < min_price:
+            raise ValidationError({'max_price': "max_price must not be below min_price."})
+        if min_price is not None:
+            queryset = queryset.filter(price_per_night__gte=min_price)
+        if max_price is not None:
+            queryset = queryset.filter(price_per_night__lte=max_price)
+
+        guests = _int_param(request, 'guests')
+        if guests is not None:
+            queryset = queryset.filter(capacity__gte=guests)
+
+        location = request.query_params.get('location', '').strip()
+        if location:
+            queryset = queryset.filter(location=location)
+
+        amenities = [a.strip() for a in request.query_params.get('amenities', '').split(',') if a.strip()]
+        for amenity in amenities:
+            if not re.fullmatch(r'\w+', amenity):
+                raise ValidationError({'amenities': f"Unknown amenity '{amenity}'."})
+            queryset = queryset.filter(**{f'amenities__{amenity}': True})
+
+        if getattr(view, 'action', None) == 'list':
+            check_in, check_out = stay_dates(request)
+            if check_in:
+                queryset = queryset.available_between(check_in, check_out)
+        return queryset
+
+
+# ?radius= default and ceiling, in km
+NEAR_DEFAULT_RADIUS = 25
+NEAR_MAX_RADIUS = 300
+
+
+class ListingProximityFilter(BaseFilterBackend):
+    """
+    ?near=lat,lng[&radius=km] keeps listings within radius km of the point,
+    nearest first, with the distance as distance_km. Runs after the search
+    backend so distance, not relevance, decides the order.
+    """
+    def filter_queryset(self, request, queryset, view):
+        raw = request.query_params.get('near')
+        if not raw:
+            return queryset
+        try:
+            latitude, longitude = (float(part) for part in raw.split(','))
+        except ValueError:
+            raise ValidationError({'near': "Expected near=latitude,longitude in decimal degrees."})
+        if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+            raise ValidationError({'near': "Latitude must be within ±90 and longitude within ±180."})
+        radius = _decimal_param(request, 'radius')
+        radius = NEAR_DEFAULT_RADIUS if radius is None else float(radius)
+        if not 0 < radius <= NEAR_MAX_RADIUS:
+            raise ValidationError({'radius': f"radius must be above 0 and at most {NEAR_MAX_RADIUS} km."})
+        return queryset.near(latitude, longitude, radius)
+
+
+# Columns covered by the listing_fulltext index (migration 0007); MATCH() must name exactly these
+LISTING_FULLTEXT_COLUMNS = ('name', 'description', 'location')
+
+
+class FullTextMatch(Func):
+    """
+    MySQL MATCH (columns) AGAINST (query IN BOOLEAN MODE). Evaluates to the
+    relevance score, which is 0 for rows that do not match.
+    """
+    output_field = FloatField()
+
+    def __init__(self, columns, query):
+        super().__init__(*[F(c) for c in columns], Value(query))
+
+    def as_sql(self, compiler, connection, **extra_context):
+        *columns, query = self.get_source_expressions()
+        column_sql, params = [], []
+        for column in columns:
+            sql, column_params = compiler.compile(column)
+            column_sql.append(sql)
+            params.extend(column_params)
+        query_sql, query_params = compiler.compile(query)
+        return f"MATCH ({', '.join(column_sql)}) AGAINST ({query_sql} IN BOOLEAN MODE)", params + query_params
+
+
+# InnoDB's default innodb_ft_min_token_size; shorter words are not in the index
+FULLTEXT_MIN_WORD = 3
+
+
+def boolean_mode_query(terms):
+    """
+    Every term required, matched as a prefix: 'beach vil' -> '+beach* +vil*'.
+    Boolean-mode operators in user input and words too short to be indexed are dropped.
+    """
+    words = [w for term in terms for w in re.findall(r'\w+', term) if len(w) >= FULLTEXT_MIN_WORD]
+    return ' '.join(f'+{w}*' for w in words)
+
+
+class ListingSearchFilter(SearchFilter):
+    """
+    ?search= over name, description and location. On MySQL it is answered by the
+    FULLTEXT index and ranked by relevance; other backends fall back to the
+    icontains search on the view's search_fields.
+    """
+    def filter_queryset(self, request, queryset, view):
+        if connection.vendor != 'mysql':
+            return super().filter_queryset(request, queryset, view)
+        terms = self.get_search_terms(request)
+        query = boolean_mode_query(terms)
+        if not query:
+            # Nothing indexable, e.g. ?search=2b; a short LIKE is still correct
+            return super().filter_queryset(request, queryset, view)
+        return queryset.alias(
+            relevance=FullTextMatch(LISTING_FULLTEXT_COLUMNS, query)
+        ).filter(relevance__gt=0).order_by('-relevance', '-created_at')
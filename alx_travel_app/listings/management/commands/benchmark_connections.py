@@ -0,0 +1,63 @@
+from django.core.management.base import CommandError
+from listings.models import CustomUser
+from .benchmark_servers import Command as BenchmarkServers
+import asyncio
+import sys
+
+import httpx
+
+
+class Command(BenchmarkServers):
+    help = ("Compares request latency under gunicorn with a new MySQL connection per request, persistent "
+            "per-thread connections (CONN_MAX_AGE) and the pooled backend (DB_POOL_SIZE), on DB-bound endpoints")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=2, help='gunicorn worker processes')
+        parser.add_argument('--threads', type=int, default=8, help='Threads per worker')
+        parser.add_argument('--pool-size', type=int, default=4,
+                            help='Connections per worker in the pooled run; fewer than --threads shows the waits')
+        parser.add_argument('--concurrency', type=int, default=32, help='Requests in flight at once')
+        parser.add_argument('--requests', type=int, default=1000, help='Requests per endpoint')
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--spread', type=int, default=200,
+                            help='Distinct listings the requests rotate over, so most miss the response cache')
+
+    def pool_metrics(self, base_url, cookies):
+        """The /api/db-pool/ answer of whichever worker takes the request."""
+        response = httpx.get(f'{base_url}/api/db-pool/', cookies=cookies, timeout=30)
+        response.raise_for_status()
+        return response.json()
+
+    def handle(self, *args, **kwargs):
+        port = kwargs['port']
+        concurrency = max(kwargs['concurrency'], 1)
+        # The availability and inbox reads are not served from the response cache
+        targets = {name: paths[0] for name, paths in self.paths(max(kwargs['spread'], 1)).items()
+                   if name in ('listing detail', 'availability', 'inbox')}
+        cookies = self.session_cookie()
+        admin = CustomUser.objects.filter(is_staff=True).first()
+        if admin is None:
+            raise CommandError("No staff user to read /api/db-pool/ with; run `manage.py createsuperuser` first.")
+        admin_cookies = self.session_cookie(admin)
+        bind = f'127.0.0.1:{port}'
+        command = [sys.executable, '-m', 'gunicorn', 'alx_travel_app.wsgi:application', '--bind', bind,
+                   '--workers', str(max(kwargs['workers'], 1)), '--threads', str(max(kwargs['threads'], 1))]
+        runs = [
+            ('no reuse', {'DB_POOL_SIZE': '0', 'DB_CONN_MAX_AGE': '0'}),
+            ('persistent', {'DB_POOL_SIZE': '0', 'DB_CONN_MAX_AGE': '600'}),
+            ('pooled', {'DB_POOL_SIZE': str(max(kwargs['pool_size'], 1))}),
+        ]
+        self.stdout.write(f"{kwargs['workers']} worker(s) x {kwargs['threads']} threads, "
+                          f"{concurrency} concurrent requests, {kwargs['requests']} per endpoint")
+        for label, overrides in runs:
+            server = self.start(command, port, **overrides)
+            try:
+                for endpoint, paths in targets.items():
+                    elapsed, latencies, errors = asyncio.run(
+                        self.load(f'http://{bind}', paths, kwargs['requests'], concurrency, cookies))
+                    self.report(label, endpoint, elapsed, latencies, errors)
+                self.stdout.write(f"  {label:<12} connections     {self.pool_metrics(f'http://{bind}', admin_cookies)}")
+            finally:
+                server.terminate()
+                server.wait(timeout=30)
+        self.stdout.write(self.style.SUCCESS("Done; connection stats are from one worker process"))
@@ -0,0 +1,134 @@
+from django.conf import settings
+from django.contrib.auth import SESSION_KEY, BACKEND_SESSION_KEY, HASH_SESSION_KEY
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from listings.models import CustomUser, Listing
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+STAY = 'check_in=2025-06-01&check_out=2025-06-08'
+
+
+class Command(BaseCommand):
+    help = ("Compares the concurrent-request throughput of the WSGI (gunicorn) and ASGI (uvicorn) servers "
+            "on the listing list/detail, availability and inbox endpoints, with the same worker count")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=2, help='Worker processes of each server')
+        parser.add_argument('--threads', type=int, default=1, help='Threads per gunicorn worker')
+        parser.add_argument('--concurrency', type=int, default=50, help='Requests in flight at once')
+        parser.add_argument('--requests', type=int, default=1000, help='Requests per endpoint')
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--spread', type=int, default=200,
+                            help='Distinct listings (and list pages) the requests rotate over, so most miss the response cache')
+
+    def paths(self, spread):
+        """name -> (sync paths, async paths) to rotate over."""
+        listing_ids = list(Listing.objects.order_by('-created_at').values_list('pk', flat=True)[:spread])
+        if not listing_ids:
+            raise CommandError("No listings; run `manage.py seed` first.")
+        pages = range(1, max(Listing.objects.count() // 50, 1) + 1)
+        targets = {
+            'listing list': [f'property/?page={page}' for page in list(pages)[:spread]],
+            'listing detail': [f'property/{pk}/' for pk in listing_ids],
+            'availability': [f'property/{pk}/availability/?{STAY}' for pk in listing_ids],
+            'inbox': ['messages/inbox/'],
+        }
+        return {name: ([f'/api/{p}' for p in paths], [f'/api/async/{p}' for p in paths]) for name, paths in targets.items()}
+
+    def session_cookie(self, user=None):
+        """A session for `user`, by default the one with the most received messages, so the inbox pages are full."""
+        if user is None:
+            user = CustomUser.objects.annotate(received=Count('received_messages')).order_by('-received').first()
+        session = SessionStore()
+        session[SESSION_KEY] = str(user.pk)
+        session[BACKEND_SESSION_KEY] = 'django.contrib.auth.backends.ModelBackend'
+        session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+        session.create()
+        return {settings.SESSION_COOKIE_NAME: session.session_key}
+
+    def start(self, command, port, **overrides):
+        """Starts `command` with the environment plus `overrides` and waits until it accepts connections."""
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=os.environ.get('DJANGO_SETTINGS_MODULE', 'alx_travel_app.settings'),
+                   **overrides)
+        server = subprocess.Popen(command, cwd=settings.BASE_DIR, env=env,
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                raise CommandError(f"{command[2]} exited: {server.stderr.read().decode()[-2000:]}")
+            try:
+                socket.create_connection(('127.0.0.1', port), timeout=0.2).close()
+                return server
+            except OSError:
+                time.sleep(0.2)
+        server.kill()
+        raise CommandError(f"{command[2]} did not start listening on port {port}")
+
+    async def load(self, base_url, paths, total, concurrency, cookies):
+        """Sends `total` GETs rotating over `paths`, `concurrency` at a time; returns (seconds, latencies, errors)."""
+        latencies, errors = [], 0
+        sent = iter(range(total))
+        limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+        async with httpx.AsyncClient(base_url=base_url, cookies=cookies, limits=limits, timeout=60) as client:
+            # Warm-up: one request per worker connection, not measured
+            await asyncio.gather(*(client.get(paths[i % len(paths)]) for i in range(concurrency)))
+
+            async def worker():
+                nonlocal errors
+                for i in sent:
+                    started = time.perf_counter()
+                    try:
+                        response = await client.get(paths[i % len(paths)])
+                        ok = response.status_code == 200
+                    except httpx.HTTPError:
+                        ok = False
+                    latencies.append(time.perf_counter() - started)
+                    errors += not ok
+
+            started = time.perf_counter()
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
+            return time.perf_counter() - started, latencies, errors
+
+    def report(self, server, endpoint, elapsed, latencies, errors):
+        latencies.sort()
+        p95 = latencies[min(int(len(latencies) * 0.95), len(latencies) - 1)]
+        self.stdout.write(
+            f"  {server:<12} {endpoint:<15} {len(latencies) / elapsed:>9,.0f} req/s"
+            f"   p50 {statistics.median(latencies) * 1000:>7.1f} ms   p95 {p95 * 1000:>7.1f} ms   errors {errors}"
+        )
+
+    def handle(self, *args, **kwargs):
+        workers, port = max(kwargs['workers'], 1), kwargs['port']
+        concurrency = max(kwargs['concurrency'], 1)
+        targets = self.paths(max(kwargs['spread'], 1))
+        cookies = self.session_cookie()
+        bind = f'127.0.0.1:{port}'
+        servers = [
+            ('wsgi', [sys.executable, '-m', 'gunicorn', 'alx_travel_app.wsgi:application', '--bind', bind,
+                      '--workers', str(workers), '--threads', str(max(kwargs['threads'], 1))], 0),
+            ('asgi', [sys.executable, '-m', 'uvicorn', 'alx_travel_app.asgi:application', '--port', str(port),
+                      '--workers', str(workers), '--no-access-log', '--log-level', 'warning'], 0),
+            ('asgi async', [sys.executable, '-m', 'uvicorn', 'alx_travel_app.asgi:application', '--port', str(port),
+                            '--workers', str(workers), '--no-access-log', '--log-level', 'warning'], 1),
+        ]
+        self.stdout.write(f"{workers} worker(s), {concurrency} concurrent requests, {kwargs['requests']} per endpoint")
+        for label, command, variant in servers:
+            server = self.start(command, port)
+            try:
+                for endpoint, paths in targets.items():
+                    elapsed, latencies, errors = asyncio.run(
+                        self.load(f'http://{bind}', paths[variant], kwargs['requests'], concurrency, cookies))
+                    self.report(label, endpoint, elapsed, latencies, errors)
+            finally:
+                server.terminate()
+                server.wait(timeout=30)
+        self.stdout.write(self.style.SUCCESS("Done; 'asgi' serves the sync endpoints, 'asgi async' the /api/async/ ones"))
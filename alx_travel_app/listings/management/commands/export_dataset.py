@@ -0,0 +1,54 @@
+from django.core.management.base import BaseCommand
+from listings.datasets import DATASET_MODELS, FORMATS, dataset_fields, iter_rows, model_key, write_part
+from listings.replicas import replica_reads
+from itertools import chain, islice
+import json
+import os
+import time
+
+
+class Command(BaseCommand):
+    help = 'Streams the travel dataset to chunked, gzip-compressed CSV or NDJSON files'
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', help='Directory to write the dump to')
+        parser.add_argument('--format', choices=FORMATS, default='csv', help='File format of the parts')
+        parser.add_argument('--rows-per-file', type=int, default=100000, help='Rows per compressed part file')
+        parser.add_argument('--chunk-size', type=int, default=2000, help='Rows fetched per keyset query')
+
+    def handle(self, *args, **kwargs):
+        # A full read of every table; keep it off the primary when there is a replica
+        with replica_reads():
+            self.export(**kwargs)
+
+    def export(self, **kwargs):
+        output = kwargs['output']
+        fmt = kwargs['format']
+        rows_per_file = max(kwargs['rows_per_file'], 1)
+        os.makedirs(output, exist_ok=True)
+
+        manifest = {'format': fmt, 'models': []}
+        for model in DATASET_MODELS:
+            started = time.perf_counter()
+            columns = [f.attname for f in dataset_fields(model)]
+            rows = iter_rows(model, chunk_size=max(kwargs['chunk_size'], 1))
+            entry = {'model': model._meta.label, 'columns': columns, 'files': [], 'rows': 0}
+            while True:
+                first = next(rows, None)
+                if first is None:
+                    break
+                name = f"{model_key(model)}-{len(entry['files']):05d}.{fmt}.gz"
+                entry['rows'] += write_part(
+                    os.path.join(output, name), fmt, columns,
+                    chain([first], islice(rows, rows_per_file - 1))
+                )
+                entry['files'].append(name)
+            manifest['models'].append(entry)
+            elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f"  {model._meta.label}: {entry['rows']} rows in {len(entry['files'])} file(s), {elapsed:.2f}s"
+            )
+
+        with open(os.path.join(output, 'manifest.json'), 'w') as fh:
+            json.dump(manifest, fh, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"Dataset exported to {output}"))
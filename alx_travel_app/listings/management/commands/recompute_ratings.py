@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from listings.models import Listing
+import time
+
+
+class Command(BaseCommand):
+    help = "Rebuilds every listing's rating count, sum, average and histogram from its approved reviews"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--listing', action='append', default=[], help='Only this property_id (repeatable)')
+        parser.add_argument('--chunk-size', type=int, default=2000, help='Listings aggregated per query')
+
+    def handle(self, *args, **kwargs):
+        listings = Listing.objects.all()
+        if kwargs['listing']:
+            listings = listings.filter(pk__in=kwargs['listing'])
+        started = time.perf_counter()
+        total = listings.refresh_ratings(chunk_size=max(kwargs['chunk_size'], 1))
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f"Corrected ratings on {total} listings in {elapsed:.2f}s"))
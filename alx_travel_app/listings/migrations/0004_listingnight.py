@@ -0,0 +1,86 @@
+# Generated by Django 5.2.1 on 2026-10-18 03:25
+
+import django.db.models.deletion
+from datetime import date, timedelta
+from django.db import migrations, models
+
+CHUNK = 500
+
+
+def calendar_to_nights(apps, schema_editor):
+    """
+    Copies every night marked true in Listing.availability (the seeder marks the
+    nights of pending/confirmed bookings) into ListingNight, linking it to the
+    active booking that covers it when there is one.
+    """
+    Listing = apps.get_model('listings', 'Listing')
+    Booking = apps.get_model('listings', 'Booking')
+    ListingNight = apps.get_model('listings', 'ListingNight')
+    db = schema_editor.connection.alias
+
+    listings = Listing.objects.using(db).order_by('pk').exclude(availability={}).values_list('pk', 'availability')
+    last = None
+    while True:
+        page = listings if last is None else listings.filter(pk__gt=last)
+        chunk = list(page[:CHUNK])
+        if not chunk:
+            break
+        last = chunk[-1][0]
+
+        covering = {}
+        bookings = Booking.objects.using(db).filter(
+            listing_id__in=[pk for pk, _ in chunk], booking_status__in=['PENDING', 'CONFIRMED']
+        ).values_list('listing_id', 'booking_id', 'start_date', 'end_date')
+        for listing_id, booking_id, start, end in bookings:
+            for d in range((end.date() - start.date()).days):
+                covering[(listing_id, start.date() + timedelta(days=d))] = booking_id
+
+        rows = []
+        for listing_id, calendar in chunk:
+            for day, taken in (calendar or {}).items():
+                if not taken:
+                    continue
+                night = date.fromisoformat(day)
+                rows.append(ListingNight(listing_id=listing_id, night=night, booking_id=covering.get((listing_id, night))))
+        ListingNight.objects.using(db).bulk_create(rows, batch_size=1000)
+
+
+def nights_to_calendar(apps, schema_editor):
+    Listing = apps.get_model('listings', 'Listing')
+    ListingNight = apps.get_model('listings', 'ListingNight')
+    db = schema_editor.connection.alias
+
+    calendars = {}
+    for listing_id, night in ListingNight.objects.using(db).values_list('listing_id', 'night').iterator():
+        calendars.setdefault(listing_id, {})[night.isoformat()] = True
+    Listing.objects.using(db).bulk_update(
+        [Listing(pk=pk, availability=calendar) for pk, calendar in calendars.items()],
+        ['availability'], batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0003_remove_booking_total_price_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ListingNight',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('night', models.DateField()),
+                ('booking', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='nights', to='listings.booking')),
+                ('listing', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='nights', to='listings.listing')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('listing', 'night'), name='unique_listing_night')],
+            },
+        ),
+        migrations.RunPython(calendar_to_nights, nights_to_calendar),
+        migrations.RemoveField(
+            model_name='listing',
+            name='availability',
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.1 on 2026-10-18 03:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0004_listingnight'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['listing', 'booking_status', 'start_date', 'end_date'], name='listings_bo_listing_ae58b3_idx'),
+        ),
+    ]
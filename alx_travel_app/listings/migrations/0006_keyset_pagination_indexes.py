@@ -0,0 +1,25 @@
+# Generated by Django 5.2.1 on 2026-10-18 03:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0005_booking_overlap_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['created_at', 'booking_id'], name='listings_bo_created_e53fa5_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['sent_at', 'message_id'], name='listings_me_sent_at_ac6c6d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['payment_date', 'payment_id'], name='listings_pa_payment_9bb009_idx'),
+        ),
+    ]
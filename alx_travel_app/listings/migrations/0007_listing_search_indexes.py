@@ -0,0 +1,43 @@
+# Generated by Django 5.2.1 on 2026-10-18 03:31
+
+from django.db import migrations, models
+
+
+def create_fulltext_index(apps, schema_editor):
+    # InnoDB FULLTEXT; other backends use the icontains fallback in ListingSearchFilter
+    if schema_editor.connection.vendor == 'mysql':
+        schema_editor.execute(
+            'CREATE FULLTEXT INDEX listing_fulltext ON listings_listing (name, description, location)'
+        )
+
+
+def drop_fulltext_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'mysql':
+        schema_editor.execute('DROP INDEX listing_fulltext ON listings_listing')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0006_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='listing',
+            index=models.Index(fields=['location', 'price_per_night'], name='listings_li_locatio_d079e0_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='listing',
+            index=models.Index(fields=['capacity', 'price_per_night'], name='listings_li_capacit_697587_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='listing',
+            index=models.Index(fields=['price_per_night'], name='listings_li_price_p_278f5d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='listing',
+            index=models.Index(fields=['created_at'], name='listings_li_created_740656_idx'),
+        ),
+        migrations.RunPython(create_fulltext_index, drop_fulltext_index),
+    ]
@@ -0,0 +1,86 @@
+# Generated by Django 5.2.1 on 2026-10-18 03:34
+
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+CHUNK = 1000
+
+
+def backfill_ratings(apps, schema_editor):
+    """
+    Fills the new columns from approved reviews. Listings without any keep the
+    zero defaults, so only reviewed listings are written.
+    """
+    Listing = apps.get_model('listings', 'Listing')
+    Review = apps.get_model('listings', 'Review')
+    db = schema_editor.connection.alias
+    histogram = {f'rating_{i}': Count('pk', filter=Q(review_rating=i)) for i in range(1, 6)}
+    stats = (
+        Review.objects.using(db).filter(is_approved=True).order_by().values('listing_id')
+        .annotate(rating_count=Count('pk'), rating_sum=Sum('review_rating'), **histogram)
+    )
+    fields = ['rating_count', 'rating_sum', 'rating_avg'] + list(histogram)
+    rows = []
+    for row in stats.iterator():
+        listing = Listing(pk=row.pop('listing_id'), **row)
+        listing.rating_avg = round(listing.rating_sum / listing.rating_count, 2)
+        rows.append(listing)
+        if len(rows) >= CHUNK:
+            Listing.objects.using(db).bulk_update(rows, fields)
+            rows = []
+    Listing.objects.using(db).bulk_update(rows, fields)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0008_listing_coordinates'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='listing',
+            name='rating_1',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='listing',
+            name='rating_2',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='listing',
+            name='rating_3',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='listing',
+            name='rating_4',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='listing',
+            name='rating_5',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='listing',
+            name='rating_avg',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=3),
+        ),
+        migrations.AddField(
+            model_name='listing',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='listing',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='listing',
+            index=models.Index(fields=['rating_avg', 'rating_count'], name='listings_li_rating__ddb985_idx'),
+        ),
+        migrations.RunPython(backfill_ratings, migrations.RunPython.noop),
+    ]
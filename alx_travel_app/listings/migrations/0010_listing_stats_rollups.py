@@ -0,0 +1,85 @@
+# Generated by Django 5.2.1 on 2026-10-18 03:37
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0009_listing_rating_aggregates'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ListingDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nights_booked', models.PositiveIntegerField(default=0, help_text='Nights held by confirmed bookings')),
+                ('nights_pending', models.PositiveIntegerField(default=0, help_text='Nights held by pending bookings')),
+                ('booked_revenue', models.DecimalField(decimal_places=2, default=0, help_text='Nightly rate of the confirmed nights', max_digits=14)),
+                ('payments_count', models.PositiveIntegerField(default=0)),
+                ('paid_amount', models.DecimalField(decimal_places=2, default=0, help_text='Completed payments, by payment date', max_digits=14)),
+                ('day', models.DateField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ListingMonthlyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nights_booked', models.PositiveIntegerField(default=0, help_text='Nights held by confirmed bookings')),
+                ('nights_pending', models.PositiveIntegerField(default=0, help_text='Nights held by pending bookings')),
+                ('booked_revenue', models.DecimalField(decimal_places=2, default=0, help_text='Nightly rate of the confirmed nights', max_digits=14)),
+                ('payments_count', models.PositiveIntegerField(default=0)),
+                ('paid_amount', models.DecimalField(decimal_places=2, default=0, help_text='Completed payments, by payment date', max_digits=14)),
+                ('month', models.DateField(help_text='First day of the month')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='RollupWatermark',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('processed_until', models.DateTimeField()),
+            ],
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='payment',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['updated_at'], name='listings_bo_updated_d69572_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='listing',
+            index=models.Index(fields=['updated_at'], name='listings_li_updated_28d1ab_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['updated_at'], name='listings_pa_updated_818e1b_idx'),
+        ),
+        migrations.AddField(
+            model_name='listingdailystats',
+            name='listing',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='listings.listing'),
+        ),
+        migrations.AddField(
+            model_name='listingmonthlystats',
+            name='listing',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='listings.listing'),
+        ),
+        migrations.AddConstraint(
+            model_name='listingdailystats',
+            constraint=models.UniqueConstraint(fields=('listing', 'day'), name='unique_listing_day_stats'),
+        ),
+        migrations.AddConstraint(
+            model_name='listingmonthlystats',
+            constraint=models.UniqueConstraint(fields=('listing', 'month'), name='unique_listing_month_stats'),
+        ),
+    ]
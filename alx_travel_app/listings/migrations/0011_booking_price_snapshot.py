@@ -0,0 +1,60 @@
+# Generated by Django 5.2.1 on 2026-10-18 03:42
+
+from django.db import migrations, models
+
+CHUNK = 1000
+
+
+def snapshot_prices(apps, schema_editor):
+    """
+    Prices existing bookings at their listing's current rate, the best record
+    there is of what they were booked at.
+    """
+    Booking = apps.get_model('listings', 'Booking')
+    db = schema_editor.connection.alias
+    bookings = Booking.objects.using(db).order_by('pk').values_list('pk', 'start_date', 'end_date', 'listing__price_per_night')
+    last = None
+    while True:
+        page = bookings if last is None else bookings.filter(pk__gt=last)
+        chunk = list(page[:CHUNK])
+        if not chunk:
+            break
+        last = chunk[-1][0]
+        Booking.objects.using(db).bulk_update(
+            [
+                Booking(pk=pk, nightly_rate=rate, total_price=rate * (end.date() - start.date()).days)
+                for pk, start, end, rate in chunk
+            ],
+            ['nightly_rate', 'total_price'],
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0010_listing_stats_rollups'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='booking',
+            name='nightly_rate',
+            field=models.DecimalField(decimal_places=2, editable=False, max_digits=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='total_price',
+            field=models.DecimalField(decimal_places=2, editable=False, max_digits=12, null=True),
+        ),
+        migrations.RunPython(snapshot_prices, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='booking',
+            name='nightly_rate',
+            field=models.DecimalField(decimal_places=2, editable=False, max_digits=10),
+        ),
+        migrations.AlterField(
+            model_name='booking',
+            name='total_price',
+            field=models.DecimalField(decimal_places=2, editable=False, max_digits=12),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.1 on 2026-10-18 03:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0011_booking_price_snapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeletionStamp',
+            fields=[
+                ('table', models.CharField(max_length=100, primary_key=True, serialize=False)),
+                ('deleted_at', models.DateTimeField()),
+            ],
+        ),
+    ]
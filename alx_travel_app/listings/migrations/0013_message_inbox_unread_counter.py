@@ -0,0 +1,45 @@
+# Generated by Django 5.2.1 on 2026-10-18 04:00
+
+from django.db import migrations, models
+from django.db.models import Count
+
+CHUNK = 1000
+
+
+def backfill_unread(apps, schema_editor):
+    """Counts each user's unread received messages; users without any keep the zero default."""
+    CustomUser = apps.get_model('listings', 'CustomUser')
+    Message = apps.get_model('listings', 'Message')
+    db = schema_editor.connection.alias
+    counts = Message.objects.using(db).filter(is_read=False).order_by().values('recipient_id').annotate(unread=Count('pk'))
+    rows = []
+    for row in counts.iterator():
+        rows.append(CustomUser(pk=row['recipient_id'], unread_messages=row['unread']))
+        if len(rows) >= CHUNK:
+            CustomUser.objects.using(db).bulk_update(rows, ['unread_messages'])
+            rows = []
+    CustomUser.objects.using(db).bulk_update(rows, ['unread_messages'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0012_deletion_stamps'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='unread_messages',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['recipient', 'is_read', 'sent_at'], name='listings_me_recipie_2cea82_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['sender', 'recipient', 'sent_at'], name='listings_me_sender__6d481f_idx'),
+        ),
+        migrations.RunPython(backfill_unread, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.1 on 2026-10-18 04:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def drop_watermark(apps, schema_editor):
+    """
+    Changes made before the queue existed were never recorded; without a watermark
+    the next refresh_rollups is a full one and picks them up.
+    """
+    RollupWatermark = apps.get_model('listings', 'RollupWatermark')
+    db = schema_editor.connection.alias
+    RollupWatermark.objects.using(db).filter(name='listing-stats').delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0013_message_inbox_unread_counter'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollupChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('first_day', models.DateField()),
+                ('last_day', models.DateField()),
+                ('listing', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='listings.listing')),
+            ],
+        ),
+        migrations.RunPython(drop_watermark, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.1 on 2026-10-18 09:12
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0014_rollup_change'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddIndex(
+            model_name='customuser',
+            index=models.Index(fields=['updated_at'], name='app_user_updated_781a60_idx'),
+        ),
+    ]
@@ -0,0 +1,306 @@
+from django.core.cache import cache
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import router
+from django.db.models import Subquery
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.permissions import IsAdminUser
+from rest_framework.renderers import BrowsableAPIRenderer
+from rest_framework.response import Response
+
+from . import cache as listing_cache
+from . import datasets, fastpath
+from .filters import day_range
+from .models import DeletionStamp
+from .renderers import FastJSONRenderer
+
+
+class NestedParentMixin:
+    """
+    Scopes a viewset registered on a rest_framework_nested router to its parent.
+
+    `parent_lookups` maps a router basename to (URL kwarg, parent model, condition),
+    where condition(parent_pk) returns the Q object that filters the child queryset on
+    an indexed foreign key. A missing parent is a 404, checked with an EXISTS probe
+    on the parent's primary key instead of loading the parent.
+    """
+    parent_lookups = {}
+
+    def get_parent_lookup(self):
+        return self.parent_lookups.get(getattr(self, 'basename', None))
+
+    def get_parent_pk(self):
+        kwarg, parent_model, _ = self.get_parent_lookup()
+        try:
+            return parent_model._meta.pk.to_python(self.kwargs[kwarg])
+        except DjangoValidationError:
+            raise NotFound(f"{parent_model._meta.verbose_name.capitalize()} not found.")
+
+    def check_parent_exists(self, parent_pk):
+        if getattr(self, '_parent_checked', False):
+            return
+        _, parent_model, _ = self.get_parent_lookup()
+        if not parent_model._default_manager.filter(pk=parent_pk).exists():
+            raise NotFound(f"{parent_model._meta.verbose_name.capitalize()} not found.")
+        self._parent_checked = True
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        lookup = self.get_parent_lookup()
+        if lookup is None:
+            return queryset
+        parent_pk = self.get_parent_pk()
+        self.check_parent_exists(parent_pk)
+        return queryset.filter(lookup[2](parent_pk))
+
+
+def etag_matches(request, etag):
+    """True when an If-None-Match header lists this ETag (weak or strong) or is *."""
+    header = request.headers.get('If-None-Match')
+    if not header:
+        return False
+    candidates = [tag.strip() for tag in header.split(',')]
+    return '*' in candidates or any(tag.removeprefix('W/') == etag for tag in candidates)
+
+
+class ListingCacheMixin:
+    """
+    Serves list and detail responses from the versioned cache in listings.cache.
+    A request whose If-None-Match carries the current ETag gets a 304 from the
+    version tokens, without running the view's query or a serializer (under
+    ConditionalGetMixin its Last-Modified probe still runs first). Saving a listing,
+    or a user who hosts listings, replaces the tokens.
+    Responses must not vary by user; they are shared across clients.
+    """
+    def cache_scopes(self, request):
+        """Version scopes the response depends on, or None when it should not be cached."""
+        if self.action == 'retrieve':
+            model = self.queryset.model
+            try:
+                # Normalised so /property/<UPPERCASE-UUID>/ shares the scope bumped on save
+                pk = model._meta.pk.to_python(self.kwargs[self.lookup_url_kwarg or self.lookup_field])
+            except DjangoValidationError:
+                return None
+            return [listing_cache.listing_scope(pk)]
+        scopes = [listing_cache.COLLECTION]
+        if request.query_params.get('check_in') or request.query_params.get('check_out'):
+            scopes.append(listing_cache.AVAILABILITY)
+        return scopes
+
+    def cached(self, request, build):
+        scopes = self.cache_scopes(request)
+        if scopes is None:
+            return build()
+        key, etag = listing_cache.response_key(scopes, request)
+        headers = {'ETag': etag, 'Cache-Control': 'no-cache'}
+        if etag_matches(request, etag):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        data = cache.get(key)
+        if data is None:
+            response = build()
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            cache.set(key, response.data, listing_cache.timeout())
+            data = response.data
+        return Response(data, headers=headers)
+
+    def list(self, request, *args, **kwargs):
+        return self.cached(request, lambda: super(ListingCacheMixin, self).list(request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached(request, lambda: super(ListingCacheMixin, self).retrieve(request, *args, **kwargs))
+
+
+def newest_stamp(row):
+    stamps = [stamp for stamp in row or () if stamp is not None]
+    return max(stamps) if stamps else None
+
+
+def copy_validators(headers, response):
+    for header in ('Last-Modified', 'ETag'):
+        if header in headers:
+            response[header] = headers[header]
+
+
+class ConditionalGetMixin:
+    """
+    Answers conditional GETs (If-None-Match / If-Modified-Since) from updated_at
+    timestamps before the queryset is evaluated or a serializer runs.
+
+    A detail response is dated by `conditional_fields` of its row: its own
+    updated_at plus those of the related rows the serializer embeds, read in one
+    primary-key lookup. A list response is dated by the newest change to any of
+    `conditional_models`: MAX(updated_at) on each table's updated_at index plus its
+    DeletionStamp, so polling an unchanged feed costs a few index lookups.
+    Lists filtered by a query parameter in `conditional_skip_params` depend on
+    data without timestamps and are always served in full.
+    """
+    conditional_fields = ('updated_at',)
+    conditional_models = ()
+    conditional_skip_params = ()
+    # False when another layer (ListingCacheMixin) owns the ETag
+    conditional_etag = True
+
+    def last_modified_query(self, request):
+        """values_list() query whose first row holds the timestamps dating the response, or None."""
+        if self.action == 'retrieve':
+            model = self.queryset.model
+            try:
+                pk = model._meta.pk.to_python(self.kwargs[self.lookup_url_kwarg or self.lookup_field])
+            except DjangoValidationError:
+                return None
+            return model._default_manager.filter(pk=pk).values_list(*self.conditional_fields)
+        if self.action == 'list':
+            if any(request.query_params.get(param) for param in self.conditional_skip_params):
+                return None
+            # One query: the newest row of the first table, with the others' newest
+            # updated_at and the deletion stamp as scalar subqueries, each an index probe
+            first, *others = self.conditional_models
+            newest = {
+                f'newest_{i}': Subquery(model._default_manager.order_by('-updated_at').values('updated_at')[:1])
+                for i, model in enumerate(others)
+            }
+            newest['deleted_at'] = Subquery(DeletionStamp.objects.filter(
+                table__in=[model._meta.db_table for model in self.conditional_models]
+            ).order_by('-deleted_at').values('deleted_at')[:1])
+            return first._default_manager.order_by('-updated_at').annotate(**newest).values_list('updated_at', *newest)
+        return None
+
+    def last_modified(self, request):
+        query = self.last_modified_query(request)
+        return newest_stamp(query.first()) if query is not None else None
+
+    def precondition(self, request, last_modified):
+        """
+        (response, headers): the 304 (or 412) answering the request's preconditions,
+        or None when the full response is due, and the validators to send with it.
+        """
+        headers = HttpResponse()
+        headers['Last-Modified'] = http_date(last_modified.timestamp())
+        etag = None
+        if self.conditional_etag:
+            # Microsecond precision: Last-Modified alone cannot tell two edits in one second apart
+            etag = f'W/"{int(last_modified.timestamp() * 1_000_000):x}"'
+            headers['ETag'] = etag
+        # Hands back `headers` itself when the preconditions pass, a 304 (or 412) otherwise
+        answered = get_conditional_response(
+            request, etag=etag, last_modified=int(last_modified.timestamp()), response=headers
+        )
+        return (None if answered is headers else answered), headers
+
+    def conditional(self, request, build):
+        last_modified = self.last_modified(request)
+        if last_modified is None:
+            return build()
+        answered, headers = self.precondition(request, last_modified)
+        if answered is not None:
+            return answered
+        response = build()
+        if response.status_code == status.HTTP_200_OK:
+            copy_validators(headers, response)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional(request, lambda: super(ConditionalGetMixin, self).list(request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional(request, lambda: super(ConditionalGetMixin, self).retrieve(request, *args, **kwargs))
+
+
+class SparseFieldsMixin:
+    """
+    Trims the list and retrieve querysets to what the serializer renders under
+    ?fields= and ?expand=: only() the columns of its fastpath plan, and
+    select_related() just the expanded relations. Columns of `ordering_fields`
+    stay loaded, since cursor pagination reads the position from the last row.
+    """
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if getattr(self, 'action', None) not in ('list', 'retrieve'):
+            return queryset
+        plan = fastpath.plan_for(self.get_serializer())
+        return plan.narrow(queryset, extra=getattr(self, 'ordering_fields', ()))
+
+
+class FastListMixin:
+    """
+    Serves the list action from listings.fastpath: the page is read with .values()
+    using the compiled plan of the serializer and built as plain dicts, then
+    rendered by FastJSONRenderer. The output is the serializer's, byte for byte.
+    Columns of `ordering_fields` are fetched too, since cursor pagination reads
+    the position from the last row.
+    """
+    renderer_classes = [FastJSONRenderer, BrowsableAPIRenderer]
+
+    def list(self, request, *args, **kwargs):
+        plan = fastpath.plan_for(self.get_serializer())
+        columns = list(dict.fromkeys([*plan.columns, *getattr(self, 'ordering_fields', ())]))
+        queryset = self.filter_queryset(self.get_queryset()).values(*columns)
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(plan.render(page, request))
+        return Response(plan.render(queryset, request))
+
+
+class ExportMixin:
+    """
+    GET <collection>/export/?as=ndjson|csv&from=YYYY-MM-DD&to=YYYY-MM-DD streams
+    every row of the table, scoped to the parent on nested routes, with
+    `export_date_field` between the two days (both inclusive, either optional).
+
+    Rows are the raw columns in the export_dataset part-file format, so a download
+    loads back with import_dataset. They are read in keyset pages over the
+    (export_date_field, pk) index and written as they arrive: memory is bounded
+    by one page whatever the size of the export, and the first bytes leave after
+    the first page. MySQLdb buffers whole result sets even for .iterator(), hence
+    the pages instead of a single server-side cursor.
+    """
+    export_date_field = None
+    export_chunk_size = 2000
+    # A short first page and an immediate first write get the first bytes out in milliseconds
+    export_first_chunk_size = 50
+    # Lines handed to the server per write after the first
+    export_flush_lines = 500
+    export_formats = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv; charset=utf-8'}
+
+    @action(detail=False, methods=['get'], permission_classes=[IsAdminUser])
+    def export(self, request, *args, **kwargs):
+        fmt = request.query_params.get('as', 'ndjson')
+        if fmt not in self.export_formats:
+            raise ValidationError({'as': f"Expected one of: {', '.join(self.export_formats)}."})
+        start, end = day_range(request)
+        # The rows are read after the view returns, once the request's replica routing is over
+        queryset = self.get_queryset()
+        queryset = queryset.using(router.db_for_read(queryset.model))
+        if start:
+            queryset = queryset.filter(**{f'{self.export_date_field}__gte': start})
+        if end:
+            queryset = queryset.filter(**{f'{self.export_date_field}__lt': end})
+
+        model = queryset.model
+        columns = [f.attname for f in datasets.dataset_fields(model)]
+        rows = datasets.iter_rows(model, chunk_size=self.export_chunk_size, queryset=queryset,
+                                  order_field=self.export_date_field, first_chunk_size=self.export_first_chunk_size)
+        response = StreamingHttpResponse(self.export_chunks(datasets.format_lines(fmt, columns, rows)),
+                                         content_type=self.export_formats[fmt])
+        span = '-'.join(request.query_params.get(param) for param in ('from', 'to') if request.query_params.get(param))
+        filename = '-'.join(filter(None, [datasets.model_key(model), span]))
+        response['Content-Disposition'] = f'attachment; filename="{filename}.{fmt}"'
+        response['Cache-Control'] = 'no-store'
+        return response
+
+    def export_chunks(self, lines):
+        batch = []
+        flush_at = 1
+        for line in lines:
+            batch.append(line)
+            if len(batch) >= flush_at:
+                yield ''.join(batch).encode()
+                batch = []
+                flush_at = self.export_flush_lines
+        if batch:
+            yield ''.join(batch).encode()
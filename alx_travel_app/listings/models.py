@@ -1,11 +1,23 @@
-from django.db import models
+from django.db import IntegrityError, OperationalError, models, transaction
 from django.contrib.auth.models import AbstractUser
 from django.core.exceptions import ValidationError
-from django.core.validators import RegexValidator
-from django.contrib.gis.db import models as gis_models
+from django.core.validators import MaxValueValidator, MinValueValidator, RegexValidator
+from django.db.models import Case, Count, DecimalField, Exists, F, FloatField, Func, IntegerField, OuterRef, Q, Sum, Value, When
+from django.db.models.functions import ASin, Cast, Cos, Power, Radians, Sin, Sqrt
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
 from django.utils import timezone
+from datetime import timedelta
+from decimal import ROUND_HALF_UP, Decimal
+import math
+import random
+import threading
+import time
 import uuid
 
+from . import cache as listing_cache
+from . import events
+
 # Phone number validator for international formats
 phone_regex = RegexValidator(
     regex=r'^\+?1?\d{9,15}$',
@@ -19,6 +31,10 @@ class CustomUser(AbstractUser):
     """
     class Meta:
         db_table = "app_user"
+        indexes = [
+            # Newest-change probe of ConditionalGetMixin
+            models.Index(fields=['updated_at']),
+        ]
 
     user_id = models.UUIDField(primary_key=True, db_index=True, default=uuid.uuid4, editable=False)
     first_name = models.CharField(max_length=100, null=False, blank=False)
@@ -30,17 +46,129 @@ class CustomUser(AbstractUser):
         max_length=50, default='guest', null=False, blank=False
     )
     created_at = models.DateTimeField(default=timezone.now)
+    # Dates the responses that embed the user (?expand=host, user, ...)
+    updated_at = models.DateTimeField(auto_now=True)
     bio = models.TextField(blank=True, null=True)
     profile_image = models.ImageField(upload_to='profiles/', blank=True, null=True, default='profiles/default.png')
+    # Unread received messages, kept current by Message.save()/delete() and MessageQuerySet.mark_read()
+    unread_messages = models.PositiveIntegerField(default=0, editable=False)
+
+    # Fields CustomUserSerializer renders, i.e. what ?expand=host embeds in cached listing responses
+    EMBEDDED_FIELDS = {'first_name', 'last_name', 'phone_number', 'profile_image', 'user_role', 'bio'}
 
     def __str__(self):
         return f"{self.first_name} {self.last_name} ({self.user_role})"
 
+    def save(self, *args, **kwargs):
+        """Saves the user and invalidates the cached responses of the listings they host."""
+        adding = self._state.adding
+        update_fields = kwargs.get('update_fields')
+        # last_login-only saves change nothing rendered and keep updated_at
+        rendered = update_fields is None or bool(self.EMBEDDED_FIELDS.intersection(update_fields))
+        if update_fields is not None and rendered:
+            kwargs['update_fields'] = {*update_fields, 'updated_at'}
+        super().save(*args, **kwargs)
+        # A new user hosts nothing yet
+        if adding or not rendered:
+            return
+        hosted = list(Listing.objects.filter(host_id=self.pk).values_list('pk', flat=True))
+        if hosted:
+            listing_cache.listings_changed(hosted)
+
+    @classmethod
+    def apply_unread(cls, user_id, delta):
+        """Moves one user's unread counter by `delta` with an F() expression, so concurrent writers cannot lose updates."""
+        cls.objects.filter(pk=user_id).update(unread_messages=F('unread_messages') + delta)
+
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = 111.195  # one degree of latitude (or of longitude on the equator)
+
+RATING_VALUES = range(1, 6)
+# Columns maintained from approved reviews; never written by Listing.save()
+RATING_FIELDS = ['rating_count', 'rating_sum'] + [f'rating_{i}' for i in RATING_VALUES] + ['rating_avg']
+
+
+def rating_average(total, count):
+    # Rounded like MySQL rounds into DECIMAL(3,2)
+    return (Decimal(total) / count).quantize(Decimal('0.01'), ROUND_HALF_UP) if count else Decimal('0.00')
+
+# Booking statuses that hold a listing's nights
+ACTIVE_BOOKING_STATUSES = ('PENDING', 'CONFIRMED')
+
+
+class ListingQuerySet(models.QuerySet):
+    def available_between(self, start, end):
+        """
+        Listings that are free for every night in [start, end). Runs as one
+        NOT EXISTS probe on the (listing, night) index of ListingNight.
+        """
+        taken = ListingNight.objects.filter(listing=OuterRef('pk'), night__gte=start, night__lt=end)
+        return self.exclude(Exists(taken))
+
+    def near(self, latitude, longitude, radius_km):
+        """
+        Listings within radius_km of a point, annotated with distance_km and
+        nearest first. A bounding box on the (latitude, longitude) index narrows
+        the candidates; the haversine distance is only computed for those.
+        """
+        lat_delta = radius_km / KM_PER_DEGREE
+        # Degrees of longitude shrink towards the poles; clamp so the box stays finite
+        lng_delta = radius_km / (KM_PER_DEGREE * max(math.cos(math.radians(latitude)), 0.01))
+        lat1, lng1 = math.radians(latitude), math.radians(longitude)
+        lat2 = Radians(Cast('latitude', FloatField()))
+        lng2 = Radians(Cast('longitude', FloatField()))
+        a = (
+            Power(Sin((lat2 - lat1) / 2), 2)
+            + math.cos(lat1) * Cos(lat2) * Power(Sin((lng2 - lng1) / 2), 2)
+        )
+        return self.filter(
+            latitude__range=(latitude - lat_delta, latitude + lat_delta),
+            longitude__range=(longitude - lng_delta, longitude + lng_delta),
+        ).annotate(
+            distance_km=2 * EARTH_RADIUS_KM * ASin(Sqrt(a))
+        ).filter(distance_km__lte=radius_km).order_by('distance_km')
+
+    def refresh_ratings(self, chunk_size=2000):
+        """
+        Recomputes the rating columns of these listings from their approved reviews,
+        one keyset chunk of listings (one GROUP BY, then a bulk UPDATE of the rows
+        that drifted) at a time. Returns the number of listings corrected.
+        """
+        histogram = {f'rating_{i}': Count('pk', filter=Q(review_rating=i)) for i in RATING_VALUES}
+        listings = self.order_by('pk').values_list('pk', *RATING_FIELDS)
+        total = 0
+        last = None
+        while True:
+            page = listings if last is None else listings.filter(pk__gt=last)
+            chunk = list(page[:chunk_size])
+            if not chunk:
+                return total
+            last = chunk[-1][0]
+            stats = {
+                row.pop('listing_id'): row
+                for row in Review.objects.filter(listing_id__in=[row[0] for row in chunk], is_approved=True)
+                .order_by().values('listing_id').annotate(rating_count=Count('pk'), rating_sum=Sum('review_rating'), **histogram)
+            }
+            rows = []
+            for pk, *current in chunk:
+                listing = Listing(pk=pk, **stats.get(pk, dict.fromkeys(RATING_FIELDS[:-1], 0)))
+                listing.rating_avg = rating_average(listing.rating_sum, listing.rating_count)
+                if [getattr(listing, f) for f in RATING_FIELDS] != current:
+                    listing.updated_at = timezone.now()
+                    rows.append(listing)
+            Listing.objects.bulk_update(rows, RATING_FIELDS + ['updated_at'], batch_size=500)
+            if rows:
+                listing_cache.bump(*[listing_cache.listing_scope(row.pk) for row in rows], listing_cache.COLLECTION)
+            total += len(rows)
+
 
 class Listing(models.Model):
     """
     A property that can be booked. Only users with role 'host' can create listings.
     Includes geospatial location and availability tracking for AI-driven queries.
+    Coordinates are plain WGS84 degrees: no spatial database backend is configured,
+    so proximity search runs on a B-tree bounding-box index (see ListingQuerySet.near).
     """
     property_id = models.UUIDField(primary_key=True, db_index=True, default=uuid.uuid4, editable=False)
     host = models.ForeignKey(CustomUser, on_delete=models.CASCADE,
@@ -49,29 +177,248 @@ class Listing(models.Model):
     name = models.CharField(max_length=100, null=False, blank=False)
     description = models.TextField(null=False, blank=False)
     location = models.CharField(max_length= 100, null=False, blank=False)
+    latitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True,
+                                   validators=[MinValueValidator(-90), MaxValueValidator(90)])
+    longitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True,
+                                    validators=[MinValueValidator(-180), MaxValueValidator(180)])
     price_per_night = models.DecimalField(max_digits=10, decimal_places=2, null=False, blank=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     property_images = models.ImageField(upload_to='property_images/', blank=True, null=True, default='property_images/default.jpg')
     capacity = models.PositiveIntegerField(null=False, blank=False, default=1, help_text="Maximum number of guests")
     amenities = models.JSONField(default=dict, blank=True, help_text="List of amenities (e.g., {'wifi': true, 'pool': false})")
-    availability = models.JSONField(default=dict, blank=True, help_text="Availability calendar (e.g., {'2025-06-01': true})")
+    # Approved-review aggregates, kept current by Review.save()/delete() (see apply_rating)
+    rating_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_sum = models.PositiveIntegerField(default=0, editable=False)
+    rating_avg = models.DecimalField(max_digits=3, decimal_places=2, default=0, editable=False)
+    rating_1 = models.PositiveIntegerField(default=0, editable=False)
+    rating_2 = models.PositiveIntegerField(default=0, editable=False)
+    rating_3 = models.PositiveIntegerField(default=0, editable=False)
+    rating_4 = models.PositiveIntegerField(default=0, editable=False)
+    rating_5 = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = ListingQuerySet.as_manager()
+
+    @property
+    def rating_histogram(self):
+        return {i: getattr(self, f'rating_{i}') for i in RATING_VALUES}
+
+    @classmethod
+    def apply_rating(cls, listing_id, rating, delta):
+        """
+        Adds (delta=1) or removes (delta=-1) one approved rating. The counters move
+        with F() expressions so concurrent reviews cannot lose updates; the average is
+        a second UPDATE because MySQL evaluates SET clauses left to right while
+        other backends read the old row.
+        """
+        rows = cls.objects.filter(pk=listing_id)
+        rows.update(**{
+            'updated_at': timezone.now(),
+            'rating_count': F('rating_count') + delta,
+            'rating_sum': F('rating_sum') + delta * rating,
+            f'rating_{rating}': F(f'rating_{rating}') + delta,
+        })
+        rows.update(rating_avg=Case(
+            When(rating_count=0, then=Value(0.0)),
+            default=Cast('rating_sum', FloatField()) / F('rating_count'),
+            output_field=FloatField(),
+        ))
+        listing_cache.listing_changed(listing_id)
+
+    def taken_nights(self, start, end):
+        """
+        Dates in [start, end) on which this listing is already taken.
+        """
+        return list(self.nights.filter(night__gte=start, night__lt=end).order_by('night').values_list('night', flat=True))
+
+    def is_available(self, start, end):
+        return not self.nights.filter(night__gte=start, night__lt=end).exists()
 
     def clean(self):
         if self.price_per_night <= 0:
             raise ValidationError("Price Cannot be 0.00")
     def save(self, *args, **kwargs):
         self.full_clean()
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            # A stale in-memory copy must not overwrite the rating counters
+            kwargs['update_fields'] = [
+                f.name for f in self._meta.concrete_fields if not f.primary_key and f.name not in RATING_FIELDS
+            ]
         super().save(*args, **kwargs)
+        listing_cache.listing_changed(self.pk)
 
     class Meta:
-        indexes = [models.Index(fields=['host', 'location'])]
+        indexes = [
+            models.Index(fields=['host', 'location']),
+            # ListingFilter: location and/or guests narrowed by a price range
+            models.Index(fields=['location', 'price_per_night']),
+            models.Index(fields=['capacity', 'price_per_night']),
+            models.Index(fields=['price_per_night']),
+            models.Index(fields=['created_at']),
+            # Bounding-box probe of ListingQuerySet.near(): latitude range, then longitude
+            models.Index(fields=['latitude', 'longitude']),
+            # ?ordering=-rating_avg
+            models.Index(fields=['rating_avg', 'rating_count']),
+            # Newest-change probe of ConditionalGetMixin
+            models.Index(fields=['updated_at']),
+        ]
+        # The FULLTEXT index on (name, description, location) is MySQL-only and lives in migration 0007
         ordering = ['-created_at']
 
     def __str__(self):
         return self.name
 
 
+# MySQL deadlock / lock wait timeout; SQLite reports a busy database as "database is locked"
+RETRYABLE_DB_ERRORS = (1213, 1205)
+RESERVE_MAX_ATTEMPTS = 5
+RESERVE_BACKOFF = 0.02  # seconds, doubled on every retry
+
+
+class ReservationMetrics:
+    """
+    Process-wide counters describing how contended Booking.objects.reserve() is.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.attempts = 0
+            self.reserved = 0
+            self.conflicts = 0
+            self.retries = 0
+            self.failures = 0
+            self.lock_wait_total = 0.0
+            self.lock_wait_max = 0.0
+
+    def record(self, **counts):
+        with self._lock:
+            for name, value in counts.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def record_lock_wait(self, seconds):
+        with self._lock:
+            self.lock_wait_total += seconds
+            self.lock_wait_max = max(self.lock_wait_max, seconds)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'attempts': self.attempts,
+                'reserved': self.reserved,
+                'conflicts': self.conflicts,
+                'retries': self.retries,
+                'failures': self.failures,
+                'lock_wait_total_ms': round(self.lock_wait_total * 1000, 3),
+                'lock_wait_avg_ms': round(self.lock_wait_total * 1000 / self.attempts, 3) if self.attempts else 0.0,
+                'lock_wait_max_ms': round(self.lock_wait_max * 1000, 3),
+            }
+
+
+reservation_metrics = ReservationMetrics()
+
+
+def is_retryable(exc):
+    code = exc.args[0] if exc.args else None
+    return code in RETRYABLE_DB_ERRORS or 'database is locked' in str(exc)
+
+
+# Code of the ValidationError raised when a stay overlaps an active booking
+BOOKING_CONFLICT = 'booking_conflict'
+
+
+def is_booking_conflict(error):
+    """Whether a ValidationError from saving a booking only says that the dates are taken."""
+    errors = [e for errors in error.error_dict.values() for e in errors] if hasattr(error, 'error_dict') else error.error_list
+    return bool(errors) and all(e.code == BOOKING_CONFLICT for e in errors)
+
+
+class NightsBetween(Func):
+    """
+    Calendar nights between two datetime columns, i.e. the day difference of their
+    dates, matching Booking.night_dates().
+    """
+    output_field = IntegerField()
+    arity = 2
+
+    def as_mysql(self, compiler, connection, **extra_context):
+        return self.as_sql(compiler, connection, template='DATEDIFF(%(expressions)s)', **extra_context)
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        end, start = self.get_source_expressions()
+        end_sql, end_params = compiler.compile(end)
+        start_sql, start_params = compiler.compile(start)
+        return (
+            f'CAST(julianday(date({end_sql})) - julianday(date({start_sql})) AS INTEGER)',
+            end_params + start_params,
+        )
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        return self.as_sql(compiler, connection, template='(%(expressions)s)', arg_joiner='::date - ',
+                           **extra_context)
+
+
+class BookingQuerySet(models.QuerySet):
+    def with_total_price(self):
+        """
+        Annotates night_count and quoted_total_price: what the stay would cost at the
+        listing's current nightly rate, computed in SQL. Useful next to the stored
+        total_price, which is the price snapshotted when the booking was made.
+        """
+        return self.annotate(night_count=NightsBetween('end_date', 'start_date')).annotate(
+            quoted_total_price=models.ExpressionWrapper(
+                F('listing__price_per_night') * F('night_count'),
+                output_field=DecimalField(max_digits=12, decimal_places=2),
+            )
+        )
+
+    def revenue(self):
+        """
+        Stored totals of the confirmed bookings in this queryset, summed in one
+        aggregate query. Returns a Decimal.
+        """
+        total = self.filter(booking_status='CONFIRMED').aggregate(revenue=Sum('total_price'))['revenue']
+        return (total or Decimal(0)).quantize(Decimal('0.01'))
+
+
+class BookingManager(models.Manager.from_queryset(BookingQuerySet)):
+    def reserve(self, listing, user, start, end, status='PENDING'):
+        """
+        Books a listing for [start, end) while holding a row lock on that listing, so
+        concurrent checkouts for the same listing queue up instead of racing between the
+        overlap check and the insert. Other listings are not blocked. Deadlocks and lock
+        wait timeouts are retried with a jittered exponential backoff.
+        Raises ValidationError when the booking is invalid; is_booking_conflict() tells
+        the dates being taken apart.
+        """
+        for attempt in range(1, RESERVE_MAX_ATTEMPTS + 1):
+            reservation_metrics.record(attempts=1)
+            try:
+                with transaction.atomic():
+                    waiting = time.perf_counter()
+                    # The locked row also gives the nightly rate the booking is priced at
+                    rate = Listing.objects.select_for_update().filter(pk=listing.pk).values_list('price_per_night', flat=True).first()
+                    reservation_metrics.record_lock_wait(time.perf_counter() - waiting)
+                    booking = self.model(listing=listing, user=user, start_date=start, end_date=end, booking_status=status,
+                                         nightly_rate=rate)
+                    booking.save()
+            except ValidationError as exc:
+                if is_booking_conflict(exc):
+                    reservation_metrics.record(conflicts=1)
+                raise
+            except OperationalError as exc:
+                if not is_retryable(exc) or attempt == RESERVE_MAX_ATTEMPTS:
+                    reservation_metrics.record(failures=1)
+                    raise
+                reservation_metrics.record(retries=1)
+                time.sleep(RESERVE_BACKOFF * (2 ** (attempt - 1)) * random.uniform(0.5, 1.5))
+            else:
+                reservation_metrics.record(reserved=1)
+                return booking
+
+
 class Booking(models.Model):
     """
     Stores bookings for listings. Prevents overlapping bookings and ensures date validity.
@@ -89,35 +436,124 @@ class Booking(models.Model):
         choices=[('PENDING', 'Pending'), ('CONFIRMED', 'Confirmed'), ('CANCELLED', 'Cancelled')],
         null=False, blank=False
     )
+    # Listing rate when the booking was made, and that rate times the nights; see price_stay()
+    nightly_rate = models.DecimalField(max_digits=10, decimal_places=2, editable=False)
+    total_price = models.DecimalField(max_digits=12, decimal_places=2, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     booking_payment = models.OneToOneField('Payment', on_delete=models.SET_NULL, null=True, blank=True, related_name='booking')
 
+    objects = BookingManager()
+
+    class Meta:
+        indexes = [
+            # Serves the overlap probe in clean(): equality on listing and status, range on the dates
+            models.Index(fields=['listing', 'booking_status', 'start_date', 'end_date']),
+            # Keyset pagination order
+            models.Index(fields=['created_at', 'booking_id']),
+            # Newest-change probe of ConditionalGetMixin
+            models.Index(fields=['updated_at']),
+        ]
+
     def clean(self):
         """
         Validates that end_date is after start_date and prevents overlapping bookings.
         """
         if self.end_date <= self.start_date:
             raise ValidationError("End date must be after start date.")
+        if self.booking_status not in ACTIVE_BOOKING_STATUSES:
+            return
         overlapping = Booking.objects.filter(
-            listing=self.listing,
-            end_date__gt=self.start_date,
+            listing_id=self.listing_id,
+            booking_status__in=ACTIVE_BOOKING_STATUSES,
             start_date__lt=self.end_date,
-            booking_status__in=['PENDING', 'CONFIRMED']
+            end_date__gt=self.start_date
         ).exclude(booking_id=self.booking_id)
         if overlapping.exists():
-            raise ValidationError("This listing is already booked for the selected dates.")
+            raise ValidationError("This listing is already booked for the selected dates.", code=BOOKING_CONFLICT)
 
     def save(self, *args, **kwargs):
+        self.price_stay()
         self.full_clean()
-        super().save(*args, **kwargs)
+        with transaction.atomic():
+            before = None
+            if not self._state.adding:
+                before = Booking.objects.filter(pk=self.pk).values_list(
+                    'booking_status', 'listing_id', 'start_date', 'end_date').first()
+            super().save(*args, **kwargs)
+            self.claim_nights()
+            after = (self.booking_status, self.listing_id, self.start_date, self.end_date)
+            if before != after:
+                # The nights it held before, and holds now, need their stats rebuilt
+                if before:
+                    RollupChange.record(before[1], before[2].date(), before[3].date())
+                RollupChange.record(self.listing_id, self.start_date.date(), self.end_date.date())
+            if before is None or before[0] != self.booking_status:
+                self.publish_status(before and before[0])
+
+    def publish_status(self, previous):
+        """Pushes the new status to the guest and the host once the transaction commits."""
+        events.publish('booking', {
+            'booking_id': self.booking_id,
+            'listing': self.listing_id,
+            'status': self.booking_status,
+            'previous_status': previous,
+            'start_date': self.start_date,
+            'end_date': self.end_date,
+        }, [self.user_id, self.listing.host_id])
+
+    def price_stay(self):
+        """
+        Snapshots the listing's nightly rate the first time the booking is saved and
+        keeps total_price equal to that rate times the nights, so later price changes
+        on the listing do not reprice existing bookings.
+        """
+        if self.listing_id is None or self.start_date is None or self.end_date is None:
+            return  # full_clean() reports the missing fields
+        if self.nightly_rate is None:
+            self.nightly_rate = Listing.objects.filter(pk=self.listing_id).values_list('price_per_night', flat=True).first()
+            if self.nightly_rate is None:
+                return  # A missing listing; full_clean() reports the bad key
+        self.total_price = self.nightly_rate * len(self.night_dates())
+
+    def claim_nights(self):
+        """
+        Makes the booking's ListingNight rows match its dates and status. The unique
+        (listing, night) constraint turns a concurrent double-booking that slipped past
+        clean() into an IntegrityError, reported here as a ValidationError.
+        """
+        wanted = set()
+        if self.booking_status in ACTIVE_BOOKING_STATUSES:
+            wanted = {(self.listing_id, night) for night in self.night_dates()}
+        held = {(listing_id, night): pk for pk, listing_id, night in self.nights.values_list('pk', 'listing_id', 'night')}
+        stale = [pk for key, pk in held.items() if key not in wanted]
+        missing = wanted - held.keys()
+        if stale or missing:
+            listing_cache.availability_changed()
+        if stale:
+            ListingNight.objects.filter(pk__in=stale).delete()
+        if missing:
+            try:
+                with transaction.atomic():
+                    ListingNight.objects.bulk_create(
+                        [ListingNight(listing_id=listing_id, night=night, booking=self) for listing_id, night in missing]
+                    )
+            except IntegrityError:
+                raise ValidationError("This listing is already booked for the selected dates.", code=BOOKING_CONFLICT)
+
+    def night_dates(self):
+        """
+        Calendar dates the stay occupies: every night from check-in up to, not including, check-out.
+        """
+        first = self.start_date.date()
+        return [first + timedelta(days=d) for d in range((self.end_date.date() - first).days)]
 
     @property
     def get_total_price(self):
         """
-        Calculates total price based on number of nights and listing rate.
+        Total price of the stay at the rate it was booked at (stored, no query).
         """
-        stay_period = (self.end_date - self.start_date).days
-        return self.listing.price_per_night * stay_period
+        return self.total_price
 
     def approve(self, acting_user):
         """
@@ -149,6 +585,25 @@ class Booking(models.Model):
         return f"User {self.user.first_name} has a Booking for {self.listing.name} with status {self.booking_status}"
 
 
+class ListingNight(models.Model):
+    """
+    One row per night a listing is taken, keyed by (listing, night).
+    Replaces the old Listing.availability JSON calendar so date-range checks are
+    indexed lookups instead of deserialising a blob per listing.
+    """
+    listing = models.ForeignKey(Listing, on_delete=models.CASCADE, related_name='nights')
+    night = models.DateField()
+    booking = models.ForeignKey(Booking, on_delete=models.CASCADE, null=True, blank=True, related_name='nights')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['listing', 'night'], name='unique_listing_night')
+        ]
+
+    def __str__(self):
+        return f"{self.listing_id} taken on {self.night}"
+
+
 class Payment(models.Model):
     """
     Stores payment details for a booking. One payment per booking.
@@ -158,6 +613,7 @@ class Payment(models.Model):
     booking_id = models.OneToOneField(Booking, on_delete=models.CASCADE)
     amount = models.DecimalField(max_digits=10, decimal_places=2, null=False, blank=False)
     payment_date = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     payment_method = models.CharField(
         max_length=50,
         choices=[('CREDIT CARD', 'Credit Card'), ('PAYPAL', 'PayPal'), ('MOBILE MONEY', 'Mobile Money'), ('STRIPE', 'Stripe')],
@@ -173,6 +629,35 @@ class Payment(models.Model):
     transaction_id = models.CharField(max_length=100, null=True, blank=True, unique=True)
     user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='payments')
 
+    class Meta:
+        indexes = [
+            # Keyset pagination order
+            models.Index(fields=['payment_date', 'payment_id']),
+            # Newest-change probe of ConditionalGetMixin
+            models.Index(fields=['updated_at']),
+        ]
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            before = None
+            if not self._state.adding:
+                before = Payment.objects.filter(pk=self.pk).values_list(
+                    'booking_id', 'amount', 'payment_status', 'payment_date').first()
+            super().save(*args, **kwargs)
+            after = (self.booking_id_id, self.amount, self.payment_status, self.payment_date)
+            if before != after:
+                if before:
+                    self.record_rollup_change(before[0], before[3])
+                self.record_rollup_change(self.booking_id_id, self.payment_date)
+
+    @staticmethod
+    def record_rollup_change(booking_id, paid_at):
+        """Queues the stats day a payment counts on for refresh_rollups."""
+        listing_id = Booking.objects.filter(pk=booking_id).values_list('listing_id', flat=True).first()
+        if listing_id is not None:
+            day = timezone.localdate(paid_at)
+            RollupChange.record(listing_id, day, day + timedelta(days=1))
+
     def __str__(self):
         return f"Payment from {self.user.first_name} for booking {self.booking_id.booking_id} ({self.payment_status})"
 
@@ -193,10 +678,44 @@ class Review(models.Model):
     comment = models.TextField(null=True, blank=True, max_length=250)
     is_approved = models.BooleanField(default=False, help_text="Indicates if review has been approved by admin")
 
+    def save(self, *args, **kwargs):
+        """
+        Saves the review and moves its listing's rating aggregates by the difference
+        between the stored row and this one, in the same transaction.
+        """
+        with transaction.atomic():
+            before = None
+            if not self._state.adding:
+                before = Review.objects.select_for_update().filter(pk=self.pk).values_list(
+                    'listing_id', 'review_rating', 'is_approved').first()
+            super().save(*args, **kwargs)
+            after = (self.listing_id, self.review_rating, self.is_approved)
+            if before == after:
+                return
+            if before and before[2]:
+                Listing.apply_rating(before[0], before[1], -1)
+            if self.is_approved:
+                Listing.apply_rating(self.listing_id, self.review_rating, 1)
+
     def __str__(self):
         return f"Property {self.listing.name} was awarded a {self.review_rating} review by {self.user.first_name}"
 
 
+class MessageQuerySet(models.QuerySet):
+    def mark_read(self, recipient_id):
+        """
+        Marks the unread messages of this queryset received by `recipient_id` as read
+        with one UPDATE and takes them off the recipient's counter. The UPDATE only
+        matches rows still unread, so concurrent calls never count a message twice.
+        Returns the number of messages marked.
+        """
+        with transaction.atomic():
+            marked = self.filter(recipient_id=recipient_id, is_read=False).update(is_read=True)
+            if marked:
+                CustomUser.apply_unread(recipient_id, -marked)
+        return marked
+
+
 class Message(models.Model):
     """
     Stores a message sent between two users with read status and constraints.
@@ -209,6 +728,8 @@ class Message(models.Model):
     message_body = models.TextField(max_length=1000, null=False, blank=False)
     is_read = models.BooleanField(default=False, help_text="Indicates if the message has been read")
 
+    objects = MessageQuerySet.as_manager()
+
     class Meta:
         constraints = [
             models.CheckConstraint(
@@ -216,6 +737,163 @@ class Message(models.Model):
                 name='prevent_self_messaging'
             )
         ]
+        indexes = [
+            # Keyset pagination order
+            models.Index(fields=['sent_at', 'message_id']),
+            # Inbox pages and mark-all-read; InnoDB appends the primary key, which the keyset pages tie-break on
+            models.Index(fields=['recipient', 'is_read', 'sent_at']),
+            # Conversations: one range per direction
+            models.Index(fields=['sender', 'recipient', 'sent_at']),
+        ]
+
+    def save(self, *args, **kwargs):
+        """
+        Saves the message and moves the recipients' unread counters by the difference
+        between the stored row and this one, in the same transaction.
+        """
+        with transaction.atomic():
+            before = None
+            if not self._state.adding:
+                before = Message.objects.select_for_update().filter(pk=self.pk).values_list(
+                    'recipient_id', 'is_read').first()
+            adding = self._state.adding
+            super().save(*args, **kwargs)
+            if adding:
+                events.publish('message', {
+                    'message_id': self.message_id,
+                    'sender': self.sender_id,
+                    'recipient': self.recipient_id,
+                    'sent_at': self.sent_at,
+                    'message_title': self.message_title,
+                }, [self.recipient_id])
+            if before == (self.recipient_id, self.is_read):
+                return
+            if before and not before[1]:
+                CustomUser.apply_unread(before[0], -1)
+            if not self.is_read:
+                CustomUser.apply_unread(self.recipient_id, 1)
+
+    def __str__(self):
+        return f"Message {self.message_title} from {self.sender} to {self.recipient}"
+
+@receiver(post_delete, sender=Review)
+def withdraw_rating(sender, instance, **kwargs):
+    """Covers review.delete(), queryset deletes and cascades from users and bookings."""
+    if instance.is_approved:
+        Listing.apply_rating(instance.listing_id, instance.review_rating, -1)
+
+
+@receiver(post_delete, sender=Message)
+def withdraw_unread(sender, instance, **kwargs):
+    """Covers message.delete(), queryset deletes and cascades from the sender."""
+    if not instance.is_read:
+        CustomUser.apply_unread(instance.recipient_id, -1)
+
+
+class ListingStats(models.Model):
+    """
+    Occupancy and revenue of one listing over one period, rebuilt by refresh_rollups
+    from ListingNight and Payment. Rows only exist for periods with activity.
+    """
+    listing = models.ForeignKey(Listing, on_delete=models.CASCADE)
+    nights_booked = models.PositiveIntegerField(default=0, help_text="Nights held by confirmed bookings")
+    nights_pending = models.PositiveIntegerField(default=0, help_text="Nights held by pending bookings")
+    booked_revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0,
+                                         help_text="Nightly rate of the confirmed nights")
+    payments_count = models.PositiveIntegerField(default=0)
+    paid_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0,
+                                      help_text="Completed payments, by payment date")
+
+    class Meta:
+        abstract = True
+
+
+class ListingDailyStats(ListingStats):
+    day = models.DateField()
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=['listing', 'day'], name='unique_listing_day_stats')]
+
+
+class ListingMonthlyStats(ListingStats):
+    month = models.DateField(help_text="First day of the month")
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=['listing', 'month'], name='unique_listing_month_stats')]
+
+
+class RollupChange(models.Model):
+    """
+    Days [first_day, last_day) of a listing whose stats a booking or payment write
+    changed, queued for the next incremental refresh_rollups, which rebuilds the
+    months they fall in and deletes the row. The listing is not a constraint: the
+    rows of a listing's bookings are written while the listing itself is deleted.
+    """
+    listing = models.ForeignKey(Listing, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+')
+    first_day = models.DateField()
+    last_day = models.DateField()
+
+    @classmethod
+    def record(cls, listing_id, first_day, last_day):
+        if listing_id is not None and last_day > first_day:
+            cls.objects.create(listing_id=listing_id, first_day=first_day, last_day=last_day)
 
     def __str__(self):
-        return f"Message {self.message_title} from {self.sender} to {self.recipient}"
\ No newline at end of file
+        return f"{self.listing_id} from {self.first_day} to {self.last_day}"
+
+
+class RollupWatermark(models.Model):
+    """
+    When refresh_rollups last ran. Without one the next run is a full rebuild, which
+    is how bulk loaders that skip RollupChange (seed, import_dataset) get their rows
+    counted; both delete it.
+    """
+    name = models.CharField(max_length=50, primary_key=True)
+    processed_until = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.name} up to {self.processed_until}"
+
+
+class DeletionStamp(models.Model):
+    """
+    When a row was last deleted from a table. A deletion leaves no updated_at
+    behind, so ConditionalGetMixin dates collections by the newest of the table's
+    MAX(updated_at) and this.
+    """
+    table = models.CharField(max_length=100, primary_key=True)
+    deleted_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.table} last deleted from at {self.deleted_at}"
+
+
+@receiver(post_delete, sender=CustomUser)
+@receiver(post_delete, sender=Listing)
+@receiver(post_delete, sender=Booking)
+@receiver(post_delete, sender=Payment)
+def stamp_deletion(sender, instance, **kwargs):
+    DeletionStamp.objects.update_or_create(table=sender._meta.db_table, defaults={'deleted_at': timezone.now()})
+
+
+@receiver(post_delete, sender=Booking)
+@receiver(post_delete, sender=Payment)
+def mark_listing_changed(sender, instance, **kwargs):
+    """
+    A deleted booking or payment leaves no updated_at behind, so bump its listing's
+    instead, and queue the stats days it counted on for refresh_rollups.
+    """
+    if sender is Booking:
+        # Its nights went with it
+        listing_cache.availability_changed()
+        listing = Listing.objects.filter(pk=instance.listing_id)
+        RollupChange.record(instance.listing_id, instance.start_date.date(), instance.end_date.date())
+    else:
+        listing = Listing.objects.filter(booking__booking_id=instance.booking_id_id)
+        instance.record_rollup_change(instance.booking_id_id, instance.payment_date)
+    listing.update(updated_at=timezone.now())
+
+
+@receiver(post_delete, sender=Listing)
+def forget_listing(sender, instance, **kwargs):
+    listing_cache.listing_changed(instance.pk)
@@ -0,0 +1,34 @@
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+class StandardPagination(PageNumberPagination):
+    """
+    Default page-number pagination for every list endpoint.
+    """
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Cursor pagination for the large, append-mostly tables. Each page is a
+    WHERE <column> < <cursor> ... LIMIT n range scan on an index instead of an
+    OFFSET scan, so deep pages cost the same as the first one.
+    Subclasses set `ordering` to an indexed timestamp plus the primary key as tie-breaker.
+    """
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+
+class MessageCursorPagination(KeysetPagination):
+    ordering = ('-sent_at', '-message_id')
+
+
+class BookingCursorPagination(KeysetPagination):
+    ordering = ('-created_at', '-booking_id')
+
+
+class PaymentCursorPagination(KeysetPagination):
+    ordering = ('-payment_date', '-payment_id')
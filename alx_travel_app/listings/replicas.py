@@ -0,0 +1,135 @@
+"""
+Read-replica routing for the databases listed in the DATABASE_REPLICAS setting
+(by default every DATABASES['replica_*'] alias).
+
+ReplicaRoutingMiddleware sends the reads of GET/HEAD/OPTIONS requests to one
+replica, picked per request so a page and its count see the same copy. Other
+requests, and code running outside a request, use the primary. So do reads
+inside a transaction on the primary, and the reads that follow a write in the
+same request.
+
+A request that writes pins its client to the primary for REPLICA_STICKY_SECONDS
+through a cookie, so the client reads its own writes while replication catches
+up. The window should exceed the usual replica lag. Reporting code outside
+requests, such as export_dataset, opts in with `with replica_reads():`.
+"""
+import math
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+PIN_COOKIE = 'db_primary_until'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class Routing:
+    """Where the reads of one request, or replica_reads() block, go."""
+    def __init__(self, replica=None):
+        self.replica = replica
+        self.wrote = False
+
+
+_routing = ContextVar('replica_routing', default=None)
+
+
+def replica_aliases():
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+def sticky_seconds():
+    return getattr(settings, 'REPLICA_STICKY_SECONDS', 5)
+
+
+def read_alias():
+    """The database a read made now goes to."""
+    routing = _routing.get()
+    if routing is None or routing.replica is None or routing.wrote:
+        return DEFAULT_DB_ALIAS
+    if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+        return DEFAULT_DB_ALIAS
+    return routing.replica
+
+
+def reading_replica():
+    return read_alias() != DEFAULT_DB_ALIAS
+
+
+def pick_replica():
+    aliases = replica_aliases()
+    return random.choice(aliases) if aliases else None
+
+
+@contextmanager
+def replica_reads():
+    """Sends the reads of the block to a replica, for reports run outside a request."""
+    token = _routing.set(Routing(pick_replica()))
+    try:
+        yield
+    finally:
+        _routing.reset(token)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        return read_alias()
+
+    def db_for_write(self, model, **hints):
+        routing = _routing.get()
+        if routing is not None:
+            routing.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        return True
+
+
+class ReplicaRoutingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def routing_for(self, request):
+        if request.method not in SAFE_METHODS:
+            return Routing()
+        try:
+            pinned = float(request.COOKIES.get(PIN_COOKIE, 0)) > time.time()
+        except ValueError:
+            pinned = False
+        return Routing(None if pinned else pick_replica())
+
+    def pin(self, response, routing):
+        if routing.wrote:
+            window = sticky_seconds()
+            response.set_cookie(PIN_COOKIE, str(math.ceil(time.time() + window)), max_age=window,
+                                httponly=True, samesite='Lax')
+        return response
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        routing = self.routing_for(request)
+        token = _routing.set(routing)
+        try:
+            response = self.get_response(request)
+        finally:
+            _routing.reset(token)
+        return self.pin(response, routing)
+
+    async def __acall__(self, request):
+        routing = self.routing_for(request)
+        token = _routing.set(routing)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _routing.reset(token)
+        return self.pin(response, routing)
@@ -0,0 +1,192 @@
+"""
+Daily and monthly occupancy/revenue rollups per listing, used by the host dashboard.
+
+Booking and payment writes queue the days they changed as RollupChange rows.
+refresh_rollups() widens each to whole months and rebuilds just those months of
+ListingDailyStats and ListingMonthlyStats from ListingNight and Payment, so the
+work follows what changed rather than each listing's history. A full refresh
+rebuilds every listing over all time.
+"""
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import (
+    Listing, ListingDailyStats, ListingMonthlyStats, ListingNight, Payment, RollupChange, RollupWatermark,
+)
+
+WATERMARK = 'listing-stats'
+
+CENTS = Decimal('0.01')
+STAT_FIELDS = ('nights_booked', 'nights_pending', 'booked_revenue', 'payments_count', 'paid_amount')
+
+
+def changed_windows(changes):
+    """
+    (listing_id, first month, month after the last) per listing for RollupChange
+    (listing_id, first_day, last_day) rows, overlapping and adjacent ones merged.
+    """
+    by_listing = defaultdict(list)
+    for listing_id, first_day, last_day in changes:
+        by_listing[listing_id].append((first_day.replace(day=1), _next_month(last_day - timedelta(days=1))))
+    windows = []
+    for listing_id, spans in sorted(by_listing.items()):
+        spans.sort()
+        start, end = spans[0]
+        for span_start, span_end in spans[1:]:
+            if span_start > end:
+                windows.append((listing_id, start, end))
+                start = span_start
+            end = max(end, span_end)
+        windows.append((listing_id, start, end))
+    return windows
+
+
+def _window_filter(windows, listing_field, day_field):
+    """Q matching rows of each (listing_id, start, end) window; start None means the listing's whole history."""
+    whole = [listing_id for listing_id, start, _ in windows if start is None]
+    condition = Q(**{f'{listing_field}__in': whole}) if whole else Q(pk__in=[])
+    for listing_id, start, end in windows:
+        if start is not None:
+            condition |= Q(**{listing_field: listing_id, f'{day_field}__gte': start, f'{day_field}__lt': end})
+    return condition
+
+
+def _empty():
+    return dict.fromkeys(STAT_FIELDS, 0)
+
+
+def compute_stats(windows):
+    """
+    Builds the daily and monthly stats rows of a batch of (listing_id, start, end)
+    windows. Returns (daily, monthly) lists of unsaved model instances.
+    """
+    days = defaultdict(_empty)
+
+    nights = ListingNight.objects.filter(_window_filter(windows, 'listing_id', 'night'), booking__isnull=False).values_list(
+        'listing_id', 'night', 'booking__booking_status', 'booking__nightly_rate')
+    for listing_id, night, status, rate in nights:
+        stats = days[(listing_id, night)]
+        if status == 'CONFIRMED':
+            stats['nights_booked'] += 1
+            stats['booked_revenue'] += rate
+        else:
+            stats['nights_pending'] += 1
+
+    payments = Payment.objects.filter(
+        _window_filter(windows, 'booking_id__listing_id', 'payment_date__date'), payment_status='COMPLETED'
+    ).values_list('booking_id__listing_id', 'payment_date', 'amount')
+    for listing_id, paid_at, amount in payments:
+        stats = days[(listing_id, timezone.localdate(paid_at))]
+        stats['payments_count'] += 1
+        stats['paid_amount'] += amount
+
+    months = defaultdict(_empty)
+    for (listing_id, day), stats in days.items():
+        month = months[(listing_id, day.replace(day=1))]
+        for field in STAT_FIELDS:
+            month[field] += stats[field]
+
+    daily = [ListingDailyStats(listing_id=listing_id, day=day, **stats) for (listing_id, day), stats in days.items()]
+    monthly = [ListingMonthlyStats(listing_id=listing_id, month=month, **stats) for (listing_id, month), stats in months.items()]
+    return daily, monthly
+
+
+def rebuild(windows, batch_size=1000):
+    """Replaces the stats rows of a batch of windows in one transaction; returns (daily, monthly) row counts."""
+    daily, monthly = compute_stats(windows)
+    with transaction.atomic():
+        ListingDailyStats.objects.filter(_window_filter(windows, 'listing_id', 'day')).delete()
+        ListingMonthlyStats.objects.filter(_window_filter(windows, 'listing_id', 'month')).delete()
+        ListingDailyStats.objects.bulk_create(daily, batch_size=batch_size)
+        ListingMonthlyStats.objects.bulk_create(monthly, batch_size=batch_size)
+    return len(daily), len(monthly)
+
+
+def refresh_rollups(full=False, chunk_size=500, batch_size=1000):
+    """
+    Brings the stats tables up to date. Incremental by default; full=True, or a
+    first run, rebuilds every listing. Returns a dict of counters for reporting.
+    """
+    started = timezone.now()
+    # Rows queued after this read are left for the next run
+    changes = list(RollupChange.objects.order_by('pk').values_list('pk', 'listing_id', 'first_day', 'last_day'))
+    if full or not RollupWatermark.objects.filter(name=WATERMARK).exists():
+        # Rows of deleted listings went with them (CASCADE), so rebuilding every listing suffices
+        windows = [(pk, None, None) for pk in Listing.objects.order_by('pk').values_list('pk', flat=True)]
+    else:
+        windows = changed_windows(change[1:] for change in changes)
+
+    totals = {
+        'changes': len(changes), 'listings': len({window[0] for window in windows}),
+        'months': sum(_months_between(start, end) for _, start, end in windows if start is not None),
+        'daily rows': 0, 'monthly rows': 0,
+    }
+    for i in range(0, len(windows), chunk_size):
+        daily, monthly = rebuild(windows[i:i + chunk_size], batch_size=batch_size)
+        totals['daily rows'] += daily
+        totals['monthly rows'] += monthly
+
+    for i in range(0, len(changes), batch_size):
+        RollupChange.objects.filter(pk__in=[change[0] for change in changes[i:i + batch_size]]).delete()
+    RollupWatermark.objects.update_or_create(name=WATERMARK, defaults={'processed_until': started})
+    return totals
+
+
+def _months_between(start, end):
+    return (end.year - start.year) * 12 + end.month - start.month
+
+
+def _next_month(day):
+    return (day.replace(day=1) + timedelta(days=32)).replace(day=1)
+
+
+def default_range(period, today):
+    """The last 30 days, or the last 12 months including the current one, as [start, end)."""
+    if period == 'day':
+        return today - timedelta(days=29), today + timedelta(days=1)
+    start = today.replace(day=1)
+    for _ in range(11):
+        start = (start - timedelta(days=1)).replace(day=1)
+    return start, _next_month(today)
+
+
+def series(listing, period, start, end):
+    """
+    Dense dashboard series for [start, end): one entry per day or per month
+    touching the range, with zeros where the rollups have no row.
+    """
+    if period == 'month':
+        model, key = ListingMonthlyStats, 'month'
+        start = start.replace(day=1)
+        buckets = []
+        current = start
+        while current < end:
+            buckets.append(current)
+            current = _next_month(current)
+    else:
+        model, key = ListingDailyStats, 'day'
+        buckets = [start + timedelta(days=d) for d in range((end - start).days)]
+
+    rows = {
+        row[key]: row
+        for row in model.objects.filter(listing=listing, **{f'{key}__gte': start, f'{key}__lt': end}).values(key, *STAT_FIELDS)
+    }
+    points = []
+    for bucket in buckets:
+        row = rows.get(bucket) or _empty()
+        nights_in_period = (_next_month(bucket) - bucket).days if period == 'month' else 1
+        points.append({
+            'date': bucket,
+            'nights_booked': row['nights_booked'],
+            'nights_pending': row['nights_pending'],
+            'occupancy': round(row['nights_booked'] / nights_in_period, 4),
+            'booked_revenue': Decimal(row['booked_revenue']).quantize(CENTS),
+            'payments_count': row['payments_count'],
+            'paid_amount': Decimal(row['paid_amount']).quantize(CENTS),
+        })
+    return points
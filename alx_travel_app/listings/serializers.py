@@ -1,7 +1,83 @@
+from django.core.exceptions import ValidationError as DjangoValidationError
 from .models import CustomUser, Listing, Booking, Payment, Review, Message
 from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
 
-class CustomUserSerializer(serializers.ModelSerializer):
+
+def field_paths(raw):
+    """'booking_id,listing.name' -> {'booking_id': {}, 'listing': {'name': {}}}"""
+    tree = {}
+    for path in raw.split(','):
+        node = tree
+        for part in path.strip().split('.'):
+            if part:
+                node = node.setdefault(part, {})
+    return tree
+
+
+class ExpandableFieldsMixin:
+    """
+    Sparse fieldsets and expandable relations on reads:
+    ?fields=booking_id,listing.name   only these keys; dotted paths reach into expanded relations
+    ?expand=listing,user              embed these relations instead of their primary keys
+    `expandable_fields` maps a relation to the serializer embedded when it is expanded;
+    otherwise it renders as its primary key. The root serializer reads the query
+    parameters and hands each nested one its part of the trees. Writes ignore both.
+    """
+    expandable_fields = {}
+
+    def __init__(self, *args, fields=None, expand=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is None and expand is None:
+            fields, expand = self.requested_paths()
+        self.field_tree = fields or {}
+        self.expand_tree = expand or {}
+
+    def requested_paths(self):
+        request = self.context.get('request')
+        if request is None or request.method not in SAFE_METHODS:
+            return {}, {}
+        params = getattr(request, 'query_params', request.GET)
+        return field_paths(params.get('fields', '')), field_paths(params.get('expand', ''))
+
+    def get_fields(self):
+        fields = super().get_fields()
+        for name, expand in self.expand_tree.items():
+            if name not in self.expandable_fields:
+                raise serializers.ValidationError({'expand': f"'{name}' cannot be expanded."})
+            # Keep the source of the primary-key field it replaces, e.g. Payment.booking -> booking_id
+            source = {'source': fields[name].source} if name in fields and fields[name].source != name else {}
+            fields[name] = self.expandable_fields[name](
+                read_only=True, fields=self.field_tree.get(name), expand=expand, **source
+            )
+        if self.field_tree:
+            unknown = set(self.field_tree) - set(fields)
+            if unknown:
+                raise serializers.ValidationError({'fields': f"Unknown fields: {', '.join(sorted(unknown))}."})
+            fields = {name: field for name, field in fields.items() if name in self.field_tree or field.write_only}
+        return fields
+
+
+class PreloadedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    Looks keys up in context['preloaded'][field_name], filled with one query for a
+    whole batch by listings.bulk, instead of running a query per item. Without a
+    preloaded map it behaves like PrimaryKeyRelatedField.
+    """
+    def to_internal_value(self, data):
+        preloaded = self.context.get('preloaded', {}).get(self.field_name)
+        if preloaded is None:
+            return super().to_internal_value(data)
+        try:
+            pk = self.get_queryset().model._meta.pk.to_python(data)
+        except (DjangoValidationError, TypeError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        if pk not in preloaded:
+            self.fail('does_not_exist', pk_value=data)
+        return preloaded[pk]
+
+
+class CustomUserSerializer(ExpandableFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = CustomUser
         fields = (
@@ -13,7 +89,13 @@ class CustomUserSerializer(serializers.ModelSerializer):
             'user_role',
             'bio',
         )
-class ListingSerializer(serializers.ModelSerializer):
+class ListingSerializer(ExpandableFieldsMixin, serializers.ModelSerializer):
+    # Only present on ?near= searches, which annotate it
+    distance_km = serializers.FloatField(read_only=True)
+    rating_histogram = serializers.DictField(child=serializers.IntegerField(), read_only=True)
+    expandable_fields = {'host': CustomUserSerializer}
+    serializer_related_field = PreloadedPrimaryKeyRelatedField
+
     class Meta:
         model = Listing
         fields = (
@@ -22,24 +104,34 @@ class ListingSerializer(serializers.ModelSerializer):
             'host',
             'description',
             'location',
+            'latitude',
+            'longitude',
+            'distance_km',
             'price_per_night',
             'created_at',
             'capacity',
             'amenities',
-            'availability',
+            'rating_count',
+            'rating_avg',
+            'rating_histogram',
         )
-class BookingSerializer(serializers.ModelSerializer):
-    
-    listing = ListingSerializer(read_only = True)
-    user = CustomUserSerializer(read_only = True)
-    total_price = serializers.SerializerMethodField()
-    
+class BookingSerializer(ExpandableFieldsMixin, serializers.ModelSerializer):
+    listing = serializers.PrimaryKeyRelatedField(read_only=True)
+    user = serializers.PrimaryKeyRelatedField(read_only=True)
+    listing_id = serializers.PrimaryKeyRelatedField(source='listing', queryset=Listing.objects.all(), write_only=True)
+    user_id = serializers.PrimaryKeyRelatedField(source='user', queryset=CustomUser.objects.filter(user_role='guest'), write_only=True)
+    # The stored price snapshot, rendered as a number like the method field it replaced
+    total_price = serializers.DecimalField(max_digits=12, decimal_places=2, coerce_to_string=False, read_only=True)
+    expandable_fields = {'listing': ListingSerializer, 'user': CustomUserSerializer}
+
     class Meta:
         model = Booking
         fields = (
             'booking_id',
             'listing',
             'user',
+            'listing_id',
+            'user_id',
             'start_date',
             'end_date',
             'booking_status',
@@ -47,9 +139,6 @@ class BookingSerializer(serializers.ModelSerializer):
             'total_price'
         )
         
-    def get_total_price(self, obj) -> float:
-        return obj.get_total_price
-        
     def validate(self, data):
         start = data.get('start_date')
         end = data.get('end_date')
@@ -63,13 +152,17 @@ class BookingSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Invalid user or user is not a guest.")
         return data
         
-class PaymentSerializer(serializers.ModelSerializer):
-    user = CustomUserSerializer(read_only = True)
-    booking = BookingSerializer(read_only = True)    
+class PaymentSerializer(ExpandableFieldsMixin, serializers.ModelSerializer):
+    user = serializers.PrimaryKeyRelatedField(read_only=True)
+    # The booking paid for; Booking.booking_payment, its reverse, may not link back yet
+    booking = serializers.PrimaryKeyRelatedField(source='booking_id', read_only=True)
+    expandable_fields = {'user': CustomUserSerializer, 'booking': BookingSerializer}
+
     class Meta:
         model = Payment
         fields = (
         'payment_id',
+        'booking_id',
         'amount',
         'payment_date',
         'payment_method',
@@ -80,19 +173,23 @@ class PaymentSerializer(serializers.ModelSerializer):
         
     def validate_amount(self, value):
         if value <= 0:
-            serializers.ValidationError("Amount cannot be 0 or less than zero")
+            raise serializers.ValidationError("Amount cannot be 0 or less than zero")
         return value
     def validate(self, data):
-        booking = data.get('booking_id')
+        booking = data.get('booking_id', getattr(self.instance, 'booking_id', None))
         amount = data.get('amount')
         if booking and amount and booking.total_price != amount:
             raise serializers.ValidationError("Payment amount must match booking total price.")
+        if booking and not self.instance:
+            # The guest who booked pays
+            data['user'] = booking.user
         return data
         
-class ReviewSerializer(serializers.ModelSerializer):
-    user = CustomUserSerializer(read_only = True)
-    listing = ListingSerializer(read_only = True)
-    
+class ReviewSerializer(ExpandableFieldsMixin, serializers.ModelSerializer):
+    user = serializers.PrimaryKeyRelatedField(read_only=True)
+    listing = serializers.PrimaryKeyRelatedField(read_only=True)
+    expandable_fields = {'user': CustomUserSerializer, 'listing': ListingSerializer}
+
     class Meta:
         model = Review
         fields = (
@@ -108,9 +205,10 @@ class ReviewSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Review Must be Between 1 - 5")
         return value
         
-class MessageSerializer(serializers.ModelSerializer):
-    sender = CustomUserSerializer(read_only = True)
+class MessageSerializer(ExpandableFieldsMixin, serializers.ModelSerializer):
+    sender = serializers.PrimaryKeyRelatedField(read_only=True)
     recipient = serializers.PrimaryKeyRelatedField(queryset=CustomUser.objects.all())
+    expandable_fields = {'sender': CustomUserSerializer, 'recipient': CustomUserSerializer}
 
     class Meta:
         model = Message
@@ -120,8 +218,11 @@ class MessageSerializer(serializers.ModelSerializer):
         'recipient',
         'sent_at',
         'message_title',
-        'message_body'
+        'message_body',
+        'is_read'
         )
+        # Changed through mark-read, which keeps the unread counters in step
+        read_only_fields = ('is_read',)
     def validate_message_body(self, value):
         if not value.strip():
             raise serializers.ValidationError("Message body cannot be blank")
@@ -131,5 +232,33 @@ class MessageSerializer(serializers.ModelSerializer):
         if not value.strip():
             raise serializers.ValidationError("Message title cannot be blank")
         return value
-    
-        
\ No newline at end of file
+
+
+class MarkReadSerializer(serializers.Serializer):
+    message_ids = serializers.ListField(child=serializers.UUIDField(), allow_empty=False, max_length=500)
+
+
+# Longest range and most ranges one calendar item may carry
+MAX_RANGE_NIGHTS = 366
+MAX_RANGES = 50
+
+
+class NightRangeSerializer(serializers.Serializer):
+    """Nights from start up to, not including, end."""
+    start = serializers.DateField()
+    end = serializers.DateField()
+
+    def validate(self, data):
+        nights = (data['end'] - data['start']).days
+        if nights < 1:
+            raise serializers.ValidationError("end must be after start.")
+        if nights > MAX_RANGE_NIGHTS:
+            raise serializers.ValidationError(f"A range may cover at most {MAX_RANGE_NIGHTS} nights.")
+        return data
+
+
+class CalendarSyncSerializer(serializers.Serializer):
+    """One listing's calendar changes from a channel manager: nights to block and nights to release."""
+    property_id = serializers.UUIDField()
+    block = NightRangeSerializer(many=True, required=False, max_length=MAX_RANGES)
+    release = NightRangeSerializer(many=True, required=False, max_length=MAX_RANGES)
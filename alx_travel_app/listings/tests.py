@@ -1,3 +1,1594 @@
-from django.test import TestCase
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from unittest import mock, skipUnless
+import asyncio
+import csv
+import gzip
+import hashlib
+import io
+import json
+import math
+import os
+import tempfile
+import threading
+import uuid
 
-# Create your tests here.
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.management import call_command
+from django.db import OperationalError, connection, transaction
+from django.db.migrations.executor import MigrationExecutor
+from django.db.models import Count, Exists, F, OuterRef, Q, QuerySet
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.permissions import IsAdminUser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APITestCase, APITransactionTestCase
+from rest_framework.throttling import AnonRateThrottle
+
+from alx_travel_app.pooled_mysql import pool
+
+from . import events, replicas
+from .datasets import DATASET_MODELS, dataset_fields
+from .filters import NEAR_MAX_RADIUS
+from .models import (
+    ACTIVE_BOOKING_STATUSES, EARTH_RADIUS_KM, RESERVE_MAX_ATTEMPTS, Booking, CustomUser, Listing,
+    ListingDailyStats, ListingMonthlyStats, ListingNight, Message, Payment, Review, RollupChange, RollupWatermark,
+)
+from .pagination import KeysetPagination, StandardPagination
+from .rollups import STAT_FIELDS, refresh_rollups
+from .serializers import BookingSerializer, MessageSerializer, PaymentSerializer, ReviewSerializer
+from .views import BookingViewSet, ListingViewSet, MessageViewSet
+
+
+class QueryBudgetMixin:
+    """
+    Assertion helper for keeping endpoints free of N+1 queries.
+    """
+    @contextmanager
+    def assertMaxQueries(self, limit):
+        with CaptureQueriesContext(connection) as ctx:
+            yield ctx
+        executed = len(ctx.captured_queries)
+        if executed > limit:
+            queries = '\n'.join(q['sql'] for q in ctx.captured_queries)
+            self.fail(f"{executed} queries executed, expected at most {limit}:\n{queries}")
+
+
+def make_dataset(rows=5):
+    """
+    Creates `rows` of every model, each booking with its own payment and review,
+    plus a message from every guest to the host.
+    """
+    host = CustomUser.objects.create(
+        username='host', email='host@example.com', first_name='Mumbi', last_name='Ngugi',
+        phone_number='+254712345621', user_role='host'
+    )
+    guests = [
+        CustomUser.objects.create(
+            username=f'guest{i}', email=f'guest{i}@example.com', first_name='Wanjiku', last_name='Muthoni',
+            phone_number=f'+2547123456{i:02d}', user_role='guest'
+        )
+        for i in range(rows)
+    ]
+    start = timezone.make_aware(datetime(2025, 3, 1))
+    for i, guest in enumerate(guests):
+        listing = Listing.objects.create(
+            host=host, name=f'Diani Beach Cottage {i}', description='Cozy cottage steps from the beach',
+            location='Diani', price_per_night='8500.00', capacity=3, amenities={'wifi': True}
+        )
+        booking = Booking.objects.create(
+            listing=listing, user=guest, start_date=start, end_date=start + timedelta(days=3),
+            booking_status='CONFIRMED'
+        )
+        payment = Payment.objects.create(
+            booking_id=booking, amount=booking.get_total_price, payment_method='MOBILE MONEY',
+            payment_status='COMPLETED', transaction_id=f'TX{i:06d}', user=guest
+        )
+        booking.booking_payment = payment
+        booking.save()
+        Review.objects.create(user=guest, booking=booking, listing=listing, review_rating=5, is_approved=True)
+        Message.objects.create(sender=guest, recipient=host, message_title='Check-in Details',
+                               message_body='Please provide check-in instructions.')
+    return host, guests
+
+
+class EndpointQueryCountTests(QueryBudgetMixin, APITestCase):
+    """
+    Every list and detail endpoint must run a fixed number of queries however many rows it returns.
+    """
+    LIST_BUDGET = 4
+    DETAIL_BUDGET = 3
+
+    @classmethod
+    def setUpTestData(cls):
+        make_dataset(rows=8)
+
+    def endpoints(self):
+        return [
+            ('/api/users/', CustomUser.objects.first().pk),
+            ('/api/property/', Listing.objects.first().pk),
+            ('/api/bookings/', Booking.objects.first().pk),
+            ('/api/payments/', Payment.objects.first().pk),
+            ('/api/reviews/', Review.objects.first().pk),
+            ('/api/messages/', Message.objects.first().pk),
+        ]
+
+    def test_list_endpoints(self):
+        for url, _ in self.endpoints():
+            with self.subTest(url=url), self.assertMaxQueries(self.LIST_BUDGET):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+
+    def test_detail_endpoints(self):
+        for url, pk in self.endpoints():
+            with self.subTest(url=url), self.assertMaxQueries(self.DETAIL_BUDGET):
+                response = self.client.get(f'{url}{pk}/')
+                self.assertEqual(response.status_code, 200)
+
+
+class FastReadParityTests(APITestCase):
+    """
+    The fast list path must render exactly what the serializers and JSONRenderer would.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        host, guests = make_dataset(rows=6)
+        # Edge cases: no profile image, a payment its booking doesn't link back to,
+        # a review without comment, and text JSONRenderer escapes
+        CustomUser.objects.filter(pk=guests[0].pk).update(profile_image=None)
+        Booking.objects.filter(user=guests[1]).update(booking_payment=None)
+        Review.objects.filter(user=guests[2]).update(comment=None)
+        Message.objects.create(sender=host, recipient=guests[3], message_title='Karibu \u2028 ☀',
+                               message_body='Line\u2029separator, émojis 🏖 and "quotes"')
+
+    def assertParity(self, url, queryset, serializer_class, pk_name):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        ids = [row[pk_name] for row in response.data['results']]
+        self.assertTrue(ids)
+        instances = {str(pk): obj for pk, obj in queryset.in_bulk(ids).items()}
+        expected = serializer_class(
+            [instances[pk] for pk in ids], many=True, context={'request': response.wsgi_request}
+        ).data
+        payload = dict(response.data, results=expected)
+        self.assertEqual(response.content, JSONRenderer().render(payload))
+
+    def test_list_endpoints_match_serializers(self):
+        cases = [
+            ('/api/bookings/?page_size=4', Booking.objects.all(), BookingSerializer, 'booking_id'),
+            ('/api/payments/', Payment.objects.all(), PaymentSerializer, 'payment_id'),
+            ('/api/reviews/', Review.objects.all(), ReviewSerializer, 'review_id'),
+            ('/api/messages/', Message.objects.all(), MessageSerializer, 'message_id'),
+            ('/api/messages/?ordering=sent_at', Message.objects.all(), MessageSerializer, 'message_id'),
+            ('/api/bookings/?expand=listing.host,user&fields=booking_id,listing.name,listing.rating_histogram,listing.host,user.profile_image,total_price',
+             Booking.objects.all(), BookingSerializer, 'booking_id'),
+            ('/api/payments/?expand=booking.listing,booking.user,user', Payment.objects.all(), PaymentSerializer, 'payment_id'),
+            ('/api/messages/?expand=sender,recipient', Message.objects.all(), MessageSerializer, 'message_id'),
+        ]
+        for url, queryset, serializer_class, pk_name in cases:
+            with self.subTest(url=url):
+                self.assertParity(url, queryset, serializer_class, pk_name)
+
+
+class AsyncReadParityTests(APITestCase):
+    """
+    The async endpoints under /api/async/ must answer exactly like their sync counterparts.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.host, guests = make_dataset(rows=6)
+        Listing.objects.filter(name__endswith='0').update(latitude='-4.297800', longitude='39.594800')
+        Listing.objects.filter(name__endswith='1').update(latitude='-4.290000', longitude='39.590000')
+        Message.objects.filter(sender=guests[0]).update(is_read=True)
+
+    def assertSameResponse(self, path):
+        sync = self.client.get(f'/api/{path}')
+        asynchronous = self.client.get(f'/api/async/{path}')
+        self.assertEqual(asynchronous.status_code, sync.status_code)
+        # Pagination links carry the path
+        self.assertEqual(asynchronous.content.replace(b'/api/async/', b'/api/'), sync.content)
+        return asynchronous
+
+    def test_listing_endpoints(self):
+        listing = Listing.objects.order_by('name').first()
+        booked = Booking.objects.get(listing=listing)
+        stay = f'check_in={booked.start_date.date()}&check_out={booked.end_date.date() + timedelta(days=2)}'
+        paths = [
+            'property/', 'property/?page_size=2&page=2', 'property/?page=9', 'property/?near=-4.29,39.59&radius=5',
+            'property/?fields=property_id,host,rating_histogram&expand=host', 'property/?fields=nope',
+            f'property/?{stay}', f'property/{listing.pk}/', f'property/{listing.pk}/?expand=host',
+            'property/not-a-uuid/', 'property/00000000-0000-0000-0000-000000000000/',
+            'property/00000000-0000-0000-0000-000000000000/availability/?check_in=2030-01-01&check_out=2030-01-03',
+            f'property/{listing.pk}/availability/?{stay}',
+            f'property/{listing.pk}/availability/?check_in=2030-01-01&check_out=2030-01-03',
+            f'property/{listing.pk}/availability/?check_in=2030-01-03',
+        ]
+        for path in paths:
+            with self.subTest(path=path):
+                self.assertSameResponse(path)
+
+    def test_conditional_and_cached_responses(self):
+        first = self.assertSameResponse('property/')
+        self.assertEqual(self.client.get('/api/async/property/', HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304)
+        self.assertEqual(
+            self.client.get('/api/async/property/', HTTP_IF_MODIFIED_SINCE=first['Last-Modified']).status_code, 304
+        )
+
+    def test_view_checks_run(self):
+        class OnePerMinute(AnonRateThrottle):
+            rate = '1/min'
+
+        cache.clear()
+        with mock.patch.object(ListingViewSet, 'throttle_classes', [OnePerMinute]):
+            self.assertEqual(self.client.get('/api/async/property/').status_code, 200)
+            throttled = self.client.get('/api/async/property/')
+            self.assertEqual(throttled.status_code, 429)
+            self.assertIn('Retry-After', throttled)
+        with mock.patch.object(ListingViewSet, 'permission_classes', [IsAdminUser]):
+            for path in ['property/', 'property/not-a-uuid/']:
+                with self.subTest(path=path):
+                    self.assertEqual(self.assertSameResponse(path).status_code, 403)
+
+    def test_inbox(self):
+        self.assertEqual(self.client.get('/api/async/messages/inbox/').status_code, 403)
+        self.client.force_login(self.host)
+        for path in ['messages/inbox/', 'messages/inbox/?unread=true&page_size=2', 'messages/inbox/?expand=sender']:
+            with self.subTest(path=path):
+                self.assertSameResponse(path)
+
+
+class CursorPaginationTests(APITestCase):
+    """
+    Walking the keyset cursors of bookings and messages visits every row once in
+    the pagination order, even across runs of equal timestamps.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.host, cls.guests = make_dataset(rows=7)
+        # Runs of tied created_at / sent_at that straddle the page boundaries
+        bookings = list(Booking.objects.values_list('pk', flat=True))
+        messages = list(Message.objects.values_list('pk', flat=True))
+        tied = timezone.make_aware(datetime(2025, 2, 1, 9))
+        Booking.objects.filter(pk__in=bookings[:5]).update(created_at=tied)
+        Message.objects.filter(pk__in=messages[1:6]).update(sent_at=tied)
+
+    def walk(self, url, page_size):
+        seen, pages = [], 0
+        response = self.client.get(url, {'page_size': page_size})
+        while True:
+            self.assertEqual(response.status_code, 200)
+            pages += 1
+            seen.extend(response.data['results'])
+            if response.data['next'] is None:
+                return seen, pages
+            response = self.client.get(response.data['next'])
+
+    def assertWalks(self, url, queryset, key, pagination):
+        expected = [str(pk) for pk in queryset.order_by(*pagination.ordering).values_list('pk', flat=True)]
+        for page_size in (1, 2, 3, len(expected)):
+            with self.subTest(url=url, page_size=page_size):
+                rows, pages = self.walk(url, page_size)
+                self.assertEqual([str(row[key]) for row in rows], expected)
+                self.assertEqual(pages, -(-len(expected) // page_size))
+
+    def test_bookings_walk(self):
+        self.assertWalks('/api/bookings/', Booking.objects.all(), 'booking_id', BookingViewSet.pagination_class)
+
+    def test_messages_walk(self):
+        self.client.force_authenticate(self.host)
+        self.assertWalks('/api/messages/', Message.objects.all(), 'message_id', MessageViewSet.pagination_class)
+
+    def test_last_page_has_no_next(self):
+        response = self.client.get('/api/bookings/', {'page_size': 10})
+        self.assertEqual(len(response.data['results']), Booking.objects.count())
+        self.assertIsNone(response.data['next'])
+        self.assertIsNone(response.data['previous'])
+
+    def test_page_size_is_capped(self):
+        limit = KeysetPagination.max_page_size
+        Message.objects.bulk_create([
+            Message(sender=self.guests[i % len(self.guests)], recipient=self.host,
+                    message_title='Check-in Details', message_body='Please provide check-in instructions.')
+            for i in range(limit)
+        ])
+        self.client.force_authenticate(self.host)
+        response = self.client.get('/api/messages/', {'page_size': limit * 2})
+        self.assertEqual(len(response.data['results']), limit)
+        self.assertIsNotNone(response.data['next'])
+        rest = self.client.get(response.data['next'])
+        self.assertEqual(len(rest.data['results']), Message.objects.count() - limit)
+
+    def test_page_number_size_is_capped(self):
+        limit = StandardPagination.max_page_size
+        CustomUser.objects.bulk_create([
+            CustomUser(username=f'user{i}', email=f'user{i}@example.com', first_name='Wanjiku',
+                       last_name='Muthoni', phone_number='+254712345600', user_role='guest')
+            for i in range(limit)
+        ])
+        response = self.client.get('/api/users/', {'page_size': limit * 2})
+        self.assertEqual(len(response.data['results']), limit)
+        self.assertEqual(response.data['count'], CustomUser.objects.count())
+        self.assertIsNotNone(response.data['next'])
+
+
+class ListingCacheTests(APITestCase):
+    """
+    Cached listing responses are replaced when anything they render changes,
+    including the embedded host.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.host, _ = make_dataset(rows=2)
+        cls.listing = Listing.objects.first()
+
+    def setUp(self):
+        cache.clear()
+
+    def test_host_changes_invalidate_embedded_hosts(self):
+        for url in [f'/api/property/{self.listing.pk}/?expand=host&fields=host.first_name',
+                    '/api/property/?expand=host&fields=name,host.first_name']:
+            with self.subTest(url=url):
+                first = self.client.get(url)
+                self.assertIn(b'Mumbi', first.content)
+                self.host.first_name = 'Achieng'
+                with self.captureOnCommitCallbacks(execute=True):
+                    self.host.save()
+                second = self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+                self.assertEqual(second.status_code, 200)
+                self.assertIn(b'Achieng', second.content)
+                self.host.first_name = 'Mumbi'
+                with self.captureOnCommitCallbacks(execute=True):
+                    self.host.save()
+
+    def test_login_stamp_keeps_the_cache(self):
+        url = f'/api/property/{self.listing.pk}/'
+        first = self.client.get(url)
+        self.host.last_login = timezone.now()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.host.save(update_fields=['last_login'])
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304)
+
+
+class ConditionalGetTests(APITestCase):
+    """
+    Validators change when an embedded user does, so ?expand= responses are not answered 304 stale.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.host, cls.guests = make_dataset(rows=2)
+        cls.booking = Booking.objects.filter(user=cls.guests[0]).get()
+        cls.payment = Payment.objects.get(booking_id=cls.booking)
+
+    def test_user_save_changes_the_etag(self):
+        urls = [f'/api/bookings/{self.booking.pk}/?expand=user', '/api/bookings/?expand=user',
+                f'/api/payments/{self.payment.pk}/?expand=user', '/api/payments/?expand=user']
+        etags = {url: self.client.get(url)['ETag'] for url in urls}
+        guest = self.guests[0]
+        guest.first_name = 'Njeri'
+        guest.save(update_fields=['first_name'])
+        for url, etag in etags.items():
+            with self.subTest(url=url):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+                self.assertIn(b'Njeri', response.content)
+
+    def test_host_change_dates_listings(self):
+        url = f'/api/property/{self.booking.listing_id}/?expand=host'
+        last_modified = self.client.get(url)['Last-Modified']
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 304)
+        CustomUser.objects.filter(pk=self.host.pk).update(updated_at=timezone.now() + timedelta(minutes=1))
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 200)
+        self.assertEqual(
+            self.client.get('/api/property/?expand=host', HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 200
+        )
+
+    def test_login_keeps_updated_at(self):
+        guest = CustomUser.objects.get(pk=self.guests[1].pk)
+        stamp = guest.updated_at
+        guest.last_login = timezone.now()
+        guest.save(update_fields=['last_login'])
+        guest.refresh_from_db()
+        self.assertEqual(guest.updated_at, stamp)
+
+
+class PaymentApiTests(APITestCase):
+    """
+    Payments render the booking they pay for, whether or not the booking links back.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.host, cls.guests = make_dataset(rows=1)
+        listing = Listing.objects.get()
+        start = timezone.make_aware(datetime(2025, 5, 1))
+        cls.booking = Booking.objects.create(
+            listing=listing, user=cls.guests[0], start_date=start, end_date=start + timedelta(days=2),
+            booking_status='PENDING'
+        )
+
+    def test_created_payment_renders_its_booking(self):
+        response = self.client.post('/api/payments/', {
+            'booking_id': str(self.booking.pk), 'amount': str(self.booking.total_price),
+            'payment_method': 'MOBILE MONEY', 'payment_status': 'PENDING',
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(response.data['booking'], self.booking.pk)
+        self.assertEqual(response.data['booking_id'], self.booking.pk)
+        self.assertEqual(response.data['user'], self.guests[0].pk)
+
+        url = f"/api/payments/{response.data['payment_id']}/?expand=booking.user&fields=booking.booking_id,booking.user.first_name"
+        detail = self.client.get(url)
+        self.assertEqual(detail.data['booking'], {'booking_id': str(self.booking.pk), 'user': {'first_name': 'Wanjiku'}})
+        listed = self.client.get('/api/payments/?expand=booking&fields=payment_id,booking.booking_id')
+        self.assertIn(str(self.booking.pk), [row['booking']['booking_id'] for row in listed.data['results']])
+
+class NestedParentTests(APITestCase):
+    """
+    Nested routes list and retrieve only the children of their parent, and answer
+    404 for a missing or malformed parent key.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.host, cls.guests = make_dataset(rows=3)
+        cls.other_host = CustomUser.objects.create(
+            username='other', email='other@example.com', first_name='Otieno', last_name='Odhiambo',
+            phone_number='+254712345699', user_role='host'
+        )
+        cls.other_listing = Listing.objects.create(
+            host=cls.other_host, name='Lamu Dhow House', description='Old town rooftop',
+            location='Lamu', price_per_night='6000.00', capacity=2, amenities={}
+        )
+        cls.listing = Listing.objects.exclude(pk=cls.other_listing.pk).first()
+
+    def ids(self, url, key):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return {str(row[key]) for row in response.data['results']}
+
+    def test_lists_only_the_parents_children(self):
+        self.assertEqual(self.ids(f'/api/users/{self.other_host.pk}/listings/', 'property_id'),
+                         {str(self.other_listing.pk)})
+        bookings = Booking.objects.filter(listing=self.listing).values_list('pk', flat=True)
+        self.assertEqual(self.ids(f'/api/property/{self.listing.pk}/bookings/', 'booking_id'),
+                         {str(pk) for pk in bookings})
+        guest = self.guests[0]
+        self.assertEqual(self.ids(f'/api/users/{guest.pk}/messages/', 'message_id'),
+                         {str(pk) for pk in Message.objects.filter(sender=guest).values_list('pk', flat=True)})
+        message = Message.objects.filter(sender=guest).get()
+        self.assertEqual(self.ids(f'/api/messages/{message.pk}/sender/', 'user_id'), {str(guest.pk)})
+        self.assertEqual(self.ids(f'/api/users/{self.other_host.pk}/bookings/', 'booking_id'), set())
+
+    def test_child_of_another_parent_is_not_found(self):
+        booking = Booking.objects.filter(listing=self.listing).first()
+        self.assertEqual(self.client.get(f'/api/property/{self.listing.pk}/bookings/{booking.pk}/').status_code, 200)
+        self.assertEqual(self.client.get(f'/api/property/{self.other_listing.pk}/bookings/{booking.pk}/').status_code, 404)
+
+    def test_missing_or_malformed_parent_is_not_found(self):
+        for url in ['/api/property/00000000-0000-0000-0000-000000000000/bookings/',
+                    '/api/property/not-a-uuid/bookings/',
+                    '/api/users/00000000-0000-0000-0000-000000000000/listings/']:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 404)
+                self.assertTrue(response.data['detail'].endswith('not found.'))
+
+
+class RatingAggregateTests(APITestCase):
+    """
+    The rating columns on Listing follow approved reviews through saves, approvals,
+    rating changes and deletes, and refresh_ratings() repairs any drift.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.host, (cls.guest,) = make_dataset(rows=1)
+        cls.listing = Listing.objects.get()
+
+    def assertRatings(self, count, total, average, histogram):
+        listing = Listing.objects.get(pk=self.listing.pk)
+        self.assertEqual((listing.rating_count, listing.rating_sum), (count, total))
+        self.assertEqual(float(listing.rating_avg), average)
+        self.assertEqual(listing.rating_histogram, {i: histogram.get(i, 0) for i in range(1, 6)})
+
+    def test_saves_move_the_aggregates(self):
+        # make_dataset's approved five-star review
+        self.assertRatings(1, 5, 5.0, {5: 1})
+        review = Review.objects.create(user=self.guest, listing=self.listing, review_rating=2)
+        self.assertRatings(1, 5, 5.0, {5: 1})
+        review.is_approved = True
+        review.save()
+        self.assertRatings(2, 7, 3.5, {5: 1, 2: 1})
+        review.review_rating = 4
+        review.save()
+        self.assertRatings(2, 9, 4.5, {5: 1, 4: 1})
+        review.is_approved = False
+        review.save()
+        self.assertRatings(1, 5, 5.0, {5: 1})
+
+    def test_deletes_withdraw_ratings(self):
+        Review.objects.create(user=self.guest, listing=self.listing, review_rating=3, is_approved=True)
+        self.assertRatings(2, 8, 4.0, {5: 1, 3: 1})
+        Review.objects.filter(review_rating=5).delete()
+        self.assertRatings(1, 3, 3.0, {3: 1})
+        Review.objects.get().delete()
+        self.assertRatings(0, 0, 0.0, {})
+
+    def test_refresh_repairs_drift(self):
+        Listing.objects.filter(pk=self.listing.pk).update(rating_count=7, rating_sum=9, rating_avg=1.29, rating_1=7, rating_5=0)
+        self.assertEqual(Listing.objects.all().refresh_ratings(), 1)
+        self.assertRatings(1, 5, 5.0, {5: 1})
+        self.assertEqual(Listing.objects.all().refresh_ratings(), 0)
+
+class BookingReservationTests(APITestCase):
+    """
+    POST /api/bookings/ books through Booking.objects.reserve(): taken dates answer 409,
+    other invalid bookings 400, and a lock that stays contended 503 after the retries.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.host, (cls.guest,) = make_dataset(rows=1)
+        cls.listing = Listing.objects.get()
+        cls.booked = Booking.objects.get()
+
+    def book(self, start, end, listing=None):
+        return self.client.post('/api/bookings/', {
+            'listing_id': (listing or self.listing).pk, 'user_id': self.guest.pk,
+            'start_date': start, 'end_date': end, 'booking_status': 'PENDING',
+        })
+
+    def test_books_and_claims_the_nights(self):
+        response = self.book('2025-06-01T14:00:00Z', '2025-06-04T10:00:00Z')
+        self.assertEqual(response.status_code, 201)
+        nights = ListingNight.objects.filter(booking_id=response.data['booking_id']).values_list('night', flat=True)
+        self.assertEqual(sorted(nights), [date(2025, 6, 1), date(2025, 6, 2), date(2025, 6, 3)])
+
+    def test_overlapping_stay_conflicts(self):
+        start = self.booked.start_date + timedelta(days=1)
+        response = self.book(start.isoformat(), (start + timedelta(days=3)).isoformat())
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(Booking.objects.count(), 1)
+
+    def test_claimed_night_conflicts(self):
+        # A night taken without an overlapping booking row, as by a concurrent checkout
+        ListingNight.objects.create(listing=self.listing, night=date(2025, 7, 2))
+        response = self.book('2025-07-01T14:00:00Z', '2025-07-04T10:00:00Z')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(Booking.objects.count(), 1)
+
+    def test_other_model_errors_are_bad_requests(self):
+        # The stay's total overflows total_price
+        Listing.objects.filter(pk=self.listing.pk).update(price_per_night='99999999.99')
+        response = self.book('2025-06-01T14:00:00Z', '2025-10-01T10:00:00Z')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('total_price', response.data)
+
+    @mock.patch('listings.models.time.sleep')
+    def test_deadlocks_are_retried(self, sleep):
+        deadlock = OperationalError(1213, 'Deadlock found when trying to get lock')
+        save = Booking.save
+        calls = []
+
+        def flaky_save(booking, *args, **kwargs):
+            calls.append(booking)
+            if len(calls) < 3:
+                raise deadlock
+            return save(booking, *args, **kwargs)
+
+        with mock.patch.object(Booking, 'save', flaky_save):
+            response = self.book('2025-06-01T14:00:00Z', '2025-06-04T10:00:00Z')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(calls), 3)
+        self.assertEqual(sleep.call_count, 2)
+
+    @mock.patch('listings.models.time.sleep')
+    def test_exhausted_retries_are_unavailable(self, sleep):
+        deadlock = OperationalError(1213, 'Deadlock found when trying to get lock')
+        with mock.patch.object(Booking, 'save', side_effect=deadlock) as save:
+            response = self.book('2025-06-01T14:00:00Z', '2025-06-04T10:00:00Z')
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '1')
+        self.assertEqual(save.call_count, RESERVE_MAX_ATTEMPTS)
+        self.assertEqual(sleep.call_count, RESERVE_MAX_ATTEMPTS - 1)
+
+
+class ListingAvailabilityTests(APITestCase):
+    """
+    available_between() and ?check_in=&check_out= keep listings with no claimed
+    night in [check_in, check_out): the checkout day itself is free.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.host = CustomUser.objects.create(
+            username='host', email='host@example.com', first_name='Mumbi', last_name='Ngugi',
+            phone_number='+254712345621', user_role='host'
+        )
+        cls.guest = CustomUser.objects.create(
+            username='guest', email='guest@example.com', first_name='Wanjiku', last_name='Muthoni',
+            phone_number='+254712345600', user_role='guest'
+        )
+        cls.booked, cls.blocked, cls.free = [
+            Listing.objects.create(
+                host=cls.host, name=name, description='Cozy cottage steps from the beach',
+                location='Diani', price_per_night='8500.00', capacity=3, amenities={'wifi': True}
+            )
+            for name in ('Booked', 'Blocked', 'Free')
+        ]
+        # Nights of 1-3 June
+        Booking.objects.create(
+            listing=cls.booked, user=cls.guest, booking_status='CONFIRMED',
+            start_date=timezone.make_aware(datetime(2025, 6, 1, 14)),
+            end_date=timezone.make_aware(datetime(2025, 6, 4, 10)),
+        )
+        # Closed by the host, no booking
+        ListingNight.objects.create(listing=cls.blocked, night=date(2025, 6, 10))
+
+    def available(self, start, end):
+        return set(Listing.objects.available_between(start, end).values_list('pk', flat=True))
+
+    def test_claimed_night_in_the_stay_excludes(self):
+        everyone = {self.booked.pk, self.blocked.pk, self.free.pk}
+        self.assertEqual(self.available(date(2025, 6, 3), date(2025, 6, 5)), everyone - {self.booked.pk})
+        self.assertEqual(self.available(date(2025, 5, 30), date(2025, 6, 2)), everyone - {self.booked.pk})
+        self.assertEqual(self.available(date(2025, 6, 9), date(2025, 6, 12)), everyone - {self.blocked.pk})
+
+    def test_checkout_day_is_free(self):
+        # The stay checks out on 4 June, so a stay checking in that day is free
+        everyone = {self.booked.pk, self.blocked.pk, self.free.pk}
+        self.assertEqual(self.available(date(2025, 6, 4), date(2025, 6, 6)), everyone)
+        # and one checking out on 1 June ends before the first claimed night
+        self.assertEqual(self.available(date(2025, 5, 29), date(2025, 6, 1)), everyone)
+
+    def test_back_to_back_stays(self):
+        # Checking in on the previous guest's checkout day books, and claims the next nights
+        Booking.objects.create(
+            listing=self.booked, user=self.guest, booking_status='PENDING',
+            start_date=timezone.make_aware(datetime(2025, 6, 4, 14)),
+            end_date=timezone.make_aware(datetime(2025, 6, 6, 10)),
+        )
+        nights = ListingNight.objects.filter(listing=self.booked).values_list('night', flat=True)
+        self.assertEqual(sorted(nights), [date(2025, 6, d) for d in range(1, 6)])
+        self.assertNotIn(self.booked.pk, self.available(date(2025, 6, 5), date(2025, 6, 7)))
+        self.assertIn(self.booked.pk, self.available(date(2025, 6, 6), date(2025, 6, 8)))
+
+    def test_stay_filter_on_the_list(self):
+        response = self.client.get('/api/property/', {'check_in': '2025-06-03', 'check_out': '2025-06-11'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['property_id'] for row in response.data['results']], [str(self.free.pk)])
+        response = self.client.get('/api/property/', {'check_in': '2025-06-04', 'check_out': '2025-06-10'})
+        self.assertEqual({row['property_id'] for row in response.data['results']},
+                         {str(self.booked.pk), str(self.blocked.pk), str(self.free.pk)})
+        response = self.client.get('/api/property/', {'check_in': '2025-06-04', 'check_out': '2025-06-04'})
+        self.assertEqual(response.status_code, 400)
+
+
+class ListingFilterTests(APITestCase):
+    """
+    ListingFilter's structured filters, the ?search= fallback and ?ordering= on
+    /api/property/, checked against the exact listings returned.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        host = CustomUser.objects.create(
+            username='host', email='host@example.com', first_name='Mumbi', last_name='Ngugi',
+            phone_number='+254712345621', user_role='host'
+        )
+        rows = [
+            ('Beach Villa', 'Steps from the beach', 'Diani', '5000.00', 2, {'wifi': True, 'pool': True}),
+            ('Garden Cottage', 'Quiet garden cottage', 'Diani', '8500.00', 4, {'wifi': True}),
+            ('Mountain Lodge', 'Views of Mount Kenya', 'Nanyuki', '12000.00', 6, {'wifi': False, 'pool': True}),
+            ('Old Town House', 'Swahili house by the water', 'Lamu', '20000.00', 8, {}),
+            ('Ocean View Studio', 'Sea breeze all day', 'Diani', '8500.00', 2, {'pool': True}),
+        ]
+        cls.villa, cls.cottage, cls.lodge, cls.house, cls.studio = listings = [
+            Listing.objects.create(
+                host=host, name=name, description=description, location=location,
+                price_per_night=price, capacity=capacity, amenities=amenities
+            )
+            for name, description, location, price, capacity, amenities in rows
+        ]
+        # Oldest first, so the default -created_at order is the reverse of `rows`
+        for day, listing in enumerate(listings, start=1):
+            Listing.objects.filter(pk=listing.pk).update(created_at=timezone.make_aware(datetime(2025, 1, day)))
+
+    def setUp(self):
+        cache.clear()
+
+    def assertListed(self, params, expected):
+        response = self.client.get('/api/property/', params)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['property_id'] for row in response.data['results']],
+                         [str(listing.pk) for listing in expected])
+
+    def assertRejected(self, params, field):
+        response = self.client.get('/api/property/', params)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn(field, response.data)
+
+    def test_price_range(self):
+        self.assertListed({'min_price': '5000', 'max_price': '8500'}, [self.studio, self.cottage, self.villa])
+        self.assertListed({'min_price': '8500.01'}, [self.house, self.lodge])
+        self.assertListed({'max_price': '4999.99'}, [])
+        self.assertRejected({'min_price': '9000', 'max_price': '8000'}, 'max_price')
+        self.assertRejected({'min_price': 'cheap'}, 'min_price')
+        self.assertRejected({'max_price': '-1'}, 'max_price')
+
+    def test_guests(self):
+        self.assertListed({'guests': 4}, [self.house, self.lodge, self.cottage])
+        self.assertListed({'guests': 9}, [])
+        self.assertRejected({'guests': 0}, 'guests')
+        self.assertRejected({'guests': 'two'}, 'guests')
+
+    def test_location(self):
+        self.assertListed({'location': 'Diani'}, [self.studio, self.cottage, self.villa])
+        self.assertListed({'location': ' Lamu '}, [self.house])
+        self.assertListed({'location': 'Malindi'}, [])
+
+    def test_amenities(self):
+        self.assertListed({'amenities': 'wifi'}, [self.cottage, self.villa])
+        self.assertListed({'amenities': 'pool'}, [self.studio, self.lodge, self.villa])
+        self.assertListed({'amenities': 'wifi, pool'}, [self.villa])
+        self.assertRejected({'amenities': 'wifi,hot-tub'}, 'amenities')
+
+    def test_filters_combine(self):
+        self.assertListed(
+            {'location': 'Diani', 'guests': 2, 'max_price': '8500', 'amenities': 'pool'}, [self.studio, self.villa]
+        )
+
+    @skipUnless(connection.vendor != 'mysql', "MySQL answers ?search= from the FULLTEXT index")
+    def test_search_fallback(self):
+        # icontains over name, description and location
+        self.assertListed({'search': 'beach'}, [self.villa])
+        self.assertListed({'search': 'COTTAGE'}, [self.cottage])
+        self.assertListed({'search': 'lamu'}, [self.house])
+        self.assertListed({'search': 'sea'}, [self.studio])
+        self.assertListed({'search': 'diani view'}, [self.studio])
+        self.assertListed({'search': 'Malindi'}, [])
+
+    def test_ordering(self):
+        self.assertListed({'ordering': 'name'}, [self.villa, self.cottage, self.lodge, self.studio, self.house])
+        self.assertListed({'ordering': '-capacity,name'}, [self.house, self.lodge, self.cottage, self.villa, self.studio])
+        self.assertListed({'ordering': 'created_at'}, [self.villa, self.cottage, self.lodge, self.house, self.studio])
+
+    def test_invalid_ordering_is_ignored(self):
+        default = [self.studio, self.house, self.lodge, self.cottage, self.villa]
+        for ordering in ('host__password', 'availability', '-description'):
+            with self.subTest(ordering=ordering):
+                self.assertListed({'ordering': ordering}, default)
+
+
+class ListingProximityTests(APITestCase):
+    """
+    ?near=lat,lng&radius=km keeps the listings within the haversine radius, not
+    merely inside the bounding box that narrows the candidates, nearest first.
+    """
+    CENTRE = (-4.28, 39.59)
+
+    @classmethod
+    def setUpTestData(cls):
+        host = CustomUser.objects.create(
+            username='host', email='host@example.com', first_name='Mumbi', last_name='Ngugi',
+            phone_number='+254712345621', user_role='host'
+        )
+        lat, lng = cls.CENTRE
+        # Offsets in degrees; at this latitude one degree is about 111 km either way
+        places = {
+            'next_door': (0.01, 0.0),       # ~1.1 km
+            'down_the_road': (0.0, -0.05),  # ~5.5 km
+            'edge': (-0.085, 0.0),          # ~9.5 km
+            'corner': (0.08, 0.08),         # ~12.6 km: in the 10 km box, outside the circle
+            'away': (0.5, 0.5),             # outside the box
+        }
+        cls.listings = {
+            name: Listing.objects.create(
+                host=host, name=name, description='Cozy cottage steps from the beach', location='Diani',
+                price_per_night='8500.00', capacity=3, amenities={},
+                latitude=Decimal(str(round(lat + dlat, 6))), longitude=Decimal(str(round(lng + dlng, 6)))
+            )
+            for name, (dlat, dlng) in places.items()
+        }
+        Listing.objects.create(
+            host=host, name='No coordinates', description='Cozy cottage steps from the beach', location='Diani',
+            price_per_night='8500.00', capacity=3, amenities={}
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def haversine(self, listing):
+        lat1, lng1 = (math.radians(v) for v in self.CENTRE)
+        lat2, lng2 = math.radians(listing.latitude), math.radians(listing.longitude)
+        a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+        return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+    def test_radius_excludes_the_box_corners(self):
+        response = self.client.get('/api/property/', {'near': '%s,%s' % self.CENTRE, 'radius': 10})
+        self.assertEqual(response.status_code, 200)
+        rows = response.data['results']
+        expected = [self.listings[name] for name in ('next_door', 'down_the_road', 'edge')]
+        self.assertEqual([row['property_id'] for row in rows], [str(listing.pk) for listing in expected])
+        for row, listing in zip(rows, expected):
+            self.assertAlmostEqual(row['distance_km'], self.haversine(listing), places=3)
+        # The corner is inside the candidate box, so only the haversine filter drops it
+        self.assertLess(self.haversine(self.listings['corner']), 10 * math.sqrt(2))
+        self.assertGreater(self.haversine(self.listings['corner']), 10)
+
+    def test_wider_radius_keeps_the_corner(self):
+        near = Listing.objects.near(*self.CENTRE, 13)
+        self.assertEqual(
+            list(near.values_list('name', flat=True)), ['next_door', 'down_the_road', 'edge', 'corner']
+        )
+
+    def test_malformed_near_is_a_bad_request(self):
+        for params in ({'near': 'diani'}, {'near': '-4.28'}, {'near': '-4.28,39.59,1'}, {'near': '-4.28;39.59'},
+                       {'near': 'nan,nan'}, {'near': '1e400,0'}, {'near': '91,0'}, {'near': '0,-181'}):
+            with self.subTest(**params):
+                response = self.client.get('/api/property/', params)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('near', response.data)
+        for radius in ('0', '-5', 'far', str(NEAR_MAX_RADIUS + 1)):
+            with self.subTest(radius=radius):
+                response = self.client.get('/api/property/', {'near': '%s,%s' % self.CENTRE, 'radius': radius})
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('radius', response.data)
+
+
+class NightCalendarMigrationTests(APITransactionTestCase):
+    """
+    Migration 0004 turns the Listing.availability JSON calendar into ListingNight
+    rows, linked to the active booking covering each night.
+    """
+    before = [('listings', '0003_remove_booking_total_price_and_more')]
+    after = [('listings', '0004_listingnight')]
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        self.migrate(MigrationExecutor(connection).loader.graph.leaf_nodes())
+
+    def test_calendar_becomes_nights(self):
+        apps = self.migrate(self.before)
+        User = apps.get_model('listings', 'CustomUser')
+        Listing = apps.get_model('listings', 'Listing')
+        Booking = apps.get_model('listings', 'Booking')
+        host = User.objects.create(
+            username='host', email='host@example.com', first_name='Mumbi', last_name='Ngugi',
+            phone_number='+254712345621', user_role='host'
+        )
+        guest = User.objects.create(
+            username='guest', email='guest@example.com', first_name='Wanjiku', last_name='Muthoni',
+            phone_number='+254712345600', user_role='guest'
+        )
+        listing, empty = [
+            Listing.objects.create(
+                host=host, name=name, description='Cozy cottage steps from the beach', location='Diani',
+                price_per_night='8500.00', availability=availability
+            )
+            for name, availability in (
+                ('Calendar', {'2025-03-01': True, '2025-03-02': True, '2025-03-03': False, '2025-04-10': True}),
+                ('Empty', {}),
+            )
+        ]
+        stay = Booking.objects.create(
+            listing=listing, user=guest, booking_status='CONFIRMED',
+            start_date=timezone.make_aware(datetime(2025, 3, 1, 14)),
+            end_date=timezone.make_aware(datetime(2025, 3, 3, 10)),
+        )
+        # Cancelled: its night stays blocked but is not linked to it
+        Booking.objects.create(
+            listing=listing, user=guest, booking_status='CANCELLED',
+            start_date=timezone.make_aware(datetime(2025, 4, 10, 14)),
+            end_date=timezone.make_aware(datetime(2025, 4, 11, 10)),
+        )
+
+        apps = self.migrate(self.after)
+        ListingNight = apps.get_model('listings', 'ListingNight')
+        self.assertEqual(
+            sorted(ListingNight.objects.values_list('listing_id', 'night', 'booking_id')),
+            [
+                (listing.pk, date(2025, 3, 1), stay.pk),
+                (listing.pk, date(2025, 3, 2), stay.pk),
+                (listing.pk, date(2025, 4, 10), None),
+            ]
+        )
+        self.assertFalse(ListingNight.objects.filter(listing_id=empty.pk).exists())
+
+
+class BookingPriceTests(APITestCase):
+    """
+    Bookings keep the nightly rate they were made at; SQL night counts match night_dates().
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.host, (cls.guest,) = make_dataset(rows=1)
+        cls.listing = Listing.objects.get()
+
+    def stay(self, start, end, **kwargs):
+        return Booking(listing=self.listing, user=self.guest, booking_status='PENDING',
+                       start_date=timezone.make_aware(start), end_date=timezone.make_aware(end), **kwargs)
+
+    def test_price_is_snapshotted(self):
+        booking = self.stay(datetime(2025, 6, 1, 14), datetime(2025, 6, 4, 10))
+        booking.save()
+        self.assertEqual((booking.nightly_rate, booking.total_price), (Decimal('8500.00'), Decimal('25500.00')))
+        Listing.objects.filter(pk=self.listing.pk).update(price_per_night='9900.00')
+        booking.end_date += timedelta(days=1)
+        booking.save()
+        booking.refresh_from_db()
+        self.assertEqual((booking.nightly_rate, booking.total_price), (Decimal('8500.00'), Decimal('34000.00')))
+        quoted = Booking.objects.with_total_price().get(pk=booking.pk)
+        self.assertEqual((quoted.night_count, quoted.quoted_total_price), (4, Decimal('39600.00')))
+
+    def test_night_count_matches_night_dates(self):
+        stays = [
+            (datetime(2025, 6, 1, 23), datetime(2025, 6, 2, 1)),
+            (datetime(2025, 6, 1, 1), datetime(2025, 6, 1, 23)),
+            (datetime(2024, 12, 30, 14), datetime(2025, 3, 2, 10)),
+        ]
+        for start, end in stays:
+            with self.subTest(start=start, end=end):
+                booking = self.stay(start, end, nightly_rate=1, total_price=0)
+                booking.booking_status = 'CANCELLED'
+                booking.save()
+                counted = Booking.objects.with_total_price().values_list('night_count', flat=True).get(pk=booking.pk)
+                self.assertEqual(counted, len(booking.night_dates()))
+
+    def test_missing_listing_is_a_validation_error(self):
+        booking = self.stay(datetime(2025, 6, 1, 14), datetime(2025, 6, 4, 10))
+        booking.listing_id = uuid.uuid4()
+        with self.assertRaises(DjangoValidationError) as caught:
+            booking.save()
+        self.assertIn('listing', caught.exception.message_dict)
+
+class RollupRefreshTests(APITestCase):
+    """
+    An incremental refresh_rollups() rebuilds only the months its queued changes
+    touched and leaves the stats exactly as a full refresh would.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        make_dataset(rows=3)
+        cls.listings = list(Listing.objects.order_by('name'))
+        guest = CustomUser.objects.filter(user_role='guest').first()
+        Booking.objects.create(
+            listing=cls.listings[0], user=guest, booking_status='CONFIRMED',
+            start_date=timezone.make_aware(datetime(2023, 1, 10)), end_date=timezone.make_aware(datetime(2023, 1, 14)),
+        )
+        refresh_rollups(full=True)
+
+    def snapshot(self):
+        return (
+            sorted(ListingDailyStats.objects.values_list('listing_id', 'day', *STAT_FIELDS)),
+            sorted(ListingMonthlyStats.objects.values_list('listing_id', 'month', *STAT_FIELDS)),
+        )
+
+    def test_incremental_matches_full(self):
+        old_history = set(ListingDailyStats.objects.filter(day__year=2023).values_list('pk', flat=True))
+        self.assertEqual(len(old_history), 4)
+        guest = CustomUser.objects.filter(user_role='guest').first()
+        Booking.objects.reserve(self.listings[0], guest, timezone.make_aware(datetime(2025, 5, 10)),
+                                timezone.make_aware(datetime(2025, 5, 13)), status='CONFIRMED')
+        moved = Booking.objects.get(listing=self.listings[1], start_date__year=2025)
+        moved.start_date, moved.end_date = moved.start_date + timedelta(days=150), moved.end_date + timedelta(days=152)
+        moved.save()
+        payment = Payment.objects.get(booking_id=moved)
+        payment.amount = 1
+        payment.save()
+        cancelled = Booking.objects.get(listing=self.listings[2])
+        cancelled.booking_status = 'CANCELLED'
+        cancelled.save()
+        Payment.objects.filter(booking_id=cancelled).delete()
+
+        totals = refresh_rollups()
+        self.assertEqual(totals['listings'], 3)
+        self.assertFalse(RollupChange.objects.exists())
+        incremental = self.snapshot()
+        # The 2023 stay was not rebuilt
+        self.assertEqual(set(ListingDailyStats.objects.filter(day__year=2023).values_list('pk', flat=True)), old_history)
+
+        refresh_rollups(full=True)
+        self.assertEqual(self.snapshot(), incremental)
+
+    def test_nothing_queued_rebuilds_nothing(self):
+        self.assertEqual(refresh_rollups()['listings'], 0)
+
+    def test_imported_rows_are_counted(self):
+        before = self.snapshot()
+        self.assertTrue(any(row[-1] for row in before[1]))
+        with tempfile.TemporaryDirectory() as directory:
+            call_command('export_dataset', directory, stdout=io.StringIO())
+            CustomUser.objects.all().delete()
+            refresh_rollups()
+            self.assertEqual(self.snapshot(), ([], []))
+            self.assertTrue(RollupWatermark.objects.exists())
+            call_command('import_dataset', directory, stdout=io.StringIO())
+        self.assertFalse(RollupWatermark.objects.exists())
+        refresh_rollups()
+        self.assertEqual(self.snapshot(), before)
+
+
+class ExportTests(APITestCase):
+    """
+    Streamed exports hold every matching row once, in the export_dataset format, for admins only.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.host, cls.guests = make_dataset(rows=5)
+        cls.admin = CustomUser.objects.create(
+            username='admin', email='admin@example.com', first_name='Amani', last_name='Otieno',
+            phone_number='+254712345699', user_role='admin', is_staff=True
+        )
+        # One booking per day from 2025-01-01
+        for day, booking in enumerate(Booking.objects.order_by('pk')):
+            Booking.objects.filter(pk=booking.pk).update(
+                created_at=timezone.make_aware(datetime(2025, 1, 1 + day, 12))
+            )
+
+    def setUp(self):
+        self.client.force_authenticate(self.admin)
+
+    def export(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_admins_only(self):
+        self.client.force_authenticate(self.guests[0])
+        self.assertEqual(self.client.get('/api/bookings/export/').status_code, 403)
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.get('/api/bookings/export/').status_code, 403)
+
+    @mock.patch.object(BookingViewSet, 'export_chunk_size', 2)
+    @mock.patch.object(BookingViewSet, 'export_first_chunk_size', 1)
+    def test_ndjson_pages_through_every_row(self):
+        lines = self.export('/api/bookings/export/?as=ndjson').splitlines()
+        rows = [json.loads(line) for line in lines]
+        self.assertEqual([row['booking_id'] for row in rows],
+                         [str(pk) for pk in Booking.objects.order_by('created_at', 'pk').values_list('pk', flat=True)])
+        self.assertEqual(list(rows[0]), [f.attname for f in dataset_fields(Booking)])
+
+    def test_csv_with_date_range(self):
+        response = self.client.get('/api/bookings/export/?as=csv&from=2025-01-02&to=2025-01-03')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="listings-booking-2025-01-02-2025-01-03.csv"')
+        header, *rows = csv.reader(io.StringIO(b''.join(response.streaming_content).decode()))
+        self.assertEqual(header, [f.attname for f in dataset_fields(Booking)])
+        days = [row[header.index('created_at')][:10] for row in rows]
+        self.assertEqual(days, ['2025-01-02', '2025-01-03'])
+
+    def test_nested_export_is_scoped(self):
+        guest = self.guests[0]
+        rows = self.export(f'/api/users/{guest.pk}/bookings/export/').splitlines()
+        self.assertEqual([json.loads(row)['user_id'] for row in rows], [str(guest.pk)])
+
+    def test_bad_parameters(self):
+        for query in ('as=xml', 'from=2025-13-01', 'from=2025-01-03&to=2025-01-02'):
+            with self.subTest(query=query):
+                self.assertEqual(self.client.get(f'/api/bookings/export/?{query}').status_code, 400)
+
+    def test_round_trip(self):
+        """A download matches export_dataset's part file, and a dump loads back unchanged."""
+        def snapshot():
+            return {model: list(model.objects.order_by('pk').values_list(*[f.attname for f in dataset_fields(model)]))
+                    for model in DATASET_MODELS}
+
+        before = snapshot()
+        with tempfile.TemporaryDirectory() as directory:
+            call_command('export_dataset', directory, format='ndjson', stdout=io.StringIO())
+            with gzip.open(os.path.join(directory, 'listings-payment-00000.ndjson.gz'), 'rt') as fh:
+                dumped = sorted(fh.read().splitlines())
+            self.assertEqual(sorted(self.export('/api/payments/export/').splitlines()), dumped)
+
+            CustomUser.objects.all().delete()
+            self.assertFalse(Booking.objects.exists())
+            call_command('import_dataset', directory, stdout=io.StringIO())
+        self.assertEqual(snapshot(), before)
+
+
+class BulkSyncTests(APITestCase):
+    """
+    Bulk endpoints answer one result per item in request order, write the valid
+    items in one transaction, and cap the batch size.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.host, cls.guests = make_dataset(rows=1)
+        cls.listing = Listing.objects.get()
+
+    def new_listing(self, name, **extra):
+        return {'host': str(self.host.pk), 'name': name, 'description': 'Sea view', 'location': 'Kilifi',
+                'price_per_night': '7000.00', 'capacity': 2, 'amenities': {}, **extra}
+
+    def test_listings_report_each_item(self):
+        response = self.client.post('/api/property/bulk/', [
+            self.new_listing('Kilifi Creek House'),
+            {'property_id': str(self.listing.pk), 'price_per_night': '9000.00'},
+            self.new_listing('No capacity', capacity=-1),
+            {'property_id': str(uuid.uuid4()), 'name': 'Gone'},
+            'not an object',
+            {'property_id': str(self.listing.pk), 'name': 'Twice'},
+        ], format='json')
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual((response.data['count'], response.data['failed']), (6, 4))
+        results = response.data['results']
+        self.assertEqual([r['index'] for r in results], list(range(6)))
+        self.assertEqual([r['status'] for r in results], ['created', 'updated', 'error', 'error', 'error', 'error'])
+        self.assertIn('capacity', results[2]['errors'])
+        self.assertEqual(results[3]['errors'], {'property_id': ["Listing not found."]})
+        self.assertTrue(Listing.objects.filter(pk=results[0]['property_id'], name='Kilifi Creek House').exists())
+        self.listing.refresh_from_db()
+        self.assertEqual((self.listing.price_per_night, self.listing.name), (Decimal('9000.00'), 'Diani Beach Cottage 0'))
+        self.assertEqual(Listing.objects.count(), 2)
+
+    def test_all_valid_answers_200_in_fixed_queries(self):
+        def post(count):
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.post(
+                    '/api/property/bulk/', [self.new_listing(f'Cottage {i}') for i in range(count)], format='json'
+                )
+            self.assertEqual(response.status_code, 200)
+            return len(ctx.captured_queries)
+
+        self.assertEqual(post(2), post(20))
+        self.assertEqual(Listing.objects.count(), 23)
+
+    def test_batch_limits(self):
+        with override_settings(LISTING_BULK_MAX_ITEMS=2):
+            for url, item in [('/api/property/bulk/', self.new_listing('Cottage')),
+                              ('/api/property/bulk-availability/', {'property_id': str(self.listing.pk)})]:
+                with self.subTest(url=url):
+                    self.assertEqual(self.client.post(url, [item] * 3, format='json').status_code, 400)
+                    self.assertEqual(self.client.post(url, [], format='json').status_code, 400)
+                    self.assertEqual(self.client.post(url, item, format='json').status_code, 400)
+        self.assertEqual(Listing.objects.count(), 1)
+
+    def test_one_transaction(self):
+        items = [self.new_listing('Kilifi Creek House'), {'property_id': str(self.listing.pk), 'capacity': 5}]
+        with mock.patch.object(type(Listing.objects), 'bulk_update', side_effect=OperationalError("lost connection")):
+            with self.assertRaises(OperationalError):
+                self.client.post('/api/property/bulk/', items, format='json')
+        self.assertFalse(Listing.objects.filter(name='Kilifi Creek House').exists())
+
+    def test_calendars(self):
+        other = Listing.objects.create(
+            host=self.host, name='Kilifi Creek House', description='Sea view', location='Kilifi',
+            price_per_night='7000.00', capacity=2, amenities={}
+        )
+        ListingNight.objects.create(listing=other, night=date(2025, 4, 10))
+        response = self.client.post('/api/property/bulk-availability/', [
+            # The booking from make_dataset holds 2025-03-01 to 03-03
+            {'property_id': str(self.listing.pk), 'block': [{'start': '2025-03-02', 'end': '2025-03-06'}]},
+            {'property_id': str(other.pk), 'release': [{'start': '2025-04-10', 'end': '2025-04-11'}],
+             'block': [{'start': '2025-04-20', 'end': '2025-04-22'}]},
+            {'property_id': str(uuid.uuid4()), 'block': [{'start': '2025-04-20', 'end': '2025-04-21'}]},
+            {'property_id': str(other.pk), 'block': [{'start': '2025-04-20', 'end': '2025-04-20'}]},
+        ], format='json')
+        self.assertEqual(response.status_code, 207)
+        results = response.data['results']
+        self.assertEqual([r['status'] for r in results], ['synced', 'synced', 'error', 'error'])
+        self.assertEqual((results[0]['blocked'], results[0]['conflicts']), (2, [date(2025, 3, 2), date(2025, 3, 3)]))
+        self.assertEqual((results[1]['blocked'], results[1]['released']), (2, 1))
+        self.assertEqual(
+            sorted(ListingNight.objects.filter(listing=other).values_list('night', flat=True)),
+            [date(2025, 4, 20), date(2025, 4, 21)]
+        )
+        self.assertEqual(ListingNight.objects.filter(listing=self.listing, booking__isnull=True).count(), 2)
+
+
+class UnreadCounterTests(APITestCase):
+    """
+    CustomUser.unread_messages follows every path that creates, reads, moves or deletes messages.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.host, cls.guests = make_dataset(rows=3)
+
+    def assertCounters(self, **expected):
+        users = {'host': self.host, **{f'guest{i}': guest for i, guest in enumerate(self.guests)}}
+        counters = dict(CustomUser.objects.values_list('pk', 'unread_messages'))
+        for name, user in users.items():
+            if user.pk not in counters:
+                continue  # Deleted
+            counter = counters[user.pk]
+            actual = Message.objects.filter(recipient=user, is_read=False).count()
+            self.assertEqual(counter, actual, f"{name}'s counter drifted")
+            if name in expected:
+                self.assertEqual(counter, expected[name], name)
+
+    def test_create_and_save(self):
+        self.assertCounters(host=3, guest0=0)
+        self.client.force_authenticate(self.guests[0])
+        response = self.client.post('/api/messages/', {
+            'recipient': str(self.host.pk), 'message_title': 'Late arrival', 'message_body': 'Arriving at 11pm.'
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertCounters(host=4)
+
+        message = Message.objects.get(pk=response.data['message_id'])
+        message.is_read = True
+        message.save()
+        self.assertCounters(host=3)
+        message.is_read = False
+        message.recipient = self.guests[1]
+        message.save()
+        self.assertCounters(host=3, guest1=1)
+        message.recipient = self.guests[2]
+        message.save()
+        self.assertCounters(guest1=0, guest2=1)
+
+    def test_mark_read(self):
+        mine = list(Message.objects.filter(recipient=self.host).values_list('pk', flat=True))
+        theirs = Message.objects.create(sender=self.host, recipient=self.guests[0], message_title='Karibu',
+                                        message_body='Welcome to Diani.')
+        # A session login reloads the user, and its counter, on every request
+        self.client.force_login(self.host)
+        response = self.client.post('/api/messages/mark-read/', {'message_ids': [str(mine[0]), str(theirs.pk)]}, format='json')
+        self.assertEqual(response.data, {'marked': 1, 'unread': 2})
+        # Already read: nothing to take off again
+        response = self.client.post('/api/messages/mark-read/', {'message_ids': [str(mine[0])]}, format='json')
+        self.assertEqual(response.data, {'marked': 0, 'unread': 2})
+        self.assertEqual(self.client.get('/api/messages/unread-count/').data, {'unread': 2})
+
+        response = self.client.post('/api/messages/mark-all-read/')
+        self.assertEqual(response.data, {'marked': 2, 'unread': 0})
+        self.assertCounters(host=0, guest0=1)
+        self.assertEqual(self.client.post('/api/messages/mark-read/', {'message_ids': []}, format='json').status_code, 400)
+
+    def test_deletes(self):
+        first, second, third = Message.objects.filter(recipient=self.host).order_by('sent_at')
+        second.is_read = True
+        second.save()
+        self.assertCounters(host=2)
+        second.delete()
+        self.assertCounters(host=2)
+        first.delete()
+        self.assertCounters(host=1)
+        # Cascades from the sender
+        third.sender.delete()
+        self.assertCounters(host=0)
+
+    def test_counter_endpoints_need_a_user(self):
+        for method, url in [('get', '/api/messages/unread-count/'), ('post', '/api/messages/mark-read/'),
+                            ('post', '/api/messages/mark-all-read/')]:
+            with self.subTest(url=url):
+                self.assertEqual(getattr(self.client, method)(url).status_code, 403)
+
+
+class EventPublishTests(APITestCase):
+    """
+    Message and booking events reach the channels of the users concerned once
+    their transaction commits, and the SSE stream delivers them.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.host, cls.guests = make_dataset(rows=1)
+        cls.booking = Booking.objects.get()
+
+    def published(self, write):
+        """The (channel, payload) pairs `write` publishes, checking nothing goes out before the commit."""
+        broker = mock.Mock()
+        with mock.patch.object(events, 'broker', return_value=broker):
+            with self.captureOnCommitCallbacks() as callbacks:
+                write()
+            broker.publish.assert_not_called()
+            for callback in callbacks:
+                callback()
+        return [c.args for c in broker.publish.call_args_list]
+
+    def test_message_and_booking_events(self):
+        guest = self.guests[0]
+        sent = self.published(lambda: Message.objects.create(
+            sender=guest, recipient=self.host, message_title='Late arrival', message_body='Arriving at 11pm.'
+        ))
+        self.assertEqual([channel for channel, _ in sent], [events.user_channel(self.host.pk)])
+        self.assertEqual(sent[0][1]['event'], 'message')
+        self.assertEqual(sent[0][1]['data']['sender'], guest.pk)
+
+        def cancel():
+            self.booking.booking_status = 'CANCELLED'
+            self.booking.save()
+        sent = self.published(cancel)
+        self.assertEqual([channel for channel, _ in sent], [events.user_channel(guest.pk), events.user_channel(self.host.pk)])
+        self.assertEqual({key: sent[0][1]['data'][key] for key in ('status', 'previous_status')},
+                         {'status': 'CANCELLED', 'previous_status': 'CONFIRMED'})
+        # Same status: nothing to push
+        self.assertEqual(self.published(self.booking.save), [])
+
+    def test_rolled_back_writes_publish_nothing(self):
+        def write():
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                Message.objects.create(sender=self.guests[0], recipient=self.host, message_title='Draft', message_body='...')
+                raise RuntimeError
+        self.assertEqual(self.published(write), [])
+
+    def test_local_broker(self):
+        broker = events.LocalBroker()
+
+        async def receive():
+            async with broker.subscribe('user:1') as mine, broker.subscribe('user:2') as theirs:
+                # Published from another thread, as a sync view would
+                thread = threading.Thread(target=broker.publish, args=('user:1', {'event': 'message', 'data': {}}))
+                thread.start()
+                thread.join()
+                event = await asyncio.wait_for(mine.get(), 1)
+                self.assertTrue(theirs.queue.empty())
+                for _ in range(events.SUBSCRIBER_QUEUE_SIZE + 1):
+                    broker.publish('user:2', {'event': 'message', 'data': {}})
+                await asyncio.sleep(0)
+                overflowed = await theirs.get()
+            return event, overflowed
+
+        event, overflowed = asyncio.run(receive())
+        self.assertEqual(event, {'event': 'message', 'data': {}, 'id': 1})
+        self.assertIs(overflowed, events.RESET)
+        self.assertEqual(broker.subscribers, {})
+
+    def test_stream_needs_asgi_and_a_user(self):
+        self.client.force_login(self.host)
+        self.assertEqual(self.client.get('/api/events/').status_code, 501)
+
+    async def test_stream(self):
+        self.assertEqual((await self.async_client.get('/api/events/')).status_code, 403)
+        await self.async_client.aforce_login(self.host)
+        response = await self.async_client.get('/api/events/')
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        chunks = aiter(response.streaming_content)
+        try:
+            ready = await anext(chunks)
+            self.assertTrue(ready.startswith(b'event: ready\n'))
+            events.broker().publish(events.user_channel(self.host.pk), {'event': 'message', 'data': {'message_id': 'm1'}})
+            self.assertRegex((await anext(chunks)).decode(), r'^event: message\nid: \d+\ndata: \{"message_id": "m1"\}\n\n$')
+            with mock.patch.object(events, 'KEEPALIVE', 0.01):
+                self.assertEqual(await anext(chunks), b': keepalive\n\n')
+        finally:
+            await chunks.aclose()
+
+
+class FakeConnection:
+    def __init__(self, number):
+        self.number = number
+        self.alive = True
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class FakeDriverError(Exception):
+    pass
+
+
+class ConnectionPoolTests(APITestCase):
+    """
+    The pool behind the pooled MySQL backend, on fake connections, and its metrics endpoint.
+    """
+    def make_pool(self, **options):
+        self.connections = []
+
+        def connect():
+            self.connections.append(FakeConnection(len(self.connections)))
+            return self.connections[-1]
+        return pool.ConnectionPool(connect, lambda connection: connection.alive, FakeDriverError, **options)
+
+    def test_reuses_returned_connections(self):
+        connections = self.make_pool(max_size=2)
+        first, reused = connections.acquire()
+        self.assertFalse(reused)
+        connections.release(first)
+        self.assertEqual(connections.acquire(), (first, True))
+        self.assertEqual(connections.acquire(), (self.connections[1], False))
+        self.assertEqual({key: connections.snapshot()[key] for key in ('open', 'in_use', 'idle', 'opened', 'reused')},
+                         {'open': 2, 'in_use': 2, 'idle': 0, 'opened': 2, 'reused': 1})
+
+    def test_waits_for_a_free_connection(self):
+        connections = self.make_pool(max_size=1, timeout=0.05)
+        held, _ = connections.acquire()
+        with self.assertRaises(FakeDriverError):
+            connections.acquire()
+        self.assertEqual({key: connections.snapshot()[key] for key in ('waits', 'timeouts')}, {'waits': 1, 'timeouts': 1})
+
+        connections.timeout = 5
+        releaser = threading.Timer(0.05, connections.release, args=(held,))
+        releaser.start()
+        self.assertEqual(connections.acquire(), (held, True))
+        releaser.join()
+        self.assertEqual(connections.snapshot()['waits'], 2)
+
+    def test_replaces_stale_connections(self):
+        connections = self.make_pool(max_size=1, check_after=0)
+        first, _ = connections.acquire()
+        connections.release(first)
+        first.alive = False
+        second, reused = connections.acquire()
+        self.assertFalse(reused)
+        self.assertTrue(first.closed)
+        self.assertEqual({key: connections.snapshot()[key] for key in ('open', 'failed_checks', 'closed')},
+                         {'open': 1, 'failed_checks': 1, 'closed': 1})
+        # Past max_lifetime: closed without a ping
+        connections.max_lifetime = -1
+        connections.release(second)
+        third, reused = connections.acquire()
+        self.assertEqual((reused, second.closed, connections.snapshot()['failed_checks']), (False, True, 1))
+
+    def test_frees_slots(self):
+        connections = self.make_pool(max_size=1, timeout=0)
+        broken, _ = connections.acquire()
+        connections.release(broken, reusable=False)
+        self.assertTrue(broken.closed)
+        with mock.patch.object(connections, 'connect', side_effect=FakeDriverError):
+            with self.assertRaises(FakeDriverError):
+                connections.acquire()
+        self.assertEqual(connections.acquire(), (self.connections[1], False))
+
+    def test_forgets_connections_after_fork(self):
+        connections = self.make_pool(max_size=1, timeout=0)
+        inherited, _ = connections.acquire()
+        connections.release(inherited)
+        with mock.patch.object(pool.os, 'getpid', return_value=connections.pid + 1):
+            fresh, reused = connections.acquire()
+        self.assertEqual((fresh is inherited, reused, inherited.closed), (False, False, False))
+
+    def test_endpoint(self):
+        admin = CustomUser.objects.create(
+            username='admin', email='admin@example.com', first_name='Amani', last_name='Otieno',
+            phone_number='+254712345699', user_role='admin', is_staff=True
+        )
+        self.assertEqual(self.client.get('/api/db-pool/').status_code, 403)
+        self.client.force_authenticate(admin)
+        with mock.patch.dict(pool.pools, {'replica_1': self.make_pool()}, clear=True):
+            stats = self.client.get('/api/db-pool/').data
+        self.assertEqual(stats['default'], {
+            'pooled': False,
+            'conn_max_age': settings.DATABASES['default']['CONN_MAX_AGE'],
+            'conn_health_checks': settings.DATABASES['default']['CONN_HEALTH_CHECKS'],
+        })
+        self.assertEqual(stats['replica_1'], {'pooled': True, **self.make_pool().snapshot()})
+
+
+class SeedCommandTests(APITestCase):
+    """
+    The bulk seed writes consistent data: no double-booked nights, payments linked
+    both ways and unread counters matching the messages.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        bulk_create = QuerySet.bulk_create
+        with mock.patch.object(QuerySet, 'bulk_create', autospec=True, side_effect=bulk_create) as writes:
+            call_command('seed', batch_size=250, stdout=io.StringIO())
+        cls.batch_sizes = {call.kwargs.get('batch_size') for call in writes.call_args_list}
+
+    def test_row_counts_and_batches(self):
+        self.assertEqual(self.batch_sizes, {250})
+        self.assertEqual((CustomUser.objects.count(), Listing.objects.count(), Message.objects.count()), (1000, 2000, 6000))
+        # Overlapping generated stays are dropped, never the fixed ones
+        self.assertTrue(4000 < Booking.objects.count() <= 5000)
+        self.assertTrue(0 < Payment.objects.count() <= 800)
+        self.assertTrue(0 < Review.objects.count() <= 800)
+
+    def test_no_double_bookings(self):
+        active = Booking.objects.filter(booking_status__in=ACTIVE_BOOKING_STATUSES)
+        overlapping = active.filter(listing=OuterRef('listing'), start_date__lt=OuterRef('end_date'),
+                                    end_date__gt=OuterRef('start_date')).exclude(pk=OuterRef('pk'))
+        self.assertFalse(active.filter(Exists(overlapping)).exists())
+        # One ListingNight per night of every active stay, and none for cancelled ones
+        nights = sum(len(booking.night_dates()) for booking in active)
+        self.assertEqual(ListingNight.objects.count(), nights)
+        self.assertFalse(ListingNight.objects.exclude(booking__booking_status__in=ACTIVE_BOOKING_STATUSES).exists())
+
+    def test_payments_link_back(self):
+        self.assertFalse(Payment.objects.exclude(booking_id__booking_payment=F('pk')).exists())
+        self.assertEqual(Booking.objects.filter(booking_payment__isnull=False).count(), Payment.objects.count())
+
+    def test_unread_counters(self):
+        users = CustomUser.objects.annotate(unread=Count('received_messages', filter=Q(received_messages__is_read=False)))
+        self.assertFalse(users.exclude(unread_messages=F('unread')).exists())
+        self.assertTrue(users.filter(unread_messages__gt=0).exists())
+
+
+class SeedWorkersTests(APITransactionTestCase):
+    """
+    The same --seed gives the same rows whatever --workers spreads the shards over.
+    Not a TestCase: the workers write over connections of their own.
+    """
+    def seeded(self, **options):
+        call_command('seed', seed=7, stdout=io.StringIO(), **options)
+        tables = {}
+        for model in DATASET_MODELS:
+            # updated_at takes the time of the run; ListingNight's auto-increment ids
+            # follow the order the shards finish in
+            columns = [f.attname for f in dataset_fields(model) if f.name != 'updated_at' and not f.auto_created]
+            rows = model.objects.order_by(*columns).values_list(*columns)
+            digest = hashlib.sha256()
+            for row in rows:
+                digest.update(repr(row).encode())
+            tables[model._meta.label] = (set(rows.values_list('pk', flat=True)) if model._meta.pk.attname in columns else None,
+                                         rows.count(), digest.hexdigest())
+        return tables
+
+    def test_same_rows_for_any_worker_count(self):
+        single = self.seeded(workers=1)
+        sharded = self.seeded(workers=3)
+        for label, (pks, count, digest) in single.items():
+            with self.subTest(model=label):
+                self.assertTrue(count)
+                # assertEqual() would diff thousands of keys
+                self.assertTrue(sharded[label][0] == pks, "Different primary keys")
+                self.assertEqual(sharded[label][1:], (count, digest))
+        self.assertEqual(Message.objects.filter(sent_at__date=date(2025, 5, 1)).count(), 200)
+
+# A replica with its own test database, as in alx_travel_app.test_settings
+REPLICA = 'replica_1'
+STANDALONE_REPLICA = REPLICA in settings.DATABASES and not settings.DATABASES[REPLICA].get('TEST', {}).get('MIRROR')
+
+
+@skipUnless(STANDALONE_REPLICA, "Needs a separate replica database; run with --settings=alx_travel_app.test_settings")
+@override_settings(DATABASE_REPLICAS=[REPLICA], REPLICA_STICKY_SECONDS=30)
+class ReplicaRoutingTests(APITransactionTestCase):
+    """
+    Reads of safe requests go to the replica; writes, and the reads of a client
+    that just wrote, go to the primary. Rows are put on one database only to
+    tell which one answered. Not a TestCase: reads inside its transaction would
+    all stay on the primary.
+    """
+    # Collected by the test runner even when skipped
+    databases = {'default', REPLICA} if STANDALONE_REPLICA else {'default'}
+
+    def setUp(self):
+        cache.clear()
+        self.host = CustomUser.objects.create(
+            username='host', email='host@example.com', first_name='Mumbi', last_name='Ngugi',
+            phone_number='+254712345621', user_role='host'
+        )
+        self.guest = CustomUser.objects.create(
+            username='guest', email='guest@example.com', first_name='Wanjiku', last_name='Muthoni',
+            phone_number='+254712345600', user_role='guest'
+        )
+        self.copy_to_replica(self.host, self.guest)
+        self.client.force_authenticate(self.guest)
+
+    def copy_to_replica(self, *objs):
+        for obj in objs:
+            type(obj).objects.using(REPLICA).bulk_create([obj])
+
+    def make_listing(self, name):
+        return Listing.objects.create(
+            host=self.host, name=name, description='Cozy cottage steps from the beach',
+            location='Diani', price_per_night='8500.00', capacity=3, amenities={'wifi': True}
+        )
+
+    def test_safe_requests_read_from_the_replica(self):
+        on_primary = self.make_listing('Primary only')
+        on_replica = self.make_listing('Replicated')
+        self.copy_to_replica(on_replica)
+        Listing.objects.filter(pk=on_replica.pk).delete()
+        self.assertEqual(self.client.get(f'/api/property/{on_replica.pk}/').status_code, 200)
+        self.assertEqual(self.client.get(f'/api/property/{on_primary.pk}/').status_code, 404)
+
+    def test_writes_pin_the_client_to_the_primary(self):
+        # Not replicated yet: the booking's validation must read the primary
+        listing = self.make_listing('Diani Beach Cottage')
+        response = self.client.post('/api/bookings/', {
+            'listing_id': listing.pk, 'user_id': self.guest.pk,
+            'start_date': '2025-06-01T14:00:00Z', 'end_date': '2025-06-04T10:00:00Z', 'booking_status': 'PENDING',
+        })
+        self.assertEqual(response.status_code, 201)
+        self.assertIn(replicas.PIN_COOKIE, response.cookies)
+        url = f"/api/bookings/{response.data['booking_id']}/"
+        self.assertEqual(self.client.get(url).status_code, 200)
+        # Once the window is over the client reads the replica, which lacks the booking
+        self.client.cookies[replicas.PIN_COOKIE] = '0'
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_replica_reads_outside_requests(self):
+        self.copy_to_replica(self.make_listing('Replicated'))
+        self.make_listing('Primary only')
+        self.assertEqual(Listing.objects.count(), 2)
+        with replicas.replica_reads():
+            self.assertEqual(Listing.objects.count(), 1)
+            with transaction.atomic():
+                self.assertEqual(Listing.objects.count(), 2)
@@ -1,5 +1,5 @@
 from django.urls import path, include
-from . import views
+from . import async_views, views
 from rest_framework import routers
 from rest_framework_nested.routers import NestedDefaultRouter
 
@@ -44,6 +44,13 @@ message_router.register(r'sender', views.UserViewSet, basename='message-sender')
 message_router.register(r'recipient', views.UserViewSet, basename='message-recipient')
 
 urlpatterns = [
+    path('events/', views.event_stream, name='event-stream'),
+    path('db-pool/', views.database_pool, name='database-pool'),
+    # Async variants of the hot read endpoints, for the ASGI app
+    path('async/property/', async_views.listing_list, name='async-listing-list'),
+    path('async/property/<str:pk>/', async_views.listing_detail, name='async-listing-detail'),
+    path('async/property/<str:pk>/availability/', async_views.listing_availability, name='async-listing-availability'),
+    path('async/messages/inbox/', async_views.message_inbox, name='async-message-inbox'),
     path('', include(router.urls)),
     path('', include(user_router.urls)),
     path('', include(property_router.urls)),
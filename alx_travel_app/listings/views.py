@@ -1,44 +1,350 @@
-from rest_framework.decorators import api_view
+import asyncio
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.handlers.asgi import ASGIRequest
+from django.db import IntegrityError, OperationalError, connections
+from django.db.models import Exists, OuterRef, Q, Subquery
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+from rest_framework.decorators import api_view, action, permission_classes
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.serializers import as_serializer_error
 from rest_framework import viewsets, status, filters
-from .models import CustomUser
+from alx_travel_app.pooled_mysql import pool
+from . import bulk, events
+from .filters import ListingFilter, ListingProximityFilter, ListingSearchFilter, stay_dates
+from .mixins import ConditionalGetMixin, ExportMixin, FastListMixin, ListingCacheMixin, NestedParentMixin, SparseFieldsMixin
+from .models import CustomUser, is_booking_conflict, reservation_metrics
+from .pagination import BookingCursorPagination, MessageCursorPagination, PaymentCursorPagination
+from .rollups import default_range, series
 from .serializers import *
 
-class UserViewSet(viewsets.ModelViewSet):
-    queryset = CustomUser.objects.all()
+
+class UserViewSet(SparseFieldsMixin, NestedParentMixin, viewsets.ModelViewSet):
+    queryset = CustomUser.objects.order_by('-created_at')
+    parent_lookups = {
+        # Guests who have booked the property
+        'property-users': ('property_pk', Listing, lambda pk: Q(Exists(Booking.objects.filter(user=OuterRef('pk'), listing_id=pk)))),
+        'payment-user': ('payment_pk', Payment, lambda pk: Q(payments__payment_id=pk)),
+        'message-sender': ('message_pk', Message, lambda pk: Q(sent_messages__message_id=pk)),
+        'message-recipient': ('message_pk', Message, lambda pk: Q(received_messages__message_id=pk)),
+    }
     serializer_class = CustomUserSerializer
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
-    search_fields = ['first_name', 'last_name'] 
-    ordering_fields = ['-created_at']
+    search_fields = ['first_name', 'last_name', 'email']
+    ordering_fields = ['created_at', 'first_name', 'last_name']
 
-class ListingViewSet(viewsets.ModelViewSet):
+class ListingViewSet(ConditionalGetMixin, ListingCacheMixin, SparseFieldsMixin, NestedParentMixin, viewsets.ModelViewSet):
     queryset = Listing.objects.all()
+    parent_lookups = {
+        'user-listings': ('user_pk', CustomUser, lambda pk: Q(host_id=pk)),
+    }
     serializer_class = ListingSerializer
-    search_fields = ['name', 'location', 'price_per_night']
-    ordering_fields = ['-created_at']
+    filter_backends = [ListingFilter, ListingSearchFilter, ListingProximityFilter, filters.OrderingFilter]
+    # icontains fallback for backends without the FULLTEXT index
+    search_fields = ['name', 'description', 'location']
+    ordering_fields = ['created_at', 'price_per_night', 'capacity', 'name', 'rating_avg', 'rating_count']
+    # ?expand=host embeds the host
+    conditional_fields = ('updated_at', 'host__updated_at')
+    conditional_models = (Listing, CustomUser)
+    # Availability comes from ListingNight, which has no timestamps
+    conditional_skip_params = ('check_in', 'check_out')
+    conditional_etag = False
+
+    @action(detail=True, methods=['get'])
+    def availability(self, request, pk=None):
+        """
+        Nights already taken between check_in and check_out for one listing.
+        """
+        check_in, check_out = stay_dates(request, required=True)
+        listing = self.get_object()
+        taken = listing.taken_nights(check_in, check_out)
+        return Response({
+            'property_id': listing.property_id,
+            'check_in': check_in,
+            'check_out': check_out,
+            'available': not taken,
+            'taken_nights': taken,
+        })
+
+    # Longest range one stats request may cover, in days
+    STATS_MAX_DAYS = {'day': 366, 'month': 5 * 366}
+
+    @action(detail=True, methods=['get'])
+    def stats(self, request, pk=None):
+        """
+        Occupancy and revenue series from the rollup tables (see refresh_rollups).
+        ?period=day|month, optional ?from=&to= as YYYY-MM-DD with `to` exclusive;
+        defaults to the last 30 days or the last 12 months.
+        """
+        period = request.query_params.get('period', 'day')
+        if period not in self.STATS_MAX_DAYS:
+            raise ValidationError({'period': "Expected 'day' or 'month'."})
+        start, end = stay_dates(request, 'from', 'to')
+        if start is None:
+            start, end = default_range(period, timezone.localdate())
+        if (end - start).days > self.STATS_MAX_DAYS[period]:
+            raise ValidationError({'to': f"At most {self.STATS_MAX_DAYS[period]} days per request."})
+        listing = self.get_object()
+        return Response({
+            'property_id': listing.property_id,
+            'period': period,
+            'from': start,
+            'to': end,
+            'series': series(listing, period, start, end),
+        })
+
+    def bulk_response(self, results):
+        failed = sum(1 for result in results if result['status'] == 'error')
+        return Response(
+            {'count': len(results), 'failed': failed, 'results': results},
+            status=status.HTTP_207_MULTI_STATUS if failed else status.HTTP_200_OK,
+        )
+
+    @action(detail=False, methods=['post'], url_path='bulk')
+    def bulk(self, request):
+        """
+        Creates or partially updates up to LISTING_BULK_MAX_ITEMS listings from a JSON
+        array; items with a property_id update that listing. Valid items are written in
+        one transaction and each item gets a result in request order; the response is
+        207 when some items failed.
+        """
+        return self.bulk_response(bulk.sync_listings(request.data, self.get_serializer_context()))
+
+    @action(detail=False, methods=['post'], url_path='bulk-availability')
+    def bulk_availability(self, request):
+        """
+        Blocks and releases host nights on up to LISTING_BULK_MAX_ITEMS calendars:
+        [{"property_id", "block": [{"start", "end"}], "release": [...]}]. Nights taken
+        by bookings are left alone and reported as conflicts.
+        """
+        try:
+            results = bulk.sync_calendars(request.data)
+        except IntegrityError:
+            return Response({'detail': "The calendars changed during the sync, please retry."}, status=status.HTTP_409_CONFLICT)
+        except OperationalError:
+            return Response(
+                {'detail': "The listings are busy, please retry."},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE, headers={'Retry-After': '1'}
+            )
+        return self.bulk_response(results)
     
-class BookingViewSet(viewsets.ModelViewSet):
-    queryset = Booking.objects.all()
+class BookingViewSet(ConditionalGetMixin, ExportMixin, FastListMixin, SparseFieldsMixin, NestedParentMixin, viewsets.ModelViewSet):
+    queryset = Booking.objects.select_related('listing', 'user')
+    parent_lookups = {
+        'user-bookings': ('user_pk', CustomUser, lambda pk: Q(user_id=pk)),
+        'property-bookings': ('property_pk', Listing, lambda pk: Q(listing_id=pk)),
+        'payment-booking': ('payment_pk', Payment, lambda pk: Q(payment__payment_id=pk)),
+    }
     serializer_class = BookingSerializer
-    search_fields = ['created_at', 'booking_status', 'start_date']
-    ordering_fields = ['-created_at']
+    pagination_class = BookingCursorPagination
+    search_fields = ['booking_status', 'listing__name', 'user__email']
+    ordering_fields = ['created_at', 'start_date', 'end_date']
+    ordering = BookingCursorPagination.ordering
+    # BookingSerializer embeds the listing, and on ?expand= the guest and the listing's host
+    conditional_fields = ('updated_at', 'listing__updated_at', 'user__updated_at', 'listing__host__updated_at')
+    conditional_models = (Booking, Listing, CustomUser)
+    export_date_field = 'created_at'
+
+    def create(self, request, *args, **kwargs):
+        """
+        Books through Booking.objects.reserve() so concurrent checkouts for the same
+        listing are serialized on a row lock. Taken dates answer 409, other model
+        validation errors 400; a lock that stays contended after the retries answers 503.
+        """
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        try:
+            booking = Booking.objects.reserve(
+                data['listing'], data['user'], data['start_date'], data['end_date'], status=data['booking_status']
+            )
+        except DjangoValidationError as exc:
+            if not is_booking_conflict(exc):
+                raise ValidationError(as_serializer_error(exc))
+            return Response({'detail': exc.messages}, status=status.HTTP_409_CONFLICT)
+        except OperationalError:
+            return Response(
+                {'detail': "The listing is busy, please retry."},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE, headers={'Retry-After': '1'}
+            )
+        serializer.instance = booking
+        headers = self.get_success_headers(serializer.data)
+        return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
+
+    @action(detail=False, methods=['get'], url_path='reservation-metrics', permission_classes=[IsAdminUser])
+    def reservation_metrics(self, request):
+        """
+        Contention counters for Booking.objects.reserve() in this process.
+        """
+        return Response(reservation_metrics.snapshot())
     
-class PaymentViewSet(viewsets.ModelViewSet):
-    queryset = Payment.objects.all()
+class PaymentViewSet(ConditionalGetMixin, ExportMixin, FastListMixin, SparseFieldsMixin, NestedParentMixin, viewsets.ModelViewSet):
+    # PaymentSerializer nests the booking with its listing and guest
+    queryset = Payment.objects.select_related('user', 'booking_id__listing', 'booking_id__user')
     serializer_class = PaymentSerializer
-    search_fields = ['user']
-    ordering_fields = ['-payment_date']
-class ReviewViewSet(viewsets.ModelViewSet):
-    queryset = Review.objects.all()
+    pagination_class = PaymentCursorPagination
+    parent_lookups = {
+        'user-payments': ('user_pk', CustomUser, lambda pk: Q(user_id=pk)),
+        'property-payments': ('property_pk', Listing, lambda pk: Q(booking_id__listing_id=pk)),
+        'booking-payments': ('booking_pk', Booking, lambda pk: Q(booking_id=pk)),
+    }
+    search_fields = ['transaction_id', 'payment_status', 'payment_method', 'user__email']
+    ordering_fields = ['payment_date', 'amount']
+    ordering = PaymentCursorPagination.ordering
+    conditional_fields = (
+        'updated_at', 'user__updated_at', 'booking_id__updated_at', 'booking_id__user__updated_at',
+        'booking_id__listing__updated_at', 'booking_id__listing__host__updated_at',
+    )
+    conditional_models = (Payment, Booking, Listing, CustomUser)
+    export_date_field = 'payment_date'
+class ReviewViewSet(FastListMixin, SparseFieldsMixin, NestedParentMixin, viewsets.ModelViewSet):
+    queryset = Review.objects.select_related('user', 'listing').order_by('-review_date')
+    parent_lookups = {
+        'user-reviews': ('user_pk', CustomUser, lambda pk: Q(user_id=pk)),
+        'property-reviews': ('property_pk', Listing, lambda pk: Q(listing_id=pk)),
+        'booking-reviews': ('booking_pk', Booking, lambda pk: Q(booking_id=pk)),
+    }
     serializer_class = ReviewSerializer
-    search_fields = ['listing', 'review_date', 'review_rating', 'comment']
-    ordering_fields = ['review_rating']
+    search_fields = ['comment', 'listing__name']
+    ordering_fields = ['review_rating', 'review_date']
     
     
-class MessageViewSet(viewsets.ModelViewSet):
-    queryset = Message.objects.all()
+def _host_of(listing_pk):
+    return Subquery(Listing.objects.filter(pk=listing_pk).values('host_id')[:1])
+
+
+class MessageViewSet(ExportMixin, FastListMixin, SparseFieldsMixin, NestedParentMixin, viewsets.ModelViewSet):
+    queryset = Message.objects.select_related('sender')
     serializer_class = MessageSerializer
+    pagination_class = MessageCursorPagination
+    parent_lookups = {
+        'user-messages': ('user_pk', CustomUser, lambda pk: Q(sender_id=pk) | Q(recipient_id=pk)),
+        # Conversations with the property's host
+        'property-messages': ('property_pk', Listing, lambda pk: Q(sender_id=_host_of(pk)) | Q(recipient_id=_host_of(pk))),
+    }
     search_fields = ['message_title']
     ordering_fields = ['sent_at']
-        
+    ordering = MessageCursorPagination.ordering
+    export_date_field = 'sent_at'
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == 'inbox':
+            queryset = queryset.filter(recipient_id=self.request.user.pk)
+            if self.request.query_params.get('unread') in ('1', 'true'):
+                queryset = queryset.filter(is_read=False)
+        elif self.action == 'conversation':
+            other = self.request.query_params.get('with')
+            try:
+                other = CustomUser._meta.pk.to_python(other)
+            except DjangoValidationError:
+                other = None
+            if other is None:
+                raise ValidationError({'with': "A user id is required."})
+            me = self.request.user.pk
+            queryset = queryset.filter(Q(sender_id=me, recipient_id=other) | Q(sender_id=other, recipient_id=me))
+        return queryset
+
+    def perform_create(self, serializer):
+        serializer.save(sender=self.request.user)
+
+    @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
+    def inbox(self, request):
+        """
+        Messages received by the current user, newest first; ?unread=true for the
+        unread ones only, a range scan of the (recipient, is_read, sent_at) index.
+        """
+        return self.list(request)
+
+    @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
+    def conversation(self, request):
+        """
+        Messages between the current user and ?with=<user_id> in both directions,
+        newest first, from the (sender, recipient, sent_at) index.
+        """
+        return self.list(request)
+
+    @action(detail=False, methods=['get'], url_path='unread-count', permission_classes=[IsAuthenticated])
+    def unread_count(self, request):
+        """The unread badge: the counter on the already loaded user row, no message scan."""
+        return Response({'unread': request.user.unread_messages})
+
+    def marked_response(self, marked):
+        unread = CustomUser.objects.filter(pk=self.request.user.pk).values_list('unread_messages', flat=True).first()
+        return Response({'marked': marked, 'unread': unread})
+
+    @action(detail=False, methods=['post'], url_path='mark-read', permission_classes=[IsAuthenticated])
+    def mark_read(self, request):
+        """
+        Marks {"message_ids": [...]} received by the current user as read in one
+        UPDATE; ids of other users' or already read messages are ignored.
+        """
+        serializer = MarkReadSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        marked = Message.objects.filter(pk__in=serializer.validated_data['message_ids']).mark_read(request.user.pk)
+        return self.marked_response(marked)
+
+    @action(detail=False, methods=['post'], url_path='mark-all-read', permission_classes=[IsAuthenticated])
+    def mark_all_read(self, request):
+        """Marks every message received by the current user as read in one UPDATE."""
+        return self.marked_response(Message.objects.mark_read(request.user.pk))
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def database_pool(request):
+    """
+    GET /api/db-pool/: connection reuse of this worker process per database alias.
+    Pooled aliases report the pool counters (open, in_use, idle, waits, wait_ms,
+    timeouts, ...); the others their persistent-connection settings.
+    """
+    stats = pool.snapshot()
+    for alias in connections:
+        if alias not in stats:
+            settings_dict = connections[alias].settings_dict
+            stats[alias] = {
+                'pooled': False,
+                'conn_max_age': settings_dict['CONN_MAX_AGE'],
+                'conn_health_checks': settings_dict['CONN_HEALTH_CHECKS'],
+            }
+        else:
+            stats[alias] = {'pooled': True, **stats[alias]}
+    return Response(stats)
+
+
+async def event_stream(request):
+    """
+    GET /api/events/: Server-Sent Events for the current user, `message` when one
+    arrives and `booking` when a booking of theirs, or on their listing, changes
+    status. Opens with `ready`; after `reset` (the stream fell behind) or a
+    reconnect, refetch the inbox and bookings. Needs the ASGI server: a WSGI worker
+    would be held for the whole connection.
+    """
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse({'detail': "The event stream is only served over ASGI."}, status=501)
+    user = await request.auser()
+    if not user.is_authenticated:
+        return JsonResponse({'detail': "Authentication credentials were not provided."}, status=403)
+
+    async def stream():
+        # Subscribed before `ready`, so nothing published after it is missed
+        async with events.broker().subscribe(events.user_channel(user.pk)) as subscription:
+            yield events.format_sse({'event': 'ready', 'data': {'user': user.pk}})
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscription.get(), events.KEEPALIVE)
+                except asyncio.TimeoutError:
+                    yield ': keepalive\n\n'
+                    continue
+                yield events.format_sse(event)
+                if event is events.RESET:
+                    return
+
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-store'
+    # Stops nginx from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
 